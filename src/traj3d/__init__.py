@@ -10,13 +10,23 @@ este pacote fornece funcionalidades para:
 """
 
 from .cli import main, parse_args, run_analysis
-from .io_cvat import load_cvat_xy
-from .detection import detect_launch_frame
+from .io_cvat import clear_cvat_cache, iter_cvat_chunks, load_cvat_tracks, load_cvat_xy
+from .detection import OnlineFlightDetector, detect_flight_events_batch, detect_launch_frame
 from .trajectory import build_trajectory, make_position_functions
-from .kinematics import make_velocity_functions, build_kinematics
+from .model import FlightModel, Trajectory
+from .sweep import parameter_sweep, sweep_grid
+from .drag import ball_coefficients, build_drag_trajectory, simulate_flights
+from .resample import evaluate, resample_stream, write_resampled_csv
+from .animation import animate_xyz
+from .kinematics import make_velocity_functions, build_kinematics, kinematics_into
 from .derivation import build_derivation_text, print_derivation
-from .plotting import plot_xyz, plot_velocity_components, plot_acceleration_components
+from .plotting import (ComponentFigure, decimate, plot_acceleration_components, plot_velocity_components,
+                       plot_xyz, render_plots)
 from .video_annot import annotate_video, extract_key_frames
+from .multitrack import analyze_tracks
+from .tracking import BallTracker, track_ball
+from .camera import make_camera, project, reprojection_error
+from .fitting import fit_trajectory, fit_trajectory_batch
 from .utils import parse_triplet
 
 __version__ = "1.0.0"
@@ -25,17 +35,45 @@ __all__ = [
     "parse_args",
     "run_analysis",
     "load_cvat_xy",
+    "iter_cvat_chunks",
+    "clear_cvat_cache",
+    "load_cvat_tracks",
     "detect_launch_frame",
+    "detect_flight_events_batch",
+    "OnlineFlightDetector",
     "build_trajectory",
     "make_position_functions",
+    "FlightModel",
+    "Trajectory",
+    "parameter_sweep",
+    "sweep_grid",
+    "ball_coefficients",
+    "build_drag_trajectory",
+    "simulate_flights",
+    "evaluate",
+    "resample_stream",
+    "write_resampled_csv",
+    "animate_xyz",
     "make_velocity_functions",
     "build_kinematics",
+    "kinematics_into",
     "build_derivation_text",
     "print_derivation",
     "plot_xyz",
     "plot_velocity_components",
     "plot_acceleration_components",
+    "render_plots",
+    "ComponentFigure",
+    "decimate",
     "annotate_video",
     "extract_key_frames",
+    "analyze_tracks",
+    "track_ball",
+    "BallTracker",
+    "make_camera",
+    "project",
+    "reprojection_error",
+    "fit_trajectory",
+    "fit_trajectory_batch",
     "parse_triplet",
 ]
@@ -0,0 +1,206 @@
+"""
+módulo para o vídeo animado da trajetória 3d
+
+a cena estática (curva completa, âncoras, câmera, eixos e linhas do chão, a mesma de
+plot_xyz) é desenhada uma vez e guardada; a cada frame o fundo é restaurado e só a bola e
+o rastro são redesenhados (blitting). o buffer rgba do canvas agg é lido sem
+cópia e convertido direto para o frame do VideoWriter, sem passar por png; opcionalmente o
+frame do vídeo original vai ao lado
+
+a codificação do mp4 (o passo mais caro) roda numa thread própria com dois frames
+alternados, em paralelo com o desenho do frame seguinte; a decodificação e o redimensionamento
+do vídeo original também, alguns frames à frente. o rastro completo usa os mesmos pontos
+reduzidos (decimate) da curva estática, então o custo por frame não cresce com a série
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .plotting import MAX_POINTS, _draw_scene, _pyplot, decimate
+
+BALL_COLOR = "orange"
+
+
+def _source_frames(video_path, frames, height):
+    # frames do vídeo original nos índices pedidos (crescentes), redimensionados para a altura
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
+    try:
+        pos = 0
+        last = None
+        for idx in frames:
+            while pos <= idx:
+                ok, frame = cap.read()
+                pos += 1
+                if not ok:
+                    break
+                if pos - 1 == idx:
+                    scale = height / frame.shape[0]
+                    last = cv2.resize(frame, (int(round(frame.shape[1] * scale)), height),
+                                      interpolation=cv2.INTER_AREA)
+            # vídeo mais curto que a série: repete o último frame lido
+            yield last
+    finally:
+        cap.release()
+
+
+def _prefetch(items, depth=4):
+    # consome o gerador items numa thread própria, até depth itens à frente de quem lê
+    # (opencv solta o gil na decodificação e no resize, então isso roda junto com o desenho)
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        end = (False, None)
+        try:
+            for item in items:
+                if not put((True, item)):
+                    return
+        except Exception as exc:
+            end = (False, exc)
+        finally:
+            items.close()
+        put(end)
+
+    thread = threading.Thread(target=run, name="traj3d-fonte", daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = q.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def animate_xyz(df, out_mp4, cam_xyz, p0, p1, fps, video=None, size=(960, 720), trail=None,
+                max_points=MAX_POINTS):
+    """
+    Grava o mp4 com a bola andando pela trajetória 3d.
+
+    Args:
+        df: DataFrame com frame, t, x3d, y3d, z3d (build_trajectory ou Trajectory.to_frame)
+        out_mp4: Caminho do mp4
+        cam_xyz: Posição da câmera (x, y, z)
+        p0: Posição inicial da bola
+        p1: Posição final da bola
+        fps: Frames por segundo do mp4 (um frame por linha de df)
+        video: Vídeo original para mostrar ao lado (frames alinhados pela coluna frame)
+        size: Tamanho (largura, altura) da vista 3d em pixels
+        trail: Frames de rastro atrás da bola (padrão: todo o caminho já percorrido, com os
+            pontos reduzidos da curva estática)
+        max_points: Pontos da curva estática e do rastro completo (decimate)
+
+    Returns:
+        dict: path, frames, seconds e render_fps (frames por segundo de renderização)
+    """
+    plt = _pyplot()
+    start = time.perf_counter()
+    width, height = int(size[0]), int(size[1])
+    fig = plt.figure(figsize=(width / 100.0, height / 100.0), dpi=100)
+    try:
+        ax = fig.add_subplot(111, projection="3d")
+        _draw_scene(ax, df, cam_xyz, p0, p1, max_points, alpha=0.3)
+        fig.tight_layout()
+
+        # artistas móveis: animated=True fica fora do desenho da cena
+        path_line, = ax.plot([], [], [], "-", color=BALL_COLOR, lw=3, animated=True)
+        ball, = ax.plot([], [], [], "o", color=BALL_COLOR, markersize=12, markeredgecolor="black",
+                        animated=True)
+
+        canvas = fig.canvas
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+        # visão do buffer do agg: o mesmo renderizador é reaproveitado a cada frame
+        rgba = np.asarray(canvas.buffer_rgba())
+        if rgba.shape[:2] != (height, width):
+            height, width = rgba.shape[:2]
+
+        x = df["x3d"].to_numpy(dtype=float)
+        y = df["y3d"].to_numpy(dtype=float)
+        z = df["z3d"].to_numpy(dtype=float)
+        t = df["t"].to_numpy(dtype=float)
+        frames = df["frame"].to_numpy(dtype=int)
+        valid = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+        # rastro completo: os mesmos índices reduzidos da curva estática; a cada frame entra o
+        # prefixo até o frame atual (no máximo max_points pontos, qualquer que seja a série)
+        shown = np.flatnonzero(valid)
+        if len(shown):
+            shown = shown[decimate(np.arange(len(shown)), z[shown], max_points, keep=[int(np.argmax(z[shown]))])]
+
+        sources = _prefetch(_source_frames(video, frames, height)) if video is not None else None
+        side = 0
+        first = next(sources, None) if sources is not None else None
+        if first is not None:
+            side = first.shape[1]
+        # dois frames de saída: um é codificado enquanto o outro é desenhado
+        outs = [np.zeros((height, side + width, 3), dtype=np.uint8) for _ in range(2)]
+        writer = cv2.VideoWriter(str(out_mp4), cv2.VideoWriter_fourcc(*"mp4v"), fps, (side + width, height))
+        if not writer.isOpened():
+            raise RuntimeError("falha ao abrir VideoWriter")
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        pending = None
+        try:
+            for i in range(len(df)):
+                out = outs[i % 2]
+                canvas.restore_region(background)
+                if trail is None:
+                    pts = shown[:np.searchsorted(shown, i, side="right")]
+                    if valid[i] and (not len(pts) or pts[-1] != i):
+                        pts = np.append(pts, i)
+                else:
+                    lo = max(0, i - int(trail))
+                    pts = lo + np.flatnonzero(valid[lo:i + 1])
+                path_line.set_data_3d(x[pts], y[pts], z[pts])
+                if valid[i]:
+                    ball.set_data_3d([x[i]], [y[i]], [z[i]])
+                else:
+                    ball.set_data_3d([], [], [])
+                ax.draw_artist(path_line)
+                ax.draw_artist(ball)
+
+                if side:
+                    src = first if i == 0 else next(sources, None)
+                    if src is not None:
+                        out[:, :side] = src[:, :side]
+                view = out[:, side:]
+                cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR, dst=view)
+                # tempo escrito no frame pelo opencv (o texto do matplotlib custa mais que a cena)
+                cv2.putText(view, f"frame {frames[i]}  t = {t[i]:.2f} s", (16, 32),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
+                if pending is not None:
+                    pending.result()
+                pending = pool.submit(writer.write, out)
+            if pending is not None:
+                pending.result()
+        finally:
+            pool.shutdown(wait=True)
+            writer.release()
+            if sources is not None:
+                sources.close()
+    finally:
+        plt.close(fig)
+
+    seconds = time.perf_counter() - start
+    return {"path": out_mp4, "frames": len(df), "seconds": seconds, "render_fps": len(df) / max(seconds, 1e-9)}
@@ -0,0 +1,154 @@
+"""
+módulo com o modelo de câmera pinhole
+
+convenções:
+- mundo com z para cima (as mesmas coordenadas de --camera, --bola-inicio e --bola-fim)
+- câmera com x para a direita, y para baixo e z para frente (como os pixels do vídeo)
+- a câmera é um dict com K (intrínsecos 3x3), R (rotação mundo -> câmera), C (centro no
+  mundo), width e height; todas as contas aceitam arrays (..., 3) de pontos de uma vez
+
+a série 3d inteira é projetada e comparada com o cvat em operações de array, sem laço por
+frame, então o custo continua baixo em séries de 100k frames
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def look_at(position, target, up=(0.0, 0.0, 1.0)):
+    # rotação mundo -> câmera olhando de position para target: linhas = direita, baixo, frente
+    position = np.asarray(position, dtype=float)
+    forward = np.asarray(target, dtype=float) - position
+    norm = np.linalg.norm(forward)
+    if norm == 0:
+        raise ValueError("câmera e alvo no mesmo ponto")
+    forward /= norm
+    right = np.cross(forward, np.asarray(up, dtype=float))
+    if np.linalg.norm(right) < 1e-9:
+        # olhando na direção do "up": qualquer horizontal serve como direita
+        right = np.cross(forward, (0.0, 1.0, 0.0))
+    right /= np.linalg.norm(right)
+    down = np.cross(forward, right)
+    return np.stack([right, down, forward])
+
+
+def intrinsics(width, height, fov=60.0):
+    # matriz K com pixels quadrados, centro óptico no meio da imagem e fov horizontal em graus
+    f = 0.5 * width / np.tan(np.radians(fov) / 2.0)
+    return np.array([[f, 0.0, 0.5 * width], [0.0, f, 0.5 * height], [0.0, 0.0, 1.0]])
+
+
+def make_camera(position, target, width, height, fov=60.0, up=(0.0, 0.0, 1.0)):
+    """
+    Monta a câmera pinhole usada nas projeções.
+
+    Args:
+        position: Centro da câmera no mundo (x, y, z)
+        target: Ponto do mundo para onde a câmera olha
+        width: Largura da imagem em pixels
+        height: Altura da imagem em pixels
+        fov: Campo de visão horizontal em graus
+        up: Direção "para cima" do mundo
+
+    Returns:
+        dict: K, R, C, width, height e fov
+    """
+    return {
+        "K": intrinsics(width, height, fov),
+        "R": look_at(position, target, up),
+        "C": np.asarray(position, dtype=float),
+        "width": int(width),
+        "height": int(height),
+        "fov": float(fov),
+    }
+
+
+def projection_matrix(camera):
+    # P = K R [I | -C] (3x4)
+    KR = camera["K"] @ camera["R"]
+    return np.hstack([KR, -(KR @ camera["C"])[:, None]])
+
+
+def to_camera(camera, points):
+    # pontos do mundo (..., 3) em coordenadas da câmera (..., 3)
+    return (np.asarray(points, dtype=float) - camera["C"]) @ camera["R"].T
+
+
+def project(camera, points):
+    """
+    Projeta pontos 3d na imagem.
+
+    Args:
+        camera: Câmera de make_camera
+        points: Array (..., 3) de pontos no mundo
+
+    Returns:
+        ndarray: (..., 2) com u, v em pixels; NaN para pontos atrás da câmera
+    """
+    pc = to_camera(camera, points)
+    K = camera["K"]
+    z = pc[..., 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = np.where(z > 0, 1.0 / z, np.nan)
+    u = K[0, 0] * pc[..., 0] * inv + K[0, 1] * pc[..., 1] * inv + K[0, 2]
+    v = K[1, 1] * pc[..., 1] * inv + K[1, 2]
+    return np.stack([u, v], axis=-1)
+
+
+def project_series(camera, df):
+    # projeta as colunas x3d, y3d, z3d de build_trajectory: array (frames, 2) com u, v
+    return project(camera, df[["x3d", "y3d", "z3d"]].to_numpy(dtype=float))
+
+
+def reprojection_error(camera, df, df_cvat):
+    """
+    Erro de reprojeção da trajetória modelada contra os centros do cvat, frame a frame.
+
+    Args:
+        camera: Câmera de make_camera
+        df: DataFrame com frame, x3d, y3d, z3d (build_trajectory ou build_kinematics)
+        df_cvat: DataFrame com frame, x2d, y2d (load_cvat_xy)
+
+    Returns:
+        DataFrame: frame, u, v (projeção), x2d, y2d (cvat) e err (distância em pixels,
+        NaN nos frames sem ponto do cvat)
+    """
+    frames = df["frame"].to_numpy(dtype=int)
+    uv = project_series(camera, df)
+
+    # pontos do cvat alinhados aos frames da série por índice, sem merge
+    ref = np.full((len(frames), 2), np.nan)
+    if len(frames) and df_cvat is not None and len(df_cvat):
+        pos = np.full(int(frames.max()) + 1, -1)
+        pos[frames[frames >= 0]] = np.flatnonzero(frames >= 0)
+        f = df_cvat["frame"].to_numpy(dtype=int)
+        ok = (f >= 0) & (f < len(pos))
+        rows = pos[f[ok]]
+        keep = rows >= 0
+        ref[rows[keep], 0] = df_cvat["x2d"].to_numpy(dtype=float)[ok][keep]
+        ref[rows[keep], 1] = df_cvat["y2d"].to_numpy(dtype=float)[ok][keep]
+
+    err = np.hypot(uv[:, 0] - ref[:, 0], uv[:, 1] - ref[:, 1])
+    return pd.DataFrame({"frame": frames, "u": uv[:, 0], "v": uv[:, 1],
+                         "x2d": ref[:, 0], "y2d": ref[:, 1], "err": err})
+
+
+def reprojection_stats(df_err, f0=None, f1=None):
+    # resumo do erro de reprojeção (opcionalmente só em [f0, f1]): rms, mediana, p90, máximo e pontos
+    frames = df_err["frame"].to_numpy()
+    err = df_err["err"].to_numpy(dtype=float)
+    keep = np.isfinite(err)
+    if f0 is not None:
+        keep &= frames >= f0
+    if f1 is not None:
+        keep &= frames <= f1
+    err = err[keep]
+    if not len(err):
+        return {"rms": float("nan"), "median": float("nan"), "p90": float("nan"), "max": float("nan"), "points": 0}
+    return {
+        "rms": float(np.sqrt(np.mean(err * err))),
+        "median": float(np.median(err)),
+        "p90": float(np.percentile(err, 90)),
+        "max": float(np.max(err)),
+        "points": int(len(err)),
+    }
@@ -4,24 +4,32 @@ módulo cli para orquestração do fluxo principal
 
 import argparse
 from pathlib import Path
-import cv2
 import numpy as np
 
-from .io_cvat import load_cvat_xy
-from .detection import detect_launch_frame
-from .trajectory import build_trajectory, make_position_functions
-from .kinematics import build_kinematics
+from .io_cvat import clear_cvat_cache, load_cvat_tracks, load_cvat_xy
+from .detection import detect_flight_window
+from .model import FlightModel, Trajectory
+from .drag import ball_coefficients, build_drag_trajectory
+from .resample import write_resampled_csv
 from .derivation import print_derivation
-from .plotting import plot_xyz, plot_velocity_components, plot_acceleration_components
-from .video_annot import annotate_video, extract_key_frames
-from .utils import parse_triplet
+from .plotting import render_plots
+from .video_annot import (annotate_video, build_overlay_table, extract_key_frames, open_capture,
+                          resolve_key_frames, track_names)
+from .multitrack import analyze_tracks, track_frame, track_overlays, tracks_to_frame
+from .probe import clear_probe_cache, probe_video
+from .sidecar import export_overlay
+from .tracking import track_ball
+from .camera import make_camera, reprojection_error, reprojection_stats
+from .fitting import fit_trajectory
+from .utils import parse_size, parse_triplet
 
 
 def parse_args():
     # parse dos argumentos da linha de comando
     p = argparse.ArgumentParser(description="trajetória com xy retilíneo e z parabólico entre pontos de referência")
     p.add_argument("--video", required=True, help="caminho do vídeo")
-    p.add_argument("--xml", required=True, help="annotations.xml do cvat")
+    p.add_argument("--xml", default=None,
+                   help="annotations.xml do cvat (sem ele a bola é detectada e rastreada no próprio vídeo)")
     p.add_argument("--out", default="out", help="pasta de saída")
     p.add_argument("--fps-override", type=float, default=None, help="força fps do vídeo se necessário")
     p.add_argument("--camera", "--anchor-camera", dest="camera", default="7,4,1",
@@ -31,75 +39,138 @@ def parse_args():
     p.add_argument("--bola-fim", "--anchor-ball-end", dest="ball_end", default="6,6,0",
                    help="posição final da bola x,y,z")
     p.add_argument("--g", type=float, default=9.81, help="gravidade para z")
+    p.add_argument("--drag", type=float, default=0.0,
+                   help="coeficiente de arrasto cd da bola (0 = sem arrasto, modelo parabólico)")
+    p.add_argument("--spin", default=None,
+                   help="rotação da bola wx,wy,wz em rad/s para o efeito magnus (padrão: sem rotação)")
+    p.add_argument("--ball-mass", type=float, default=0.27, help="massa da bola em kg (arrasto e magnus)")
+    p.add_argument("--ball-radius", type=float, default=0.11, help="raio da bola em m (arrasto e magnus)")
+    p.add_argument("--resample", type=float, default=None,
+                   help="grava series_resample.csv com a série em HZ amostras por segundo no vídeo inteiro "
+                        "(ex.: 1000; modelo sem arrasto)")
+    p.add_argument("--fit", action="store_true",
+                   help="ajusta m_x, q_x, m_y, q_y, b, c aos pontos 2d vistos pela câmera em --camera "
+                        "(as âncoras da bola deixam de definir a curva)")
+    p.add_argument("--camera-target", default=None,
+                   help="ponto x,y,z para onde a câmera olha (padrão: meio entre as âncoras da bola)")
+    p.add_argument("--fov", type=float, default=60.0, help="campo de visão horizontal da câmera em graus")
+    p.add_argument("--reprojection", action="store_true",
+                   help="projeta a trajetória 3d pela câmera, grava o erro contra o cvat por frame "
+                        "(reprojecao.csv) e desenha o caminho projetado no vídeo")
+    p.add_argument("--no-plots", action="store_true",
+                   help="não gera os gráficos png (nem importa o matplotlib)")
+    p.add_argument("--plot-workers", type=int, default=0,
+                   help="desenha os gráficos em n processos paralelos (0 = no processo principal)")
+    p.add_argument("--animation", choices=("3d", "side-by-side"), default=None,
+                   help="grava trajetoria_3d.mp4 com a bola andando na vista 3d "
+                        "(side-by-side: com o frame do vídeo original ao lado)")
+    p.add_argument("--exact-frame-count", action="store_true",
+                   help="conta os frames decodificando o vídeo (uma vez, fica em cache) em vez de confiar no contêiner")
+    p.add_argument("--no-cache", action="store_true",
+                   help="não lê nem grava o cache em disco (.traj3d_cache) do cvat e dos metadados do vídeo")
+    p.add_argument("--clear-cache", action="store_true",
+                   help="apaga o cache em disco do xml e do vídeo informados antes de rodar")
+    p.add_argument("--smooth", choices=("median", "savgol"), default=None,
+                   help="suaviza y2d antes de detectar lançamento/pouso (boxes com tremor)")
+    p.add_argument("--smooth-window", type=int, default=5,
+                   help="janela ímpar da suavização (padrão 5)")
+    p.add_argument("--all-tracks", action="store_true",
+                   help="analisa todos os tracks do cvat (série em series_tracks.csv) e desenha todos no vídeo")
+    p.add_argument("--video-threads", type=int, default=0,
+                   help="threads de desenho no pipeline do vídeo anotado (0 = sequencial)")
+    p.add_argument("--video-chunks", type=int, default=0,
+                   help="divide o vídeo anotado em n trechos renderizados em processos paralelos e juntados "
+                        "pelo ffmpeg sem recodificar (cada trecho é codificado à parte, então os frames saem "
+                        "próximos, não idênticos, aos do modo sequencial); sem ffmpeg anota sem dividir")
+    p.add_argument("--text-cache", type=int, default=0,
+                   help="tamanho do cache lru de textos rasterizados do overlay (0 = putText direto); os rótulos "
+                        "repetidos saem de sprites alfa, até 2 níveis diferentes do putText e ~3x mais baratos")
+    p.add_argument("--preview-scale", type=float, default=None,
+                   help="prévia rápida: escala do vídeo anotado (ex.: 0.25), salva em bola_preview.mp4; os "
+                        "frames-chave saem da prévia como *_preview.png (os pngs em resolução cheia ficam intactos)")
+    p.add_argument("--preview-roi", default=None,
+                   help="prévia rápida: recorte LxA (ex.: 320x240) que acompanha o centro do box do cvat "
+                        "(frames-chave como em --preview-scale)")
+    p.add_argument("--key-frames", default=None,
+                   help="frames salvos como png: índices e/ou inicio, meio, fim, lancamento, pico, pouso "
+                        "(padrão: inicio,meio,fim; com --video-output sidecar nenhum, para não decodificar o vídeo)")
+    p.add_argument("--key-frames-every", type=int, default=None,
+                   help="salva também um frame a cada n frames")
+    p.add_argument("--video-output", choices=("annotated", "sidecar", "both"), default="annotated",
+                   help="annotated = vídeo anotado; sidecar = legendas .vtt/.ass e primitivas .npz "
+                        "sem recodificar o vídeo; both = os dois")
     return p.parse_args()
 
 
 def main():
     # fluxo: ler args -> ler vídeo -> ler cvat -> janela do voo -> série -> derivação -> plotar -> anotar
     args = parse_args()
-    outdir = Path(args.out)
-    outdir.mkdir(parents=True, exist_ok=True)
-
-    # pontos de referência em 3d
-    cam_xyz = np.array(parse_triplet(args.camera), dtype=float)
-    p0 = np.array(parse_triplet(args.ball_start), dtype=float)
-    p1 = np.array(parse_triplet(args.ball_end), dtype=float)
-
-    # info do vídeo
-    cap = cv2.VideoCapture(args.video)
-    if not cap.isOpened():
-        raise RuntimeError(f"não consegui abrir o vídeo: {args.video}")
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = args.fps_override if args.fps_override else cap.get(cv2.CAP_PROP_FPS)
-    fps = 30.0 if not fps or fps <= 0 else fps
-    cap.release()
-
-    # pontos 2d anotados
-    df_cvat = load_cvat_xy(args.xml)
-    mask = ~(df_cvat["x2d"].isna() | df_cvat["y2d"].isna())
-    if not mask.any():
-        raise RuntimeError("cvat sem pontos válidos")
-
-    # janela do voo: começo e fim
-    f0 = max(int(df_cvat.loc[mask, "frame"].iloc[0]),
-             detect_launch_frame(df_cvat.loc[mask, ["frame", "y2d"]]))
-    f1 = max(f0 + 1, int(df_cvat.loc[mask, "frame"].iloc[-1]))
-
-    # série temporal só com posição
-    df_pos = build_trajectory(total, f0, f1, fps, p0, p1, g=args.g)
-
-    # derivação calculada e funções de velocidade
-    params = make_position_functions(f0, f1, fps, p0, p1, g=args.g)
-
-    # série com velocidade e aceleração via cálculo diferencial
-    df = build_kinematics(df_pos, params)
-    df.to_csv(outdir / "series.csv", index=False)
-
-    # derivação textual completa
-    print_derivation(params, out_path=outdir / "derivacao_posicao.txt")
-
-    # saídas visuais
-    plot_xyz(df, str(outdir / "trajetoria_3d.png"), tuple(cam_xyz), tuple(p0), tuple(p1))
-    plot_velocity_components(df, str(outdir / "velocidade_componentes.png"))
-    plot_acceleration_components(df, str(outdir / "aceleracao_componentes.png"))
-    annotate_video(args.video, df, str(outdir / "bola_annotado.mp4"), fps, df_cvat)
-    
-    # extrair frames específicos
-    frame_files = extract_key_frames(args.video, df, outdir, df_cvat)
+    results = run_analysis(
+        video_path=args.video,
+        xml_path=args.xml,
+        output_dir=args.out,
+        camera_pos=args.camera,
+        ball_start=args.ball_start,
+        ball_end=args.ball_end,
+        g=args.g,
+        drag=args.drag,
+        spin=args.spin,
+        ball_mass=args.ball_mass,
+        ball_radius=args.ball_radius,
+        resample=args.resample,
+        plots=not args.no_plots,
+        plot_workers=args.plot_workers,
+        animation=args.animation,
+        fit=args.fit,
+        camera_target=args.camera_target,
+        fov=args.fov,
+        reprojection=args.reprojection,
+        fps_override=args.fps_override,
+        exact_frame_count=args.exact_frame_count,
+        cache=not args.no_cache,
+        clear_cache=args.clear_cache,
+        all_tracks=args.all_tracks,
+        smooth=args.smooth,
+        smooth_window=args.smooth_window,
+        video_threads=args.video_threads,
+        video_chunks=args.video_chunks,
+        video_output=args.video_output,
+        text_cache=args.text_cache,
+        key_frames=args.key_frames.split(",") if args.key_frames is not None else None,
+        key_frames_every=args.key_frames_every,
+        preview_scale=args.preview_scale,
+        preview_roi=parse_size(args.preview_roi) if args.preview_roi else None,
+    )
 
+    if results["fit"] is not None:
+        fit = results["fit"]
+        print(f"ajuste: rms {fit['rms']:.2f} px em {fit['points']} pontos ({fit['iterations']} iterações)")
+    if results["reprojection"] is not None:
+        rep = results["reprojection"]
+        print(f"reprojeção no voo: rms {rep['rms']:.2f} px, mediana {rep['median']:.2f} px, "
+              f"máximo {rep['max']:.2f} px em {rep['points']} pontos")
     print("ok. saídas principais:")
-    print(outdir / "series.csv")
-    print(outdir / "derivacao_posicao.txt")
-    print(outdir / "trajetoria_3d.png")
-    print(outdir / "velocidade_componentes.png")
-    print(outdir / "aceleracao_componentes.png")
-    print(outdir / "bola_annotado.mp4")
-    for frame_file in frame_files:
+    print(results["series_csv"])
+    print(results["derivation_txt"])
+    if results["animation"] is not None:
+        anim = results["animation"]
+        print(f"animação: {anim['frames']} frames em {anim['seconds']:.2f} s ({anim['render_fps']:.0f} fps)")
+    for key in ("trajectory_png", "velocity_png", "acceleration_png", "animation_mp4", "tracked_csv", "resample_csv", "reprojection_csv", "series_tracks_csv", "annotated_video", "overlay_vtt", "overlay_ass", "overlay_npz"):
+        if results.get(key) is not None:
+            print(results[key])
+    for frame_file in results["key_frames"]:
         print(frame_file)
 
 
-def run_analysis(video_path, xml_path, output_dir="out", camera_pos="7,4,1", 
-                ball_start="0,7,2.0", ball_end="6,6,0", g=9.81, fps_override=None):
+def run_analysis(video_path, xml_path=None, output_dir="out", camera_pos="7,4,1", 
+                ball_start="0,7,2.0", ball_end="6,6,0", g=9.81,
+                drag=0.0, spin=None, ball_mass=0.27, ball_radius=0.11, resample=None, plots=True, plot_workers=0, animation=None, fit=False, camera_target=None, fov=60.0,
+                reprojection=False,
+                fps_override=None,
+                exact_frame_count=False, cache=True, clear_cache=False, all_tracks=False,
+                smooth=None, smooth_window=5,
+                video_threads=0, video_chunks=0, video_output="annotated", text_cache=0, key_frames=None, key_frames_every=None,
+                preview_scale=None, preview_roi=None):
     # executa a análise de trajetória programaticamente
     outdir = Path(output_dir)
     outdir.mkdir(parents=True, exist_ok=True)
@@ -109,56 +180,183 @@ def run_analysis(video_path, xml_path, output_dir="out", camera_pos="7,4,1",
     p0 = np.array(parse_triplet(ball_start), dtype=float)
     p1 = np.array(parse_triplet(ball_end), dtype=float)
 
-    # info do vídeo
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = fps_override if fps_override else cap.get(cv2.CAP_PROP_FPS)
-    fps = 30.0 if not fps or fps <= 0 else fps
-    cap.release()
-
-    # pontos 2d anotados
-    df_cvat = load_cvat_xy(xml_path)
-    mask = ~(df_cvat["x2d"].isna() | df_cvat["y2d"].isna())
-    if not mask.any():
-        raise RuntimeError("cvat sem pontos válidos")
-
-    # janela do voo: começo e fim
-    f0 = max(int(df_cvat.loc[mask, "frame"].iloc[0]),
-             detect_launch_frame(df_cvat.loc[mask, ["frame", "y2d"]]))
-    f1 = max(f0 + 1, int(df_cvat.loc[mask, "frame"].iloc[-1]))
-
-    # série temporal só com posição
-    df_pos = build_trajectory(total, f0, f1, fps, p0, p1, g=g)
-
-    # derivação calculada e funções de velocidade
-    params = make_position_functions(f0, f1, fps, p0, p1, g=g)
-
-    # série com velocidade e aceleração via cálculo diferencial
-    df = build_kinematics(df_pos, params)
-    df.to_csv(outdir / "series.csv", index=False)
-
-    # derivação textual completa
-    print_derivation(params, out_path=outdir / "derivacao_posicao.txt")
-
-    # saídas visuais
-    plot_xyz(df, str(outdir / "trajetoria_3d.png"), tuple(cam_xyz), tuple(p0), tuple(p1))
-    plot_velocity_components(df, str(outdir / "velocidade_componentes.png"))
-    plot_acceleration_components(df, str(outdir / "aceleracao_componentes.png"))
-    annotate_video(video_path, df, str(outdir / "bola_annotado.mp4"), fps, df_cvat)
-    
-    # extrair frames específicos
-    frame_files = extract_key_frames(video_path, df, outdir, df_cvat)
+    if all_tracks and xml_path is None:
+        raise ValueError("all_tracks precisa do xml do cvat")
+    if resample and (drag or spin):
+        raise ValueError("resample avalia o modelo sem arrasto; não combina com drag/spin")
+    if clear_cache:
+        if xml_path is not None:
+            clear_cvat_cache(xml_path)
+        clear_probe_cache(video_path)
+
+    # info do vídeo pelo cache de probe (caminho + tamanho + mtime), sem abrir o vídeo; a captura só é
+    # aberta se os metadados faltarem ou quando os frames forem lidos, e é a mesma nos dois casos
+    cap = None
+
+    def capture():
+        nonlocal cap
+        if cap is None:
+            cap = open_capture(video_path)
+        return cap
+
+    try:
+        info = probe_video(video_path, cap=capture, exact=exact_frame_count, use_disk=cache)
+        total = info["frame_count"]
+        fps = fps_override if fps_override else info["fps"]
+        fps = 30.0 if not fps or fps <= 0 else fps
+
+        # pontos 2d anotados e janela do voo: começo e fim
+        # com all_tracks todos os tracks são lidos numa passada só e analisados em lote;
+        # o primeiro track com pontos válidos segue como bola principal
+        batch = None
+        tracked = None
+        if xml_path is None:
+            # sem cvat: os pontos 2d vêm do rastreio automático (captura própria)
+            df_cvat = track_ball(video_path)
+            tracked = outdir / "tracked.csv"
+            df_cvat.to_csv(tracked, index=False)
+            # a correlação oscila ±1 px com a bola parada na mão: sem suavização isso já
+            # parece um lançamento
+            smooth = smooth or "median"
+        elif all_tracks:
+            tracks = load_cvat_tracks(xml_path, cache=cache)
+            batch = analyze_tracks(tracks, total, fps, p0, p1, g=g, smooth=smooth, smooth_window=smooth_window)
+            if not batch["ids"]:
+                raise RuntimeError("cvat sem pontos válidos")
+            primary = batch["ids"][0]
+            df_cvat = track_frame(tracks[primary])
+        else:
+            df_cvat = load_cvat_xy(xml_path, cache=cache)
+        f0, f1 = detect_flight_window(df_cvat, smooth=smooth, window=smooth_window)
+
+        # modo ajuste: a parábola vem dos pontos 2d vistos pela câmera; os extremos ajustados
+        # substituem as âncoras e o resto do fluxo segue igual
+        fitted = None
+        camera = None
+        if fit or reprojection:
+            target = parse_triplet(camera_target) if camera_target else (p0 + p1) / 2.0
+            camera = make_camera(cam_xyz, target, info["width"], info["height"], fov=fov)
+        if fit:
+            fitted = fit_trajectory(df_cvat, f0, f1, fps, camera, g=g)
+            p0 = np.array(fitted["p0"])
+            p1 = np.array(fitted["p1"])
+
+        # coeficientes do voo (derivação) e série com posição, velocidade e aceleração num buffer só;
+        # o DataFrame é montado uma vez para o csv, os gráficos e o overlay
+        model = FlightModel.from_anchors(f0, f1, fps, p0, p1, g=g)
+        params = model.to_params()
+        if drag or spin:
+            # com arrasto/magnus a série é integrada com as mesmas âncoras; a derivação continua
+            # descrevendo o modelo parabólico de referência
+            k_drag, s_magnus = ball_coefficients(ball_mass, ball_radius, cd=drag)
+            trajectory = build_drag_trajectory(total, model, drag=k_drag, magnus=s_magnus,
+                                               spin=parse_triplet(spin) if spin else (0.0, 0.0, 0.0))
+        else:
+            trajectory = Trajectory.build(total, model)
+        df = trajectory.to_frame()
+        df.to_csv(outdir / "series.csv", index=False)
+        if resample:
+            # mesma curva fora da grade de frames, gravada em pedaços (cabe em horas de vídeo)
+            write_resampled_csv(model, outdir / "series_resample.csv", rate=resample, stop=(total - 1) / fps)
+
+        # caminho 3d projetado na imagem e erro contra o cvat, frame a frame
+        path = None
+        rep_stats = None
+        if reprojection:
+            df_err = reprojection_error(camera, df, df_cvat)
+            df_err.to_csv(outdir / "reprojecao.csv", index=False)
+            rep_stats = reprojection_stats(df_err, f0, f1)
+            flight = (df_err["frame"] >= f0) & (df_err["frame"] <= f1)
+            path = np.where(flight.to_numpy()[:, None], df_err[["u", "v"]].to_numpy(), np.nan)
+
+        extra_tracks = None
+        if batch is not None:
+            tracks_to_frame(batch).to_csv(outdir / "series_tracks.csv", index=False)
+            extra_tracks = track_overlays(tracks, batch, skip={primary})
+
+        # derivação textual completa
+        print_derivation(params, out_path=outdir / "derivacao_posicao.txt")
+
+        # saídas visuais: as três figuras são independentes e podem sair em processos paralelos
+        pngs = {"trajectory_png": None, "velocity_png": None, "acceleration_png": None}
+        if plots:
+            files = render_plots([
+                ("plot_xyz", (df, str(outdir / "trajetoria_3d.png"), tuple(cam_xyz), tuple(p0), tuple(p1)), {}),
+                ("plot_velocity_components", (df, str(outdir / "velocidade_componentes.png")), {}),
+                ("plot_acceleration_components", (df, str(outdir / "aceleracao_componentes.png")), {}),
+            ], workers=plot_workers)
+            pngs = dict(zip(pngs, map(Path, files)))
+
+        # vídeo animado da vista 3d (matplotlib só é importado aqui se pedido)
+        anim = None
+        if animation:
+            from .animation import animate_xyz
+            anim = animate_xyz(df, outdir / "trajetoria_3d.mp4", tuple(cam_xyz), tuple(p0), tuple(p1), fps,
+                               video=video_path if animation == "side-by-side" else None)
+
+        # frames-chave: inicio, meio e fim por padrão; só com o sidecar (que não lê o vídeo) nenhum, a menos
+        # que sejam pedidos
+        if key_frames is None:
+            key_frames = () if video_output == "sidecar" else ("inicio", "meio", "fim")
+        key_frames = [(idx, outdir / name)
+                      for idx, name in resolve_key_frames(key_frames, total, df_cvat, every=key_frames_every)]
+        sidecar = {}
+        if video_output in ("sidecar", "both"):
+            # overlay como legendas + primitivas, sem decodificar nem codificar o vídeo
+            table = build_overlay_table(df, df_cvat, total, extra_tracks)
+            sidecar = export_overlay(table, fps, outdir, (info["width"], info["height"]),
+                                     names=track_names(extra_tracks))
+
+        annotated = None
+        frame_files = []
+        if video_output in ("annotated", "both"):
+            # uma única decodificação: anota o vídeo e salva os frames-chave no caminho
+            # (em trechos, cada processo abre o vídeo por conta própria)
+            if video_chunks and video_chunks > 1:
+                if cap is not None:
+                    cap.release()
+                video = video_path
+            else:
+                video = capture()
+            preview = preview_scale is not None or preview_roi is not None
+            annotated = outdir / ("bola_preview.mp4" if preview else "bola_annotado.mp4")
+            frame_files = annotate_video(video, df, str(annotated), fps, df_cvat,
+                                         key_frames=key_frames, workers=video_threads,
+                                         chunks=video_chunks, text_cache=text_cache,
+                                         preview_scale=preview_scale, preview_roi=preview_roi,
+                                         info=info, tracks=extra_tracks, path=path)
+        elif key_frames:
+            # sem vídeo anotado, só os frames-chave pedidos são lidos
+            frame_files = extract_key_frames(capture(), df, outdir, df_cvat, fps=fps,
+                                             frames=[(idx, path.name) for idx, path in key_frames],
+                                             info=info, tracks=extra_tracks, path=path)
+    finally:
+        # as funções de anotação liberam a captura que recebem, mas release() repetido não faz
+        # nada: liberar aqui cobre qualquer falha entre a abertura e a entrega da captura
+        if cap is not None:
+            cap.release()
 
     return {
         "series_csv": outdir / "series.csv",
         "derivation_txt": outdir / "derivacao_posicao.txt",
-        "trajectory_png": outdir / "trajetoria_3d.png",
-        "velocity_png": outdir / "velocidade_componentes.png",
-        "acceleration_png": outdir / "aceleracao_componentes.png",
-        "annotated_video": outdir / "bola_annotado.mp4",
+        "trajectory_png": pngs["trajectory_png"],
+        "velocity_png": pngs["velocity_png"],
+        "acceleration_png": pngs["acceleration_png"],
+        "tracked_csv": tracked,
+        "series_tracks_csv": outdir / "series_tracks.csv" if batch is not None else None,
+        "annotated_video": annotated,
+        "overlay_vtt": sidecar.get("vtt"),
+        "overlay_ass": sidecar.get("ass"),
+        "overlay_npz": sidecar.get("npz"),
         "key_frames": frame_files,
         "dataframe": df,
-        "parameters": params
+        "parameters": params,
+        "trajectory": trajectory,
+        "tracks": batch,
+        "fit": fitted,
+        "reprojection_csv": outdir / "reprojecao.csv" if reprojection else None,
+        "reprojection": rep_stats,
+        "resample_csv": outdir / "series_resample.csv" if resample else None,
+        "animation_mp4": anim["path"] if anim else None,
+        "animation": anim,
     }
@@ -0,0 +1,188 @@
+"""
+módulo com compositor de overlay e cache lru de textos rasterizados
+
+cada rótulo distinto (texto + escala + cores + espessuras, contorno e preenchimento juntos) vira
+um sprite alfa pré-multiplicado, medido uma vez desenhando cada camada do putText sobre fundo
+preto. nos frames seguintes só a caixa do rótulo é misturada no frame, com duas chamadas do
+opencv em uint8 (fundo * (1 - alfa) + cor pré-multiplicada):
+    cv2.multiply(caixa, inv, scale=1/255) e cv2.add(caixa, pre)
+o resultado difere do desenho direto por arredondamento (1 nível) e, nos poucos pixels onde o
+putText mistura o mesmo traço duas vezes (traços que se cruzam), um pouco mais; é uma aproximação
+visual, por isso o cache é opcional (text_cache). benchmark_compositor mede o ganho
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class OverlayCompositor:
+    """
+    Desenha primitivas de overlay usando um cache LRU de sprites alfa de texto.
+
+    Args:
+        max_sprites: Quantidade máxima de rótulos mantidos no cache
+        admit: Vezes que um rótulo precisa aparecer para virar sprite (rótulos que mudam a cada
+            frame, como o do número do frame, ficam no putText sem custo de medição)
+
+    Rótulos cortados pela borda do frame continuam indo direto para o putText. Pode ser
+    compartilhado entre threads.
+    """
+
+    def __init__(self, max_sprites=512, admit=2):
+        self.max_sprites = int(max_sprites)
+        self.admit = max(1, int(admit))
+        self._sprites = OrderedDict()
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def draw(self, frame, prims):
+        # textos seguidos com mesmo texto e origem (contorno + preenchimento) viram um único sprite
+        h, w = frame.shape[:2]
+        blend = frame.dtype == np.uint8 and frame.ndim == 3 and frame.shape[2] == 3
+        i = 0
+        n = len(prims)
+        while i < n:
+            prim = prims[i]
+            if prim[0] != "text":
+                _, center, radius, color, thickness = prim
+                cv2.circle(frame, center, radius, color, thickness)
+                i += 1
+                continue
+
+            j = i + 1
+            while j < n and prims[j][0] == "text" and prims[j][1:3] == prim[1:3]:
+                j += 1
+            group = prims[i:j]
+            i = j
+
+            org = prim[2]
+            sprite = self._sprite((prim[1],) + tuple(p[3:] for p in group), group) if blend else None
+            if sprite is not None:
+                y0, y1, x0, x1 = sprite.box
+                if org[1] + y0 >= 0 and org[0] + x0 >= 0 and org[1] + y1 < h and org[0] + x1 < w:
+                    sprite.blend(frame, org)
+                    continue
+
+            # sem sprite ou cortado pela borda: desenho direto
+            for _, txt, o, scale, color, thickness in group:
+                cv2.putText(frame, txt, o, FONT, scale, color, thickness)
+
+    def _sprite(self, key, group):
+        # sprite do rótulo, ou None enquanto ele ainda não apareceu admit vezes
+        with self._lock:
+            if key in self._sprites:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return self._sprites[key]
+            self.misses += 1
+            count = self._seen.pop(key, 0) + 1
+            if count < self.admit:
+                self._seen[key] = count
+                while len(self._seen) > 4 * self.max_sprites:
+                    self._seen.popitem(last=False)
+                return None
+
+        sprite = _rasterize(group)
+        with self._lock:
+            self._sprites[key] = sprite
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return sprite
+
+
+class _Sprite:
+    # rótulo medido na caixa dos pixels cobertos (posição relativa à origem do texto):
+    # inv = 255 * (1 - alfa) e pre = cor pré-multiplicada, ambos uint8 (altura, largura, 3)
+    __slots__ = ("box", "inv", "pre")
+
+    def __init__(self, box, inv, pre):
+        self.box = box
+        self.inv, self.pre = inv, pre
+
+    def blend(self, frame, org):
+        # mistura o sprite no frame com a origem do texto em org (caixa inteira dentro do frame)
+        y0, y1, x0, x1 = self.box
+        roi = frame[org[1] + y0:org[1] + y1 + 1, org[0] + x0:org[0] + x1 + 1]
+        cv2.multiply(roi, self.inv, dst=roi, scale=1.0 / 255)
+        cv2.add(roi, self.pre, dst=roi)
+
+
+def _rasterize(group):
+    # mede o grupo de textos numa tela pequena: a cobertura de cada camada sobre fundo preto é o
+    # alfa dela; as camadas são compostas em ordem (contorno, depois preenchimento) num alfa só
+    txt = group[0][1]
+    width = height = base = pad = 0
+    for _, _, _, scale, _, thickness in group:
+        (w, h), b = cv2.getTextSize(txt, FONT, scale, thickness)
+        width, height, base = max(width, w), max(height, h), max(base, b)
+        pad = max(pad, thickness + 2)
+
+    shape = (height + base + 2 * pad, width + 2 * pad)
+    org = (pad, pad + height)
+    inv = np.ones(shape + (1,), dtype=np.float32)
+    pre = np.zeros(shape + (3,), dtype=np.float32)
+    cover = np.empty(shape, dtype=np.uint8)
+    for _, _, _, scale, color, thickness in group:
+        cover[...] = 0
+        cv2.putText(cover, txt, org, FONT, scale, 255, thickness)
+        a = cover[:, :, None] * np.float32(1 / 255)
+        inv *= 1 - a
+        pre *= 1 - a
+        pre += a * np.array(color[:3], dtype=np.float32)
+
+    ys, xs = np.nonzero(inv[:, :, 0] < 1)
+    if len(ys) == 0:
+        return None
+    ya, yb, xa, xb = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    box = (int(ya - org[1]), int(yb - 1 - org[1]), int(xa - org[0]), int(xb - 1 - org[0]))
+    inv = np.repeat(np.rint(inv[ya:yb, xa:xb] * 255), 3, axis=2).astype(np.uint8)
+    pre = np.rint(pre[ya:yb, xa:xb]).astype(np.uint8)
+    return _Sprite(box, inv, pre)
+
+
+def benchmark_compositor(size=(1920, 1080), frames=300, fps=30.0):
+    """
+    Tempo de desenho por frame do overlay com putText direto contra o OverlayCompositor.
+
+    Args:
+        size: Tamanho (largura, altura) do frame
+        frames: Frames desenhados em cada medida
+        fps: Frames por segundo da série usada no overlay
+
+    Returns:
+        dict: microssegundos por frame (puttext_us, sprite_us) com só rótulos repetidos e com o overlay de um lançamento (overlay_*)
+    """
+    from .model import FlightModel, Trajectory
+    from .video_annot import build_overlay_table, draw_primitives, overlay_primitives
+
+    w, h = int(size[0]), int(size[1])
+    frame = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+    df = Trajectory.build(frames, FlightModel.from_anchors(frames // 3, 2 * frames // 3, fps,
+                                                           (0.0, 7.0, 2.0), (6.0, 6.0, 0.0))).to_frame()
+    table = build_overlay_table(df)
+    table[:, 7] = np.linspace(0.2 * w, 0.8 * w, len(table))
+    table[:, 8] = 0.5 * h
+    overlay = [overlay_primitives(i, fps, table[i]) for i in range(frames)]
+    # rótulos repetidos: tudo menos o texto do número do frame, que muda sempre
+    static = [p for p in overlay[0] if p[0] != "text" or not p[1].startswith("frame")]
+    static = [static] * frames
+
+    results = {"frames": frames}
+    for name, series in (("", static), ("overlay_", overlay)):
+        for mode in ("puttext", "sprite"):
+            comp = OverlayCompositor()
+            draw = draw_primitives if mode == "puttext" else comp.draw
+            draw(frame, series[0])
+            start = time.perf_counter()
+            for prims in series:
+                draw(frame, prims)
+            results[f"{name}{mode}_us"] = (time.perf_counter() - start) / frames * 1e6
+    return results
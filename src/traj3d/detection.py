@@ -1,46 +1,368 @@
 """
 módulo para detecção de janela de voo e heurísticas
+
+as funções por DataFrame trabalham direto nos arrays numpy das colunas (sem copiar o
+DataFrame); as versões em lote recebem vários tracks num array (tracks x frames)
+preenchido com nan após o fim de cada track, junto com o comprimento de cada linha;
+OnlineFlightDetector aplica as mesmas regras ponto a ponto, para anotações que chegam em fluxo
 """
 
+import math
+
 import numpy as np
 
+# suavizações aceitas antes de procurar os eventos
+SMOOTHING = (None, "median", "savgol")
+
+
+def _columns(df_xy):
+    # frames e y2d do DataFrame como arrays, sem cópia quando possível
+    return df_xy["frame"].to_numpy(), df_xy["y2d"].to_numpy(dtype=float)
+
 
 def detect_launch_frame(df_xy, threshold=-0.5):
     # procura o primeiro frame com queda mais intensa em y2d
     # observação: em coordenadas de imagem, y cresce para baixo; quando a bola sobe, y diminui
-    d = df_xy.copy()
-    d["dy"] = d["y2d"].diff()
-    m = d["dy"] < threshold
-    
-    if m.any():
-        return int(d.loc[m, "frame"].iloc[0])
-    
+    frames, y = _columns(df_xy)
+    idx = np.flatnonzero(np.diff(y) < threshold)
+
+    if len(idx):
+        return int(frames[idx[0] + 1])
+
     # se nada ficar muito evidente, usamos o primeiro frame anotado
-    return int(d["frame"].iloc[0])
+    return int(frames[0])
 
 
 def detect_landing_frame(df_xy, threshold=0.5):
     # detecta o frame de pouso da bola baseado na subida mais intensa em y2d
-    d = df_xy.copy()
-    d["dy"] = d["y2d"].diff()
-    m = d["dy"] > threshold
-    
-    if m.any():
-        return int(d.loc[m, "frame"].iloc[-1])  # último frame com subida
-    
+    frames, y = _columns(df_xy)
+    idx = np.flatnonzero(np.diff(y) > threshold)
+
+    if len(idx):
+        return int(frames[idx[-1] + 1])  # último frame com subida
+
     # se nada ficar muito evidente, usamos o último frame anotado
-    return int(d["frame"].iloc[-1])
+    return int(frames[-1])
 
 
 def find_peak_height_frame(df_xy):
     # encontra o frame onde a bola atinge a altura máxima (menor y2d)
-    min_y_idx = df_xy["y2d"].idxmin()
-    return int(df_xy.loc[min_y_idx, "frame"])
+    frames, y = _columns(df_xy)
+    return int(frames[np.nanargmin(y)])
 
 
 def calculate_flight_duration(df_xy, fps):
     # calcula a duração estimada do voo baseado nos frames de lançamento e pouso
-    launch_frame = detect_launch_frame(df_xy)
-    landing_frame = detect_landing_frame(df_xy)
-    duration_frames = landing_frame - launch_frame
+    frames, y = _columns(df_xy)
+    events = detect_flight_events_batch(frames[None, :], y[None, :], [len(y)])
+    duration_frames = events["landing"][0] - events["launch"][0]
     return duration_frames / fps
+
+
+def pad_tracks(tracks):
+    """
+    Empilha tracks de tamanhos diferentes num array (tracks x frames) com nan no fim.
+
+    Args:
+        tracks: Sequência de pares (frames, y2d) ou de dicts com "frame" e "y2d"
+                (pontos com y2d ou x2d nan são descartados antes)
+
+    Returns:
+        tuple: (frames int64, y2d float64, lengths), frames preenchido com -1
+    """
+    rows = []
+    for track in tracks:
+        if isinstance(track, dict):
+            f, y = np.asarray(track["frame"]), np.asarray(track["y2d"], dtype=float)
+            ok = ~np.isnan(y)
+            if "x2d" in track:
+                ok &= ~np.isnan(np.asarray(track["x2d"], dtype=float))
+        else:
+            f, y = np.asarray(track[0]), np.asarray(track[1], dtype=float)
+            ok = ~np.isnan(y)
+        rows.append((f[ok], y[ok]))
+
+    lengths = np.array([len(f) for f, _ in rows], dtype=np.int64)
+    width = int(lengths.max()) if len(rows) else 0
+    frames = np.full((len(rows), width), -1, dtype=np.int64)
+    y2d = np.full((len(rows), width), np.nan)
+    for k, (f, y) in enumerate(rows):
+        frames[k, :len(f)] = f
+        y2d[k, :len(y)] = y
+    return frames, y2d, lengths
+
+
+def _edge_shift(y, lengths, offset):
+    # y deslocado de offset colunas, repetindo a borda de cada linha (modo "nearest")
+    m = y.shape[1]
+    last = np.maximum(np.asarray(lengths)[:, None] - 1, 0)
+    idx = np.clip(np.arange(m)[None, :] + offset, 0, last)
+    return np.take_along_axis(y, idx, axis=1)
+
+
+def savgol_coeffs(window, polyorder):
+    # coeficientes do filtro de savitzky-golay (suavização, derivada zero) para janela ímpar centrada
+    half = window // 2
+    x = np.arange(-half, half + 1, dtype=float)
+    A = np.vander(x, polyorder + 1, increasing=True)
+    return np.linalg.pinv(A)[0]
+
+
+def smooth_tracks(y2d, lengths, method="median", window=5, polyorder=2):
+    """
+    Suaviza cada linha do array de tracks sem misturar com o preenchimento.
+
+    Args:
+        y2d: Array (tracks x frames) com nan após o fim de cada linha
+        lengths: Comprimento válido de cada linha
+        method: "median" (mediana móvel) ou "savgol" (savitzky-golay)
+        window: Tamanho ímpar da janela
+        polyorder: Grau do polinômio do savitzky-golay
+
+    Returns:
+        ndarray: Array com o mesmo formato; as bordas repetem o valor extremo da linha
+    """
+    if method is None:
+        return y2d
+    if method not in SMOOTHING:
+        raise ValueError(f"suavização desconhecida: {method}")
+    window = int(window)
+    if window < 3 or window % 2 == 0:
+        raise ValueError(f"janela de suavização deve ser ímpar e >= 3, recebi: {window}")
+
+    y2d = np.asarray(y2d, dtype=float)
+    half = window // 2
+    if method == "median":
+        stack = np.stack([_edge_shift(y2d, lengths, o) for o in range(-half, half + 1)])
+        out = np.median(stack, axis=0)
+    else:
+        if polyorder >= window:
+            raise ValueError("grau do savitzky-golay deve ser menor que a janela")
+        coeffs = savgol_coeffs(window, polyorder)
+        out = np.zeros_like(y2d)
+        for c, o in zip(coeffs, range(-half, half + 1)):
+            out += c * _edge_shift(y2d, lengths, o)
+
+    # o preenchimento continua nan
+    out[np.arange(y2d.shape[1])[None, :] >= np.asarray(lengths)[:, None]] = np.nan
+    return out
+
+
+def detect_flight_events_batch(frames, y2d, lengths, launch_threshold=-0.5, landing_threshold=0.5,
+                               smooth=None, window=5, polyorder=2):
+    """
+    Lançamento, pico e pouso de vários tracks numa única chamada vetorizada.
+
+    Mesmas heurísticas de detect_launch_frame, find_peak_height_frame e
+    detect_landing_frame aplicadas a cada linha.
+
+    Args:
+        frames: Array (tracks x frames) com o número do frame de cada ponto
+        y2d: Array (tracks x frames) com y2d, nan após o fim de cada linha
+        lengths: Comprimento válido de cada linha
+        launch_threshold: Queda mínima de y2d entre pontos seguidos para o lançamento
+        landing_threshold: Subida mínima de y2d entre pontos seguidos para o pouso
+        smooth: None, "median" ou "savgol" (suaviza y2d antes da detecção)
+        window: Janela da suavização
+        polyorder: Grau do savitzky-golay
+
+    Returns:
+        dict: launch, peak, landing (arrays int, -1 em linhas vazias)
+    """
+    frames = np.asarray(frames)
+    y2d = np.asarray(y2d, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    k, m = y2d.shape
+    if m == 0:
+        none = np.full(k, -1, dtype=np.int64)
+        return {"launch": none, "peak": none.copy(), "landing": none.copy()}
+    y2d = smooth_tracks(y2d, lengths, smooth, window, polyorder)
+
+    rows = np.arange(k)
+    empty = lengths <= 0
+    first = frames[:, 0]
+    last = frames[rows, np.maximum(lengths - 1, 0)]
+
+    # dy[:, i] = y[i+1] - y[i] (a última coluna fica nan); comparações com nan
+    # (preenchimento) são sempre falsas
+    dy = np.diff(y2d, axis=1, append=np.nan)
+    fall = dy < launch_threshold
+    rise = dy > landing_threshold
+
+    # primeira queda forte e última subida forte; o evento é o frame seguinte ao salto
+    launch = np.where(fall.any(axis=1), frames[rows, np.minimum(np.argmax(fall, axis=1) + 1, m - 1)], first)
+    last_rise = (m - 1) - np.argmax(rise[:, ::-1], axis=1)
+    landing = np.where(rise.any(axis=1), frames[rows, np.minimum(last_rise + 1, m - 1)], last)
+
+    # menor y2d (primeira ocorrência), ignorando o preenchimento
+    peak = frames[rows, np.argmin(np.where(np.isnan(y2d), np.inf, y2d), axis=1)]
+
+    return {
+        "launch": np.where(empty, -1, launch).astype(np.int64),
+        "peak": np.where(empty, -1, peak).astype(np.int64),
+        "landing": np.where(empty, -1, landing).astype(np.int64),
+    }
+
+
+def detect_flight_windows_batch(frames, y2d, lengths, **kwargs):
+    # janelas do voo (f0, f1) de vários tracks: mesma regra de detect_flight_window
+    # (-1 nas linhas vazias)
+    frames = np.asarray(frames)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    events = detect_flight_events_batch(frames, y2d, lengths, **kwargs)
+    empty = lengths <= 0
+    if frames.shape[1] == 0:
+        return events["launch"], events["landing"]
+
+    first = frames[:, 0]
+    last = frames[np.arange(len(lengths)), np.maximum(lengths - 1, 0)]
+    f0 = np.maximum(first, events["launch"])
+    f1 = np.maximum(f0 + 1, last)
+    return np.where(empty, -1, f0), np.where(empty, -1, f1)
+
+
+def detect_flight_window(df_xy, smooth=None, window=5):
+    # janela do voo (f0, f1): lançamento detectado (nunca antes do primeiro ponto válido)
+    # até o último ponto válido, com pelo menos um frame de duração
+    frames, y2d, lengths = pad_tracks([{"frame": df_xy["frame"].to_numpy(),
+                                        "x2d": df_xy["x2d"].to_numpy(dtype=float),
+                                        "y2d": df_xy["y2d"].to_numpy(dtype=float)}])
+    if lengths[0] == 0:
+        raise RuntimeError("cvat sem pontos válidos")
+    f0, f1 = detect_flight_windows_batch(frames, y2d, lengths, smooth=smooth, window=window)
+    return int(f0[0]), int(f1[0])
+
+
+class OnlineFlightDetector:
+    """
+    Detector incremental de lançamento, pico e pouso para pontos que chegam um a um.
+
+    Usa as mesmas heurísticas da detecção em lote (primeira queda forte de y2d, menor
+    y2d, última subida forte) com trabalho e memória O(1) por ponto, e emite cada evento
+    uma única vez, na ordem lançamento, pico, pouso:
+
+    - lançamento: a queda só é confirmada se os `lag` pontos seguintes continuam acima do
+      nível de antes dela (y2d abaixo dele por mais que launch_threshold); um pico de um
+      frame no ruído é descartado e a busca segue para a próxima queda
+    - pico: menor y2d depois do lançamento, confirmado quando max(lag, 1) pontos
+      seguintes não descem abaixo dele
+    - pouso: última subida forte depois do pico, confirmada quando max(lag, 1) pontos
+      seguintes chegam sem a bola descer mais que landing_threshold (a bola parou)
+
+    finish() emite o que ainda estiver pendente. Em tracks sem ruído desse tipo, e com voos
+    mais longos que a janela, os eventos coincidem com detect_flight_events_batch; com
+    picos de um frame ou mais de um mínimo o detector fica com o primeiro evento
+    confirmado e o lote não. Com lag 0 ou 1 o pouso pode ser confirmado logo depois do
+    apogeu, onde a bola desce menos que o limiar por frame.
+
+    Args:
+        launch_threshold: Queda mínima de y2d entre pontos seguidos para o lançamento
+        landing_threshold: Subida mínima de y2d entre pontos seguidos para o pouso
+        lag: Pontos de confirmação antes de emitir cada evento (0 emite o lançamento na
+            própria queda, sem filtrar picos)
+
+    Eventos são tuplas (tipo, frame do evento, frame em que foi confirmado), com tipo
+    "launch", "peak" ou "landing".
+    """
+
+    def __init__(self, launch_threshold=-0.5, landing_threshold=0.5, lag=3):
+        self.launch_threshold = launch_threshold
+        self.landing_threshold = landing_threshold
+        self.lag = max(0, int(lag))
+        self.count = 0
+        self.first_frame = None
+        self.last_frame = None
+        self.last_y = None
+        # lançamento: candidato (frame, índice e y2d de antes da queda) até ser emitido
+        self.launch = None
+        self._launch_idx = None
+        self._launch_base = None
+        self._launch_sent = False
+        # pico: menor y2d até agora
+        self.peak = None
+        self._peak_y = None
+        self._peak_idx = None
+        self._peak_sent = False
+        # pouso: última subida forte até agora e o ponto desde o qual a bola não desce mais
+        self.landing = None
+        self._landing_idx = None
+        self._rest_idx = None
+        self._rest_y = None
+        self._landing_sent = False
+        self.finished = False
+
+    def update(self, frame, x2d, y2d):
+        # recebe um ponto e devolve a lista de eventos confirmados por ele
+        if self.finished:
+            raise RuntimeError("detector já finalizado")
+        if x2d is None or y2d is None or math.isnan(x2d) or math.isnan(y2d):
+            return []
+        frame, y2d = int(frame), float(y2d)
+        idx = self.count
+        self.count += 1
+        if self.first_frame is None:
+            self.first_frame = frame
+        self.last_frame = frame
+
+        if self.last_y is not None:
+            dy = y2d - self.last_y
+            if not self._launch_sent:
+                # a bola voltou ao nível de antes da queda: era ruído, descarta o candidato
+                if self.launch is not None and y2d >= self._launch_base + self.launch_threshold:
+                    self.launch = None
+                if self.launch is None and dy < self.launch_threshold:
+                    self.launch, self._launch_idx, self._launch_base = frame, idx, self.last_y
+            if not self._landing_sent:
+                if dy > self.landing_threshold:
+                    self.landing, self._landing_idx = frame, idx
+                # subida forte ou a bola ainda descendo desde a referência: recomeça a janela
+                if dy > self.landing_threshold or (self._rest_y is not None
+                                                   and y2d - self._rest_y > self.landing_threshold):
+                    self._rest_idx, self._rest_y = idx, y2d
+        self.last_y = y2d
+
+        if not self._peak_sent and (self._peak_y is None or y2d < self._peak_y):
+            self.peak, self._peak_y, self._peak_idx = frame, y2d, idx
+
+        return self._confirm(idx, frame)
+
+    def _confirm(self, idx, frame):
+        # emite os candidatos que já têm a janela de confirmação depois de si
+        events = []
+        if self.launch is not None and not self._launch_sent and idx - self._launch_idx >= self.lag:
+            self._launch_sent = True
+            events.append(("launch", self.launch, frame))
+        if (self._launch_sent and not self._peak_sent and self._peak_idx >= self._launch_idx
+                and idx - self._peak_idx >= max(self.lag, 1)):
+            self._peak_sent = True
+            events.append(("peak", self.peak, frame))
+        if (self._peak_sent and self.landing is not None and not self._landing_sent
+                and self._landing_idx > self._peak_idx and idx - self._rest_idx >= max(self.lag, 1)):
+            self._landing_sent = True
+            events.append(("landing", self.landing, frame))
+        return events
+
+    def finish(self):
+        # fim do fluxo: emite o que estiver pendente, com os valores padrão da detecção
+        # em lote (primeiro frame sem lançamento, último frame sem pouso)
+        if self.finished or self.count == 0:
+            self.finished = True
+            return []
+        self.finished = True
+        if self.launch is None:
+            self.launch = self.first_frame
+        if self.landing is None:
+            self.landing = self.last_frame
+        pending = [("launch", self._launch_sent), ("peak", self._peak_sent), ("landing", self._landing_sent)]
+        self._launch_sent = self._peak_sent = self._landing_sent = True
+        return [(kind, getattr(self, kind), self.last_frame) for kind, sent in pending if not sent]
+
+    def result(self):
+        # eventos emitidos (ou os candidatos atuais) no formato da detecção em lote (-1 sem pontos)
+        if self.count == 0:
+            return {"launch": -1, "peak": -1, "landing": -1}
+        return {
+            "launch": self.launch if self.launch is not None else self.first_frame,
+            "peak": self.peak,
+            "landing": self.landing if self.landing is not None else self.last_frame,
+        }
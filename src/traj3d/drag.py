@@ -0,0 +1,353 @@
+"""
+módulo com o modelo de voo com arrasto quadrático (e efeito magnus opcional)
+
+aceleração de cada bola:
+    a = (0, 0, -g) - k |v| v + s (w x v)
+com k = rho cd A / (2 m) (arrasto) e s = rho cl A r / (2 m) (magnus, w = rotação em rad/s)
+
+a integração é rk4 de passo fixo (substeps passos por frame) vetorizada sobre um lote de
+bolas: o estado fica em arrays (3, bolas) e cada passo é um punhado de operações de array,
+então o custo por bola-passo cai com o tamanho do lote. a velocidade de lançamento é achada
+por tiro (newton em lote) para a bola sair de p0 em f0 e chegar a p1 em f1, as mesmas
+âncoras do modelo sem arrasto; antes de f0 a bola fica parada em p0 e depois de f1 no ponto
+final, com velocidade e aceleração zero, como em build_kinematics
+"""
+
+import numpy as np
+
+from .model import SERIES_COLUMNS, Trajectory
+
+
+def ball_coefficients(mass=0.27, radius=0.11, cd=0.47, cl=1.0, rho=1.225):
+    """
+    Coeficientes por unidade de massa do arrasto e do magnus.
+
+    Args:
+        mass: Massa da bola (kg)
+        radius: Raio da bola (m)
+        cd: Coeficiente de arrasto (0 desliga o arrasto)
+        cl: Coeficiente de sustentação do magnus (0 desliga o magnus)
+        rho: Densidade do ar (kg/m^3)
+
+    Returns:
+        tuple: (k, s) para a = -k |v| v + s (w x v)
+    """
+    area = np.pi * radius * radius
+    return 0.5 * rho * cd * area / mass, 0.5 * rho * cl * area * radius / mass
+
+
+def _column(v, n, dim=None):
+    # parâmetro escalar ou por bola em array (n,) ou (3, n)
+    v = np.asarray(v, dtype=float)
+    if dim is None:
+        return np.broadcast_to(v, (n,)).astype(float)
+    return np.ascontiguousarray(np.broadcast_to(v.reshape(-1, dim) if v.ndim else v, (n, dim)).T)
+
+
+class _Dynamics:
+    # derivada das velocidades com buffers reaproveitados entre os passos do rk4
+    def __init__(self, g, drag, magnus, spin):
+        self.g = g
+        self.drag = drag
+        self.use_drag = bool(np.any(drag))
+        self.use_magnus = bool(np.any(magnus)) and bool(np.any(spin))
+        # s w por bola (3, n): o termo de magnus vira s w x v
+        self.sw = magnus * spin
+        self._sp = np.empty(drag.shape)
+        self._tmp = np.empty(drag.shape)
+
+    def acc(self, v, out):
+        # out (3, n) = aceleração para as velocidades v (3, n)
+        tmp = self._tmp
+        if self.use_drag:
+            sp = self._sp
+            np.multiply(v[0], v[0], out=sp)
+            for j in (1, 2):
+                np.multiply(v[j], v[j], out=tmp)
+                sp += tmp
+            np.sqrt(sp, out=sp)
+            sp *= self.drag
+            np.negative(sp, out=sp)
+            np.multiply(v, sp, out=out)
+        else:
+            out[...] = 0.0
+        if self.use_magnus:
+            w = self.sw
+            for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+                np.multiply(w[j], v[k], out=tmp)
+                out[i] += tmp
+                np.multiply(w[k], v[j], out=tmp)
+                out[i] -= tmp
+        out[2] -= self.g
+        return out
+
+
+def _rk4_steps(dyn, pos, vel, dt, steps, active=None):
+    # avança pos/vel (3, n) por steps passos de rk4; active (n,) congela as bolas fora do voo
+    n = pos.shape[1]
+    k1, k2, k3, k4 = (np.empty((3, n)) for _ in range(4))
+    vt = np.empty((3, n))
+    dpos = np.empty((3, n))
+    dvel = np.empty((3, n))
+    h = 0.5 * dt
+    for _ in range(int(steps)):
+        dyn.acc(vel, k1)
+        np.multiply(k1, h, out=vt)
+        vt += vel
+        dyn.acc(vt, k2)
+        # dpos acumula v + 2 v2 + 2 v3 + v4 (v2 = vel + h k1, v3 = vel + h k2, v4 = vel + dt k3)
+        np.multiply(vt, 2.0, out=dpos)
+        dpos += vel
+        np.multiply(k2, h, out=vt)
+        vt += vel
+        dyn.acc(vt, k3)
+        vt *= 2.0
+        dpos += vt
+        np.multiply(k3, dt, out=vt)
+        vt += vel
+        dyn.acc(vt, k4)
+        dpos += vt
+        dpos *= dt / 6.0
+        np.add(k2, k3, out=dvel)
+        dvel *= 2.0
+        dvel += k1
+        dvel += k4
+        dvel *= dt / 6.0
+        if active is None:
+            pos += dpos
+            vel += dvel
+        else:
+            np.add(pos, dpos, out=pos, where=active)
+            np.add(vel, dvel, out=vel, where=active)
+    return pos, vel
+
+
+def _integrate_until(dyn, pos, vel, h, steps):
+    # integra cada bola pelo seu número de passos (passo h por bola), todas juntas
+    dt = h[None, :]
+    active = np.ones(len(h), dtype=bool)
+    for k in range(int(steps.max())):
+        np.less(k, steps, out=active)
+        _rk4_steps(dyn, pos, vel, dt, 1, None if active.all() else active[None, :])
+    return pos, vel
+
+
+def _end_and_jacobian(dyn, p0, v0, h, steps, eps):
+    # posição final das bolas e jacobiano d(fim)/d(v0) (n, 3, 3) por diferenças finitas; as
+    # bolas e as três perturbações de cada uma (dyn com 4n bolas) são integradas juntas
+    n = len(p0)
+    vel = np.tile(v0.T, (1, 4))
+    for j in range(3):
+        vel[j, (j + 1) * n:(j + 2) * n] += eps
+    pos = np.tile(p0.T, (1, 4))
+    _integrate_until(dyn, pos, vel, np.tile(h, 4), np.tile(steps, 4))
+    end = pos[:, :n].T
+    J = np.stack([(pos[:, (j + 1) * n:(j + 2) * n].T - end) / eps[:, None] for j in range(3)], axis=2)
+    return end, J
+
+
+def shoot_launch_velocity(p0, p1, T, g=9.81, drag=0.0, magnus=0.0, spin=(0.0, 0.0, 0.0),
+                          dt=1.0 / 240.0, iterations=20, tol=1e-9):
+    """
+    Velocidade de lançamento para cada bola sair de p0 e estar em p1 depois de T segundos.
+
+    Newton em lote numa grade grossa (1/8 dos passos, jacobiano por diferenças finitas) e
+    depois newton de corda na grade de dt com o último jacobiano, integrando só as bolas.
+
+    Args:
+        p0: Posições iniciais (n, 3)
+        p1: Posições finais (n, 3)
+        T: Tempos de voo (n,) em segundos
+        g: Gravidade
+        drag: k de ball_coefficients, escalar ou (n,)
+        magnus: s de ball_coefficients, escalar ou (n,)
+        spin: Rotação (rad/s), (3,) ou (n, 3)
+        dt: Passo de integração (T é dividido em passos inteiros o mais perto possível)
+        iterations: Máximo de iterações em cada grade
+        tol: Erro de posição final (m) para parar
+
+    Returns:
+        ndarray: (n, 3) velocidades de lançamento
+    """
+    p0 = np.atleast_2d(np.asarray(p0, dtype=float))
+    p1 = np.atleast_2d(np.asarray(p1, dtype=float))
+    n = len(p0)
+    T = _column(T, n)
+    steps = np.maximum(np.rint(T / dt), 1).astype(int)
+
+    # chute: solução sem arrasto
+    v0 = (p1 - p0) / T[:, None]
+    v0[:, 2] += 0.5 * g * T
+    if not np.any(drag) and not (np.any(magnus) and np.any(spin)):
+        return v0
+
+    rep = lambda v, dim=None: np.tile(_column(v, n, dim), 4) if dim is None else np.tile(_column(v, n, dim), (1, 4))
+    dyn4 = _Dynamics(g, rep(drag), rep(magnus), rep(spin, 3))
+    coarse = np.maximum(steps // 8, 4)
+    for _ in range(int(iterations)):
+        eps = 1e-6 * (1.0 + np.abs(v0).max(axis=1))
+        end, J = _end_and_jacobian(dyn4, p0, v0, T / coarse, coarse, eps)
+        miss = end - p1
+        v0 = v0 - np.linalg.solve(J, miss[..., None])[..., 0]
+        if np.abs(miss).max() <= 1e-6:
+            break
+
+    # a diferença entre as grades é pequena: o jacobiano da grade grossa serve de corda
+    Jinv = np.linalg.inv(J)
+    dyn = _Dynamics(g, _column(drag, n), _column(magnus, n), _column(spin, n, 3))
+    for _ in range(int(iterations)):
+        pos = p0.T.copy()
+        vel = v0.T.copy()
+        _integrate_until(dyn, pos, vel, T / steps, steps)
+        miss = pos.T - p1
+        if np.abs(miss).max() <= tol:
+            break
+        v0 = v0 - (Jinv @ miss[..., None])[..., 0]
+    return v0
+
+
+def _simulate_block(rec, f0, f1, fps, p0, v0, dyn, substeps):
+    # preenche rec (frames, 11, m) de um bloco de bolas, um frame por vez (escritas contíguas)
+    m = len(p0)
+    dt = 1.0 / (fps * substeps)
+    rec[:, 0, :] = (np.arange(len(rec)) / fps)[:, None]
+    # antes do lançamento: parada em p0
+    rec[:, 1:4, :] = p0.T[None]
+    rec[:, 4:, :] = 0.0
+
+    pos = p0.T.copy()
+    vel = v0.T.copy()
+    acc = np.empty((3, m))
+    active = np.empty(m, dtype=bool)
+    for j in range(max(int(f0.min()), 0), min(int(f1.max()), len(rec))):
+        np.logical_and(f0 <= j, j < f1, out=active)
+        if not active.any():
+            continue
+        dyn.acc(vel, acc)
+        if active.all():
+            rec[j, 1:4], rec[j, 4:7], rec[j, 8:11] = pos, vel, acc
+            _rk4_steps(dyn, pos, vel, dt, substeps)
+            continue
+        rec[j, 1:4, active] = pos[:, active].T
+        rec[j, 4:7, active] = vel[:, active].T
+        rec[j, 8:11, active] = acc[:, active].T
+        _rk4_steps(dyn, pos, vel, dt, substeps, active[None, :])
+
+    # depois da chegada: parada no ponto final integrado
+    after = np.arange(len(rec))[:, None] >= f1[None, :]
+    rec[:, 1:4, :] = np.where(after[:, None, :], pos[None], rec[:, 1:4, :])
+    np.sqrt(np.einsum("fim,fim->fm", rec[:, 4:7], rec[:, 4:7]), out=rec[:, 7, :])
+    return rec
+
+
+def simulate_flights(total_frames, f0, f1, fps, p0, p1, g=9.81, drag=0.0, magnus=0.0,
+                     spin=(0.0, 0.0, 0.0), substeps=8, v0=None, block=8192):
+    """
+    Séries por frame de várias bolas com arrasto/magnus, integradas juntas.
+
+    Args:
+        total_frames: Número de frames de cada série
+        f0: Frames de lançamento (n,)
+        f1: Frames de chegada (n,)
+        fps: Frames por segundo (comum a todas)
+        p0: Posições de lançamento (n, 3)
+        p1: Posições de chegada (n, 3), usadas para achar a velocidade de lançamento
+        g: Gravidade
+        drag: k de ball_coefficients, escalar ou (n,)
+        magnus: s de ball_coefficients, escalar ou (n,)
+        spin: Rotação (rad/s), (3,) ou (n, 3)
+        substeps: Passos de rk4 por frame
+        v0: Velocidades de lançamento (n, 3); padrão: tiro para chegar em p1 em f1
+        block: Bolas integradas por vez (o estado do bloco cabe no cache)
+
+    Returns:
+        ndarray: (n, frames, 11) com as colunas de model.SERIES_COLUMNS
+        (t, x3d, y3d, z3d, vx, vy, vz, speed, ax, ay, az); a série de cada bola é
+        contígua por coluna, como o buffer de Trajectory
+    """
+    p0 = np.atleast_2d(np.asarray(p0, dtype=float))
+    p1 = np.atleast_2d(np.asarray(p1, dtype=float))
+    n = len(p0)
+    f0 = _column(f0, n).astype(int)
+    f1 = _column(f1, n).astype(int)
+    fps = float(fps)
+    total = int(total_frames)
+    substeps = max(1, int(substeps))
+    drag = _column(drag, n)
+    magnus = _column(magnus, n)
+    spin = _column(spin, n, 3)
+    if v0 is not None:
+        v0 = np.asarray(v0, dtype=float).reshape(n, 3)
+
+    out = np.empty((n, len(SERIES_COLUMNS), total))
+    rec = None
+    for start in range(0, n, max(1, int(block))):
+        sl = slice(start, min(start + int(block), n))
+        w = spin[:, sl]
+        if v0 is None:
+            vb = shoot_launch_velocity(p0[sl], p1[sl], np.maximum(f1[sl] - f0[sl], 1) / fps, g,
+                                       drag[sl], magnus[sl], w.T, dt=1.0 / (fps * substeps))
+        else:
+            vb = v0[sl]
+        if rec is None or rec.shape[2] != len(vb):
+            rec = np.empty((total, len(SERIES_COLUMNS), len(vb)))
+        _simulate_block(rec, f0[sl], f1[sl], fps, p0[sl], vb, _Dynamics(g, drag[sl], magnus[sl], w), substeps)
+        out[sl] = rec.transpose(2, 1, 0)
+    return out.transpose(0, 2, 1)
+
+
+def build_drag_trajectory(total_frames, model, drag=0.0, magnus=0.0, spin=(0.0, 0.0, 0.0), substeps=8):
+    """
+    Trajectory com arrasto/magnus usando as âncoras e a janela de um FlightModel.
+
+    Args:
+        total_frames: Número de frames do vídeo
+        model: FlightModel do voo (as âncoras p0/p1, f0/f1, fps e g)
+        drag: k de ball_coefficients
+        magnus: s de ball_coefficients
+        spin: Rotação (rad/s) (wx, wy, wz)
+        substeps: Passos de rk4 por frame
+
+    Returns:
+        Trajectory: mesma forma de Trajectory.build; model segue como referência sem arrasto
+    """
+    p0 = [model["x0"], model["y0"], model["z0"]]
+    p1 = [model["x1"], model["y1"], model["z1"]]
+    series = simulate_flights(total_frames, [model.f0], [model.f1], model.fps, [p0], [p1],
+                              g=model["g"], drag=drag, magnus=magnus, spin=spin, substeps=substeps)
+    return Trajectory(model, np.asfortranarray(series[0]))
+
+
+def benchmark_drag(balls=(1, 10**3, 10**4, 10**5), frames=60, substeps=8, fps=30.0):
+    """
+    Mede a vazão do integrador (bola-passos de rk4 por segundo) para lotes de tamanhos diferentes.
+
+    Args:
+        balls: Tamanhos de lote
+        frames: Frames de voo de cada bola
+        substeps: Passos de rk4 por frame
+        fps: Frames por segundo
+
+    Returns:
+        list: um dict por lote com os segundos e a vazão com v0 dado e com o tiro até p1
+    """
+    import time
+
+    k, s = ball_coefficients()
+    rng = np.random.default_rng(0)
+    results = []
+    for n in balls:
+        n = int(n)
+        p0 = np.column_stack([rng.uniform(-1, 1, n), 7 + rng.uniform(-1, 1, n), rng.uniform(1, 2, n)])
+        p1 = p0 + np.column_stack([rng.uniform(3, 8, n), rng.uniform(-1, 1, n), -rng.uniform(1, 2, n)])
+        v0 = np.tile([5.0, 0.0, 6.0], (n, 1))
+        steps = n * frames * substeps
+        row = {"balls": n, "ball_steps": steps}
+        for name, init in (("given", v0), ("shoot", None)):
+            start = time.perf_counter()
+            simulate_flights(frames + 1, 0, frames, fps, p0, p1, drag=k, magnus=s, spin=(0.0, 20.0, 5.0),
+                             substeps=substeps, v0=init)
+            row[f"{name}_s"] = time.perf_counter() - start
+            row[f"{name}_msteps"] = steps / row[f"{name}_s"] / 1e6
+        results.append(row)
+    return results
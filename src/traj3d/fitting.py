@@ -0,0 +1,228 @@
+"""
+módulo para ajustar a trajetória 3d aos pontos 2d observados
+
+modelo no trecho de voo (o mesmo de make_position_functions):
+    x(t) = m_x t + q_x,  y(t) = m_y t + q_y,  z(t) = a t^2 + b t + c,  a = -g/2 fixo
+e a observação é a projeção pinhole de (x, y, z) pela câmera de camera.make_camera
+
+o ajuste tem duas etapas, as duas vetorizadas sobre vários lançamentos (linhas de arrays
+lançamentos x amostras, NaN onde não há ponto):
+- mínimos quadrados lineares no erro algébrico (u P2 - P0) X = 0, (v P2 - P1) X = 0, que é
+  linear nos 6 coeficientes e dá o chute inicial em forma fechada
+- gauss-newton amortecido (levenberg-marquardt) no erro de reprojeção em pixels com
+  jacobiano analítico; cada lançamento tem o próprio amortecimento
+"""
+
+import numpy as np
+
+from .camera import projection_matrix, to_camera
+
+FIT_KEYS = ("m_x", "q_x", "m_y", "q_y", "b", "c")
+
+
+def _design(w, t):
+    # linha do sistema para um vetor w (..., 3) aplicado a X(t): [w0 t, w0, w1 t, w1, w2 t, w2]
+    return np.stack([w[..., 0] * t, w[..., 0], w[..., 1] * t, w[..., 1], w[..., 2] * t, w[..., 2]], axis=-1)
+
+
+def _solve(A, rhs, ridge=1e-12):
+    # resolve lotes de sistemas normais 6x6; lançamentos singulares viram NaN
+    scale = np.trace(A, axis1=-2, axis2=-1)[:, None, None] / A.shape[-1]
+    A = A + ridge * np.maximum(scale, 1e-300) * np.eye(A.shape[-1])
+    out = np.full(rhs.shape, np.nan)
+    ok = np.isfinite(A).all(axis=(1, 2)) & np.isfinite(rhs).all(axis=1)
+    if ok.any():
+        out[ok] = np.linalg.solve(A[ok], rhs[ok][..., None])[..., 0]
+    return out
+
+
+def _positions(theta, t, a):
+    # X(t) (k, n, 3) para coeficientes theta (k, 6)
+    th = theta[:, None, :]
+    return np.stack([th[..., 0] * t + th[..., 1], th[..., 2] * t + th[..., 3],
+                     a * t * t + th[..., 4] * t + th[..., 5]], axis=-1)
+
+
+def _residuals(camera, theta, t, uv, valid, a):
+    # erro de reprojeção (k, n, 2) e coordenadas da câmera (k, n, 3); zero onde não há ponto
+    pc = to_camera(camera, _positions(theta, t, a))
+    K = camera["K"]
+    z = np.where(valid, pc[..., 2], 1.0)
+    # pontos atrás da câmera recebem uma profundidade mínima para o passo seguir definido
+    z = np.where(z > 1e-6, z, 1e-6)
+    u = K[0, 0] * pc[..., 0] / z + K[0, 1] * pc[..., 1] / z + K[0, 2]
+    v = K[1, 1] * pc[..., 1] / z + K[1, 2]
+    r = np.stack([u, v], axis=-1) - uv
+    return np.where(valid[..., None], r, 0.0), pc, z
+
+
+def _jacobian(camera, pc, z, t, valid):
+    # d(u, v)/d(theta) analítico (k, n, 2, 6): d(u,v)/dXc * R * dX/dtheta
+    K = camera["K"]
+    R = camera["R"]
+    iz = np.where(valid, 1.0 / z, 0.0)
+    du = np.stack([K[0, 0] * iz, K[0, 1] * iz, -(K[0, 0] * pc[..., 0] + K[0, 1] * pc[..., 1]) * iz * iz], axis=-1)
+    dv = np.stack([np.zeros_like(iz), K[1, 1] * iz, -K[1, 1] * pc[..., 1] * iz * iz], axis=-1)
+    # d(u,v)/dX no mundo = d(u,v)/dXc @ R; dX/dtheta tem a forma de _design
+    return np.stack([_design(du @ R, t), _design(dv @ R, t)], axis=-2)
+
+
+def fit_linear(camera, t, u, v, g=9.81):
+    """
+    Chute inicial em forma fechada pelo erro algébrico da projeção.
+
+    Args:
+        camera: Câmera de camera.make_camera
+        t: Tempos (n,) ou (k, n)
+        u: Coordenada x dos pontos 2d (k, n), NaN onde não há ponto
+        v: Coordenada y dos pontos 2d (k, n), NaN onde não há ponto
+        g: Aceleração da gravidade (a = -g/2)
+
+    Returns:
+        ndarray: (k, 6) com m_x, q_x, m_y, q_y, b, c (NaN com menos de 3 pontos)
+    """
+    u = np.atleast_2d(np.asarray(u, dtype=float))
+    v = np.atleast_2d(np.asarray(v, dtype=float))
+    t = np.broadcast_to(np.asarray(t, dtype=float), u.shape)
+    valid = np.isfinite(u) & np.isfinite(v) & np.isfinite(t)
+    a = -0.5 * g
+
+    P = projection_matrix(camera)
+    rows, rhs = [], []
+    for obs, k in ((u, 0), (v, 1)):
+        o = np.where(valid, obs, 0.0)[..., None]
+        w = o * P[2] - P[k]  # (k, n, 4)
+        row = _design(w[..., :3], t)
+        # termo conhecido: parte em z de a t^2 e a coluna homogênea
+        known = w[..., 2] * a * t * t + w[..., 3]
+        rows.append(np.where(valid[..., None], row, 0.0))
+        rhs.append(np.where(valid, -known, 0.0))
+    A = np.concatenate(rows, axis=1)
+    b = np.concatenate(rhs, axis=1)
+
+    At = A.transpose(0, 2, 1)
+    theta = _solve(At @ A, (At @ b[..., None])[..., 0])
+    theta[valid.sum(axis=1) < 3] = np.nan
+    return theta
+
+
+def fit_trajectory_batch(camera, t, u, v, g=9.81, init=None, iterations=20, tol=1e-8):
+    """
+    Ajusta os coeficientes da parábola de vários lançamentos ao mesmo tempo.
+
+    Args:
+        camera: Câmera de camera.make_camera
+        t: Tempos (n,) ou (k, n)
+        u: Coordenada x dos pontos 2d (k, n), NaN onde não há ponto
+        v: Coordenada y dos pontos 2d (k, n), NaN onde não há ponto
+        g: Aceleração da gravidade (a = -g/2 fica fixo)
+        init: Coeficientes iniciais (k, 6); padrão: solução de fit_linear
+        iterations: Máximo de iterações de gauss-newton
+        tol: Variação relativa do custo para considerar convergido
+
+    Returns:
+        dict: m_x, q_x, m_y, q_y, a, b, c (arrays de k), rms (erro de reprojeção em
+        pixels), points (pontos usados), iterations e converged
+    """
+    u = np.atleast_2d(np.asarray(u, dtype=float))
+    v = np.atleast_2d(np.asarray(v, dtype=float))
+    t = np.broadcast_to(np.asarray(t, dtype=float), u.shape)
+    valid = np.isfinite(u) & np.isfinite(v) & np.isfinite(t)
+    uv = np.stack([np.where(valid, u, 0.0), np.where(valid, v, 0.0)], axis=-1)
+    tt = np.where(valid, t, 0.0)
+    a = -0.5 * g
+
+    theta = fit_linear(camera, t, u, v, g) if init is None else np.array(init, dtype=float).reshape(-1, 6)
+    active = np.isfinite(theta).all(axis=1)
+    theta = np.where(active[:, None], theta, 0.0)
+
+    r, pc, z = _residuals(camera, theta, tt, uv, valid, a)
+    cost = (r * r).sum(axis=(1, 2))
+    lam = np.full(len(theta), 1e-3)
+    done = ~active
+    used = np.zeros(len(theta), dtype=int)
+
+    for _ in range(int(iterations)):
+        # só os lançamentos que ainda não convergiram entram na iteração
+        idx = np.flatnonzero(~done)
+        if len(idx) == 0:
+            break
+        J = _jacobian(camera, pc[idx], z[idx], tt[idx], valid[idx]).reshape(len(idx), -1, 6)
+        Jt = J.transpose(0, 2, 1)
+        JtJ = Jt @ J
+        Jtr = (Jt @ r[idx].reshape(len(idx), -1, 1))[..., 0]
+        diag = np.diagonal(JtJ, axis1=1, axis2=2)
+        step = _solve(JtJ + (lam[idx, None] * np.maximum(diag, 1e-12))[..., None] * np.eye(6), -Jtr)
+        step = np.where(np.isfinite(step), step, 0.0)
+
+        cand = theta[idx] + step
+        r_new, pc_new, z_new = _residuals(camera, cand, tt[idx], uv[idx], valid[idx], a)
+        cost_new = (r_new * r_new).sum(axis=(1, 2))
+
+        better = cost_new < cost[idx]
+        used[idx] += 1
+        # passo aceito: menos amortecimento; recusado: mais (perto da descida do gradiente)
+        lam[idx] = np.where(better, lam[idx] * 0.1, lam[idx] * 10.0)
+        acc = idx[better]
+        gain = cost[acc] - cost_new[better]
+        theta[acc] = cand[better]
+        r[acc], pc[acc], z[acc] = r_new[better], pc_new[better], z_new[better]
+        cost[acc] = cost_new[better]
+
+        # parou de melhorar, passo desprezível ou amortecimento sem saída
+        small = np.abs(step).max(axis=1) <= 1e-10 * (1.0 + np.abs(theta[idx]).max(axis=1))
+        done[acc[gain <= tol * np.maximum(cost[acc], 1e-12)]] = True
+        done[idx[small | (lam[idx] > 1e8)]] = True
+
+    n = valid.sum(axis=1)
+    theta[~active] = np.nan
+    out = {key: theta[:, i] for i, key in enumerate(FIT_KEYS)}
+    out["a"] = np.where(active, a, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["rms"] = np.where(active, np.sqrt(cost / np.maximum(n, 1)), np.nan)
+    out["points"] = n
+    out["iterations"] = used
+    out["converged"] = done & active
+    return out
+
+
+def fit_trajectory(df_xy, f0, f1, fps, camera, g=9.81, init=None, iterations=20):
+    """
+    Ajusta a parábola de um lançamento aos pontos 2d dentro da janela do voo.
+
+    Args:
+        df_xy: DataFrame com frame, x2d, y2d (formato de load_cvat_xy)
+        f0: Frame de início do voo
+        f1: Frame de fim do voo
+        fps: Frames por segundo
+        camera: Câmera de camera.make_camera
+        g: Aceleração da gravidade
+        init: Parâmetros de make_position_functions usados como chute inicial (opcional)
+        iterations: Máximo de iterações de gauss-newton
+
+    Returns:
+        dict: p0 e p1 (posições ajustadas em t0 e t1, para make_position_functions e
+        build_trajectory), os coeficientes ajustados, rms, points e converged
+    """
+    d = df_xy[(df_xy["frame"] >= f0) & (df_xy["frame"] <= f1)].dropna(subset=["x2d", "y2d"])
+    if len(d) < 3:
+        raise RuntimeError("poucos pontos 2d no voo para ajustar a trajetória")
+    t = d["frame"].to_numpy(dtype=float) / float(fps)
+    start = None
+    if init is not None:
+        start = np.array([[init[key] for key in FIT_KEYS]])
+    fit = fit_trajectory_batch(camera, t, d["x2d"].to_numpy(dtype=float), d["y2d"].to_numpy(dtype=float),
+                               g=g, init=start, iterations=iterations)
+    res = {key: float(val[0]) for key, val in fit.items() if key not in ("points", "iterations", "converged")}
+    if not np.isfinite(res["rms"]):
+        raise RuntimeError("não consegui ajustar a trajetória aos pontos 2d")
+    res["points"] = int(fit["points"][0])
+    res["iterations"] = int(fit["iterations"][0])
+    res["converged"] = bool(fit["converged"][0])
+
+    # extremos do trecho ajustado: com eles as funções de trajectory reproduzem a mesma parábola
+    theta = np.array([[res[key] for key in FIT_KEYS]])
+    ends = _positions(theta, np.array([[f0, f1]], dtype=float) / float(fps), -0.5 * g)[0]
+    res["p0"] = tuple(float(x) for x in ends[0])
+    res["p1"] = tuple(float(x) for x in ends[1])
+    return res
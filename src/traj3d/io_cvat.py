@@ -1,34 +1,320 @@
 """
 módulo para leitura de anotações do cvat
+
+o xml é lido em fluxo (iterparse): cada box é convertido no centro (x2d, y2d) e escrito
+direto em buffers numpy, e os elementos já lidos são descartados, então a memória não
+cresce com o tamanho do arquivo. a leitura para assim que o primeiro track termina
+
+as colunas lidas ficam em cache (um .npy por coluna em .traj3d_cache/cvat-<hash>), com
+chave no hash do conteúdo do xml; as execuções seguintes abrem os .npy com mmap sem copiar
 """
 
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 from lxml import etree
 
+from .utils import cache_dir_for
 
-def load_cvat_xy(xml_path):
-    # lê o xml do cvat e extrai o centro do bbox em cada frame como (x2d, y2d)
-    root = etree.parse(xml_path).getroot()
-    track = root.find(".//track")
-    if track is None:
-        raise RuntimeError("não achei track no annotations.xml")
-    
-    rows = []
-    for sh in track:
+# tamanho padrão dos blocos devolvidos por iter_cvat_chunks
+CHUNK_SIZE = 65536
+
+# muda quando o formato do cache ou o que é extraído do xml muda
+CVAT_CACHE_VERSION = 2
+CVAT_COLUMNS = ("frame", "x2d", "y2d")
+
+
+class _ColumnBuffer:
+    # colunas numpy pré-alocadas que dobram de tamanho quando enchem
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.frame = np.empty(capacity, dtype=np.int64)
+        self.x2d = np.empty(capacity, dtype=np.float64)
+        self.y2d = np.empty(capacity, dtype=np.float64)
+
+    def append(self, f, x, y):
+        if self.n == len(self.frame):
+            self._grow()
+        i = self.n
+        self.frame[i] = f
+        self.x2d[i] = x
+        self.y2d[i] = y
+        self.n = i + 1
+
+    def _grow(self):
+        cap = 2 * len(self.frame)
+        for name in ("frame", "x2d", "y2d"):
+            old = getattr(self, name)
+            new = np.empty(cap, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def columns(self):
+        # colunas preenchidas, ordenadas por frame (estável) se o arquivo não estiver em ordem
+        cols = {name: getattr(self, name)[:self.n] for name in CVAT_COLUMNS}
+        if np.any(np.diff(cols["frame"]) < 0):
+            order = np.argsort(cols["frame"], kind="stable")
+            cols = {name: col[order] for name, col in cols.items()}
+        return cols
+
+
+def _release(elem):
+    # limpa o elemento já lido e solta os irmãos anteriores do pai
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _iter_track_items(xml_path):
+    # percorre o xml em fluxo devolvendo (None, frame, x2d, y2d) para cada box de um track e
+    # (atributos do track, None, None, None) quando o track termina
+    # só eventos de fim: quando o box termina o pai já é conhecido
+    for _, elem in etree.iterparse(str(xml_path), events=("end",)):
+        tag = elem.tag
+        if not isinstance(tag, str):
+            continue
+        if tag == "track":
+            attrib = dict(elem.attrib)
+            _release(elem)
+            yield attrib, None, None, None
+            continue
         # consideramos shapes tipo box e pegamos o centro como média dos cantos
-        if sh.tag.lower().endswith("box") and sh.get("frame"):
-            f = int(sh.get("frame"))
-            xtl = float(sh.get("xtl", 0))
-            ytl = float(sh.get("ytl", 0))
-            xbr = float(sh.get("xbr", 0))
-            ybr = float(sh.get("ybr", 0))
-            rows.append({
-                "frame": f, 
-                "x2d": 0.5 * (xtl + xbr), 
-                "y2d": 0.5 * (ytl + ybr)
-            })
-    
-    if not rows:
+        if tag.lower().endswith("box") and elem.getparent().tag == "track":
+            attrib = elem.attrib
+            f = attrib.get("frame")
+            if f:
+                yield (None, int(f),
+                       0.5 * (float(attrib.get("xtl", 0)) + float(attrib.get("xbr", 0))),
+                       0.5 * (float(attrib.get("ytl", 0)) + float(attrib.get("ybr", 0))))
+        _release(elem)
+
+
+def iter_box_centers(xml_path):
+    # percorre em fluxo os boxes do primeiro track devolvendo (frame, x2d, y2d)
+    # o fim do primeiro track encerra a leitura (o resto do arquivo nem é lido)
+    for track, f, x, y in _iter_track_items(xml_path):
+        if track is not None:
+            return
+        yield f, x, y
+    raise RuntimeError("não achei track no annotations.xml")
+
+
+def iter_cvat_chunks(xml_path, chunk_size=CHUNK_SIZE):
+    """
+    Lê o xml do cvat em blocos de tamanho fixo, sem montar a árvore inteira.
+
+    Args:
+        xml_path: Caminho do annotations.xml
+        chunk_size: Quantidade máxima de boxes por bloco
+
+    Yields:
+        DataFrame: Blocos com colunas frame, x2d, y2d na ordem do arquivo
+    """
+    chunk_size = max(1, int(chunk_size))
+    frame = np.empty(chunk_size, dtype=np.int64)
+    x2d = np.empty(chunk_size, dtype=np.float64)
+    y2d = np.empty(chunk_size, dtype=np.float64)
+    n = 0
+    for f, x, y in iter_box_centers(xml_path):
+        frame[n] = f
+        x2d[n] = x
+        y2d[n] = y
+        n += 1
+        if n == chunk_size:
+            yield pd.DataFrame({"frame": frame, "x2d": x2d, "y2d": y2d})
+            # buffers novos: o bloco entregue continua válido para quem o guardou
+            frame = np.empty(chunk_size, dtype=np.int64)
+            x2d = np.empty(chunk_size, dtype=np.float64)
+            y2d = np.empty(chunk_size, dtype=np.float64)
+            n = 0
+    if n:
+        yield pd.DataFrame({"frame": frame[:n], "x2d": x2d[:n], "y2d": y2d[:n]})
+
+
+def _parse_cvat_xy(xml_path):
+    # leitura do xml em fluxo para as colunas do primeiro track, ordenadas por frame
+    buf = _ColumnBuffer()
+    for f, x, y in iter_box_centers(xml_path):
+        buf.append(f, x, y)
+
+    if buf.n == 0:
         raise RuntimeError("não encontrei shapes com box")
-    
-    return pd.DataFrame(rows).sort_values("frame").reset_index(drop=True)
+    return buf.columns()
+
+
+def _parse_cvat_tracks(xml_path):
+    # leitura em fluxo de todos os tracks: lista de (id, label, colunas) na ordem do arquivo
+    tracks = []
+    buf = _ColumnBuffer()
+    for track, f, x, y in _iter_track_items(xml_path):
+        if track is None:
+            buf.append(f, x, y)
+            continue
+        tid = track.get("id")
+        tid = int(tid) if tid is not None and tid.lstrip("-").isdigit() else len(tracks)
+        tracks.append((tid, track.get("label", ""), buf.columns()))
+        buf = _ColumnBuffer()
+
+    if not tracks:
+        raise RuntimeError("não achei track no annotations.xml")
+    if not any(len(cols["frame"]) for _, _, cols in tracks):
+        raise RuntimeError("não encontrei shapes com box")
+    return tracks
+
+
+def file_digest(path, block_size=1 << 20):
+    # hash do conteúdo do arquivo, lido em blocos
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cvat_entries(xml_path, cache_dir=None, kind=None):
+    # entradas de cache (pastas cvat-*) geradas a partir deste xml; kind filtra pelo tipo
+    # ("xy" = primeiro track, "tracks" = todos os tracks)
+    root = cache_dir_for(xml_path, cache_dir)
+    source = os.path.abspath(str(xml_path))
+    if not root.is_dir():
+        return []
+    entries = []
+    for entry in root.glob("cvat-*"):
+        try:
+            with open(entry / "meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get("source") == source and kind in (None, meta.get("kind", "xy")):
+            entries.append(entry)
+    return entries
+
+
+def _read_cvat_cache(entry, names):
+    # abre as colunas com mmap; qualquer falha conta como ausência de cache
+    # devolve (colunas, meta) ou None
+    try:
+        with open(entry / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CVAT_CACHE_VERSION:
+            return None
+        # mmap copy-on-write: leitura sem cópia, e quem alterar o DataFrame não toca no arquivo;
+        # asarray tira a subclasse memmap sem copiar os dados
+        cols = {name: np.asarray(np.load(entry / f"{name}.npy", mmap_mode="c", allow_pickle=False))
+                for name in names}
+    except (OSError, ValueError):
+        return None
+    return cols, meta
+
+
+def _write_cvat_cache(entry, cols, xml_path, kind, **extra):
+    # grava numa pasta temporária e renomeia, para que outra execução nunca veja um cache pela metade
+    # a entrada antiga do mesmo xml e do mesmo tipo (conteúdo anterior) é removida
+    tmp = None
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+        for name, col in cols.items():
+            np.save(tmp / f"{name}.npy", np.asarray(col), allow_pickle=False)
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(dict(extra, version=CVAT_CACHE_VERSION, kind=kind,
+                           source=os.path.abspath(str(xml_path))), f)
+        for old in _cvat_entries(xml_path, entry.parent, kind):
+            if old != entry:
+                shutil.rmtree(old, ignore_errors=True)
+        # a própria entrada pode existir (versão antiga ou corrompida): os.replace não troca uma
+        # pasta que não está vazia
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    except OSError:
+        # o cache é só um atalho: sem permissão de escrita seguimos sem ele
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def clear_cvat_cache(xml_path, cache_dir=None):
+    # remove as entradas de cache deste xml e devolve quantas foram apagadas
+    entries = _cvat_entries(xml_path, cache_dir)
+    for entry in entries:
+        shutil.rmtree(entry, ignore_errors=True)
+    return len(entries)
+
+
+def load_cvat_xy(xml_path, cache=True, cache_dir=None):
+    """
+    Lê o xml do cvat e extrai o centro do bbox em cada frame como (x2d, y2d).
+
+    Args:
+        xml_path: Caminho do annotations.xml
+        cache: Usa (e cria) o cache binário em disco das colunas lidas
+        cache_dir: Pasta do cache (padrão: .traj3d_cache ao lado do xml)
+
+    Returns:
+        DataFrame: Colunas frame, x2d, y2d ordenadas por frame; vindo do cache,
+        as colunas são mapeadas em memória (cópia só das páginas alteradas)
+    """
+    if not cache:
+        return pd.DataFrame(_parse_cvat_xy(xml_path))
+
+    entry = cache_dir_for(xml_path, cache_dir) / f"cvat-{file_digest(xml_path)}"
+    hit = _read_cvat_cache(entry, CVAT_COLUMNS)
+    if hit is not None and len({len(c) for c in hit[0].values()}) == 1:
+        return pd.DataFrame(hit[0], copy=False)
+
+    cols = _parse_cvat_xy(xml_path)
+    _write_cvat_cache(entry, cols, xml_path, "xy", rows=len(cols["frame"]))
+    return pd.DataFrame(cols)
+
+
+def load_cvat_tracks(xml_path, cache=True, cache_dir=None):
+    """
+    Lê todos os tracks do xml do cvat como arrays em colunas.
+
+    Args:
+        xml_path: Caminho do annotations.xml
+        cache: Usa (e cria) o cache binário em disco das colunas lidas
+        cache_dir: Pasta do cache (padrão: .traj3d_cache ao lado do xml)
+
+    Returns:
+        dict: {id do track: {"label", "frame", "x2d", "y2d"}} na ordem do arquivo,
+        com cada track ordenado por frame (o primeiro é o mesmo de load_cvat_xy)
+    """
+    entry = None
+    if cache:
+        entry = cache_dir_for(xml_path, cache_dir) / f"cvat-tracks-{file_digest(xml_path)}"
+        hit = _read_cvat_cache(entry, CVAT_COLUMNS + ("track_id", "offsets"))
+        if hit is not None:
+            cols, meta = hit
+            labels = meta.get("labels", [])
+            if len(labels) == len(cols["track_id"]) == len(cols["offsets"]) - 1:
+                return _split_tracks(cols, labels)
+
+    tracks = _parse_cvat_tracks(xml_path)
+    cols = {name: np.concatenate([c[name] for _, _, c in tracks]) for name in CVAT_COLUMNS}
+    cols["track_id"] = np.asarray([tid for tid, _, _ in tracks], dtype=np.int64)
+    cols["offsets"] = np.concatenate([[0], np.cumsum([len(c["frame"]) for _, _, c in tracks])]).astype(np.int64)
+    labels = [label for _, label, _ in tracks]
+    if entry is not None:
+        _write_cvat_cache(entry, cols, xml_path, "tracks", rows=len(cols["frame"]), labels=labels)
+    return _split_tracks(cols, labels)
+
+
+def _split_tracks(cols, labels):
+    # fatia as colunas concatenadas de volta em um dict por track (visões, sem cópia)
+    offsets = cols["offsets"]
+    tracks = {}
+    for k, tid in enumerate(cols["track_id"]):
+        a, b = int(offsets[k]), int(offsets[k + 1])
+        track = {"label": labels[k]}
+        track.update({name: cols[name][a:b] for name in CVAT_COLUMNS})
+        tracks[int(tid)] = track
+    return tracks
@@ -4,6 +4,9 @@ módulo para cálculo de cinemática (velocidade e aceleração)
 
 import numpy as np
 
+# ordem das colunas escritas por kinematics_into (a mesma das colunas de velocidade/aceleração da série)
+KINEMATICS_COLUMNS = ("vx", "vy", "vz", "speed", "ax", "ay", "az")
+
 
 def make_velocity_functions(params):
     # deriva x(t), y(t), z(t) exatamente via cálculo diferencial
@@ -38,30 +41,167 @@ def make_velocity_functions(params):
 
 
 def build_kinematics(df_pos, params):
-    # gera colunas de velocidade e aceleração para cada frame
-    t = df_pos["t"].to_numpy()
-    vx, vy, vz, ax, ay, az = make_velocity_functions(params)
+    # gera colunas de velocidade e aceleração para cada frame (kernel único de kinematics_into)
+    t = df_pos["t"].to_numpy(dtype=float)
+    kin = kinematics_into(t, params)
 
-    v_x = vx(t)
-    v_y = vy(t)
-    v_z = vz(t)
-    a_x = ax(t)
-    a_y = ay(t)
-    a_z = az(t)
+    out = df_pos.copy()
+    for j, col in enumerate(KINEMATICS_COLUMNS):
+        out[col] = kin[:, j]
+    return out
 
-    v_mod = np.sqrt(v_x**2 + v_y**2 + v_z**2)
 
-    out = df_pos.copy()
-    out["vx"] = v_x
-    out["vy"] = v_y
-    out["vz"] = v_z
-    out["speed"] = v_mod
-    out["ax"] = a_x
-    out["ay"] = a_y
-    out["az"] = a_z
+def build_kinematics_batch(t, params_list):
+    # velocidade e aceleração de vários voos de uma vez: mesmas fórmulas de make_velocity_functions,
+    # com os coeficientes de cada voo numa coluna; devolve dict de arrays (voos x frames)
+    t = np.asarray(t, dtype=float)
+    col = lambda key: np.array([p[key] for p in params_list], dtype=float)[:, None]
+    t0, t1 = col("t0"), col("t1")
+    m_x, m_y, a, b = col("m_x"), col("m_y"), col("a"), col("b")
+
+    inside = (t >= t0) & (t < t1)
+    zero = np.zeros(inside.shape)
+    v_x = np.where(inside, m_x, zero)
+    v_y = np.where(inside, m_y, zero)
+    v_z = np.where(inside, 2.0 * a * t + b, zero)
+    a_z = np.where(inside, 2.0 * a, zero)
+
+    return {
+        "vx": v_x,
+        "vy": v_y,
+        "vz": v_z,
+        "speed": np.sqrt(v_x**2 + v_y**2 + v_z**2),
+        "ax": np.zeros(inside.shape),
+        "ay": np.zeros(inside.shape),
+        "az": a_z,
+    }
+
+
+def kinematics_into(t, params, out=None, dtype=None, block=1 << 16):
+    """
+    Velocidade e aceleração numa passada, escrevendo em buffers prontos.
+
+    A máscara [t0, t1) é calculada uma vez por bloco e as sete colunas são escritas direto
+    no buffer, sem os temporários de make_velocity_functions; os blocos (block amostras)
+    mantêm os intermediários no cache. Em float64 os valores são idênticos aos de
+    build_kinematics.
+
+    Args:
+        t: Tempos (n,)
+        params: Parâmetros de make_position_functions (dict ou FlightModel)
+        out: Buffer (n, 7) para reaproveitar, colunas em KINEMATICS_COLUMNS (opcional)
+        dtype: float64 (padrão) ou float32; com out, vale o dtype de out
+        block: Amostras por bloco
+
+    Returns:
+        ndarray: out preenchido (n, 7)
+    """
+    t = np.asarray(t)
+    n = len(t)
+    if out is None:
+        out = np.empty((n, len(KINEMATICS_COLUMNS)), dtype=dtype or np.float64, order="F")
+    elif out.shape != (n, len(KINEMATICS_COLUMNS)):
+        raise ValueError(f"buffer com forma {out.shape}, esperado {(n, len(KINEMATICS_COLUMNS))}")
+    dtype = out.dtype
+    if t.dtype != dtype:
+        t = t.astype(dtype)
+
+    t0, t1 = params["t0"], params["t1"]
+    m_x, m_y = params["m_x"], params["m_y"]
+    two_a, b = 2.0 * params["a"], params["b"]
+
+    block = max(1, int(block))
+    inside = np.empty(min(block, n), dtype=bool)
+    below = np.empty(min(block, n), dtype=bool)
+    tmp = np.empty(min(block, n), dtype=dtype)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        k = stop - start
+        tb = t[start:stop]
+        vx, vy, vz, speed, ax, ay, az = (out[start:stop, j] for j in range(len(KINEMATICS_COLUMNS)))
+        m, lt, w = inside[:k], below[:k], tmp[:k]
+
+        np.greater_equal(tb, t0, out=m)
+        np.less(tb, t1, out=lt)
+        m &= lt
+
+        out[start:stop] = 0
+        np.copyto(vx, m_x, where=m)
+        np.copyto(vy, m_y, where=m)
+        np.multiply(tb, two_a, out=vz, where=m)
+        np.add(vz, b, out=vz, where=m)
+        np.copyto(az, two_a, where=m)
+
+        # |v| = sqrt(vx^2 + vy^2 + vz^2) na mesma ordem de build_kinematics
+        np.multiply(vx, vx, out=speed)
+        np.multiply(vy, vy, out=w)
+        speed += w
+        np.multiply(vz, vz, out=w)
+        speed += w
+        np.sqrt(speed, out=speed)
     return out
 
 
+def benchmark_kinematics(sizes=(10**6, 10**7, 10**8), chunk=10**7, repeat=3):
+    """
+    Compara build_kinematics (funções por trecho) com kinematics_into em float64 e float32.
+
+    Tamanhos maiores que chunk são processados em pedaços de chunk amostras: o caminho antigo
+    aloca tudo a cada pedaço, o novo reaproveita os mesmos buffers (10^8 amostras em float64
+    inteiras não cabem na memória de uma máquina comum).
+
+    Args:
+        sizes: Totais de amostras
+        chunk: Amostras por pedaço
+        repeat: Repetições (vale o melhor tempo)
+
+    Returns:
+        list: um dict por tamanho com os tempos em segundos, as amostras por segundo e o ganho
+    """
+    import time
+
+    from .trajectory import make_position_functions
+
+    results = []
+    for size in sizes:
+        size = int(size)
+        step = min(size, int(chunk))
+        params = make_position_functions(int(0.1 * size), int(0.9 * size), 30.0, (0, 7, 2.0), (6, 6, 0))
+        base = np.arange(step) / 30.0
+        t64 = base.copy()
+        t32 = base.astype(np.float32)
+        out64 = np.empty((step, len(KINEMATICS_COLUMNS)), order="F")
+        out32 = np.empty((step, len(KINEMATICS_COLUMNS)), dtype=np.float32, order="F")
+
+        def legacy(t):
+            vx, vy, vz, ax, ay, az = make_velocity_functions(params)
+            v_x, v_y, v_z = vx(t), vy(t), vz(t)
+            return v_x, v_y, v_z, np.sqrt(v_x**2 + v_y**2 + v_z**2), ax(t), ay(t), az(t)
+
+        runs = {
+            "legacy": (t64, legacy),
+            "fused64": (t64, lambda t: kinematics_into(t, params, out=out64)),
+            "fused32": (t32, lambda t: kinematics_into(t, params, out=out32)),
+        }
+        row = {"samples": size}
+        for name, (t, run) in runs.items():
+            best = float("inf")
+            for _ in range(int(repeat)):
+                t[:] = base
+                start = time.perf_counter()
+                for _ in range(0, size, step):
+                    run(t)
+                    # cada pedaço avança o tempo, para a máscara do voo mudar ao longo da série
+                    t += step / 30.0
+                best = min(best, time.perf_counter() - start)
+            row[f"{name}_s"] = best
+            row[f"{name}_msps"] = size / best / 1e6
+        row["gain64"] = row["legacy_s"] / row["fused64_s"]
+        row["gain32"] = row["legacy_s"] / row["fused32_s"]
+        results.append(row)
+    return results
+
+
 def calculate_kinetic_energy(df_kinematics, mass=0.27):
     # calcula energia cinética para cada frame
     speed = df_kinematics["speed"].to_numpy()
@@ -0,0 +1,179 @@
+"""
+módulo com o modelo do voo e a série por frame em arrays compactos
+
+- FlightModel guarda os coeficientes de make_position_functions num único array float64
+  (f0 e f1 continuam inteiros); converte de/para o dict de parâmetros usado no resto do pacote
+- Trajectory guarda a série inteira num único buffer contíguo (frames x 11, ordem de coluna,
+  então cada coluna também é contígua) com t, posição, velocidade, módulo da velocidade e
+  aceleração; x, y, z, v, a são visões do buffer (sem cópia) e o DataFrame só é montado
+  quando pedido, com os mesmos valores de build_kinematics(build_trajectory(...))
+"""
+
+import numpy as np
+import pandas as pd
+
+from .kinematics import kinematics_into
+from .trajectory import make_position_functions
+
+# ordem dos coeficientes no array do modelo (mesmas chaves do dict de make_position_functions)
+COEF_KEYS = ("t0", "t1", "T", "x0", "y0", "z0", "x1", "y1", "z1", "g",
+             "m_x", "q_x", "m_y", "q_y", "a", "b", "c")
+_COEF_INDEX = {key: i for i, key in enumerate(COEF_KEYS)}
+
+# colunas do buffer da série (a coluna frame é gerada no DataFrame)
+SERIES_COLUMNS = ("t", "x3d", "y3d", "z3d", "vx", "vy", "vz", "speed", "ax", "ay", "az")
+
+
+class FlightModel:
+    """
+    Coeficientes do voo: x(t) = m_x t + q_x, y(t) = m_y t + q_y, z(t) = a t^2 + b t + c.
+
+    Args:
+        f0: Frame de início do voo
+        f1: Frame de fim do voo
+        fps: Frames por segundo
+        coef: Array float64 com os valores de COEF_KEYS, nessa ordem
+
+    Aceita model["m_x"] como o dict de parâmetros; to_params devolve o dict completo.
+    """
+
+    __slots__ = ("f0", "f1", "fps", "coef")
+
+    def __init__(self, f0, f1, fps, coef):
+        self.f0 = f0
+        self.f1 = f1
+        self.fps = float(fps)
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(len(COEF_KEYS))
+
+    @classmethod
+    def from_anchors(cls, f0, f1, fps, p0, p1, g=9.81):
+        # modelo pelas âncoras da bola, com as mesmas contas de make_position_functions
+        return cls.from_params(make_position_functions(f0, f1, fps, p0, p1, g=g))
+
+    @classmethod
+    def from_params(cls, params):
+        # modelo a partir do dict de make_position_functions
+        return cls(params["f0"], params["f1"], params["fps"], [params[key] for key in COEF_KEYS])
+
+    def to_params(self):
+        # dict de parâmetros na mesma forma de make_position_functions
+        params = dict(f0=self.f0, f1=self.f1, fps=self.fps)
+        params.update((key, float(val)) for key, val in zip(COEF_KEYS, self.coef))
+        return params
+
+    def __getitem__(self, key):
+        if key in ("f0", "f1", "fps"):
+            return getattr(self, key)
+        return float(self.coef[_COEF_INDEX[key]])
+
+    def __repr__(self):
+        return f"FlightModel(f0={self.f0}, f1={self.f1}, fps={self.fps})"
+
+
+class Trajectory:
+    """
+    Série por frame de um voo num buffer único (frames x len(SERIES_COLUMNS)).
+
+    Args:
+        model: FlightModel do voo
+        buf: Buffer float64 (frames x 11) já preenchido
+
+    Use Trajectory.build para criar; t, x, y, z, position, velocity, speed e acceleration
+    são visões do buffer e to_frame monta o DataFrame de sempre.
+    """
+
+    __slots__ = ("model", "buf")
+
+    def __init__(self, model, buf):
+        self.model = model
+        self.buf = buf
+
+    @classmethod
+    def build(cls, total_frames, model, out=None):
+        """
+        Preenche a série inteira do voo.
+
+        Args:
+            total_frames: Número de frames do vídeo
+            model: FlightModel do voo
+            out: Buffer (frames x 11) float64 para reaproveitar (opcional)
+
+        Returns:
+            Trajectory: série com os mesmos valores de build_kinematics(build_trajectory(...))
+        """
+        n = int(total_frames)
+        buf = np.empty((n, len(SERIES_COLUMNS)), order="F") if out is None else out
+        if buf.shape != (n, len(SERIES_COLUMNS)):
+            raise ValueError(f"buffer com forma {buf.shape}, esperado {(n, len(SERIES_COLUMNS))}")
+        p = model
+        t0, t1, T = p["t0"], p["t1"], p["T"]
+        t, x, y, z = (buf[:, j] for j in range(4))
+
+        np.divide(np.arange(n, dtype=int), p.fps, out=t)
+
+        # posição: mesma ordem de operações de build_trajectory (dois temporários de n)
+        s = (t - t0) / T
+        s = np.where(t <= t0, 0.0, np.where(t >= t1, 1.0, s))
+        np.multiply(s, p["x1"] - p["x0"], out=x)
+        x += p["x0"]
+        np.multiply(s, p["y1"] - p["y0"], out=y)
+        y += p["y0"]
+        np.multiply(s, p["z1"] - p["z0"], out=z)
+        z += p["z0"]
+        tmp = np.multiply(s, 0.5 * p["g"] * (T * T))
+        np.subtract(1.0, s, out=s)
+        tmp *= s
+        z += tmp
+
+        # velocidade e aceleração escritas direto nas colunas vx..az do buffer
+        kinematics_into(t, p, out=buf[:, 4:])
+        return cls(model, buf)
+
+    def __len__(self):
+        return len(self.buf)
+
+    @property
+    def nbytes(self):
+        return self.buf.nbytes
+
+    def column(self, name):
+        # visão de uma coluna do buffer pelo nome (t, x3d, ..., az)
+        return self.buf[:, SERIES_COLUMNS.index(name)]
+
+    @property
+    def t(self):
+        return self.buf[:, 0]
+
+    @property
+    def x(self):
+        return self.buf[:, 1]
+
+    @property
+    def y(self):
+        return self.buf[:, 2]
+
+    @property
+    def z(self):
+        return self.buf[:, 3]
+
+    @property
+    def position(self):
+        return self.buf[:, 1:4]
+
+    @property
+    def velocity(self):
+        return self.buf[:, 4:7]
+
+    @property
+    def speed(self):
+        return self.buf[:, 7]
+
+    @property
+    def acceleration(self):
+        return self.buf[:, 8:11]
+
+    def to_frame(self):
+        # DataFrame com as colunas de sempre (frame, t, x3d, ..., az), montado só aqui
+        data = {"frame": np.arange(len(self.buf), dtype=int)}
+        data.update((name, self.buf[:, j]) for j, name in enumerate(SERIES_COLUMNS))
+        return pd.DataFrame(data)
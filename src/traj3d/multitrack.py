@@ -0,0 +1,99 @@
+"""
+módulo para análise de todos os tracks do cvat de uma vez
+
+cada track recebe a mesma análise da bola principal (janela do voo, trajetória e
+cinemática), com trajetória e cinemática calculadas em lote: arrays (tracks x frames)
+"""
+
+import numpy as np
+import pandas as pd
+
+from .detection import detect_flight_windows_batch, pad_tracks
+from .kinematics import build_kinematics_batch
+from .trajectory import build_trajectory_batch, make_position_functions
+
+# colunas por frame de cada track, na ordem do csv
+SERIES_COLUMNS = ("x3d", "y3d", "z3d", "vx", "vy", "vz", "speed", "ax", "ay", "az")
+
+
+def track_frame(track):
+    # DataFrame frame/x2d/y2d de um track de load_cvat_tracks (sem copiar as colunas)
+    return pd.DataFrame({"frame": track["frame"], "x2d": track["x2d"], "y2d": track["y2d"]}, copy=False)
+
+
+def analyze_tracks(tracks, total_frames, fps, p0, p1, g=9.81, smooth=None, smooth_window=5):
+    """
+    Executa janela do voo, trajetória e cinemática para todos os tracks.
+
+    Args:
+        tracks: Saída de load_cvat_tracks ({id: {"label", "frame", "x2d", "y2d"}})
+        total_frames: Número de frames do vídeo
+        fps: Frames por segundo
+        p0: Posição inicial (x0, y0, z0)
+        p1: Posição final (x1, y1, z1)
+        g: Aceleração da gravidade
+        smooth: Suavização de y2d antes da detecção (None, "median" ou "savgol")
+        smooth_window: Janela da suavização
+
+    Returns:
+        dict: ids, labels, f0, f1, params (um dict por track), t (frames,) e as colunas
+        de SERIES_COLUMNS como arrays (tracks x frames); tracks sem pontos válidos ficam de fora
+    """
+    # janelas do voo de todos os tracks numa chamada só, sobre o array (tracks x frames)
+    all_ids = list(tracks)
+    frames, y2d, lengths = pad_tracks([tracks[tid] for tid in all_ids])
+    f0s, f1s = detect_flight_windows_batch(frames, y2d, lengths, smooth=smooth, window=smooth_window)
+
+    keep = lengths > 0
+    for tid in np.asarray(all_ids)[~keep]:
+        print(f"Aviso: track {tid} ({tracks[int(tid)]['label']}) sem pontos válidos, ignorado")
+    ids = [tid for tid, ok in zip(all_ids, keep) if ok]
+    f0s, f1s = f0s[keep], f1s[keep]
+
+    params = [make_position_functions(int(f0), int(f1), fps, p0, p1, g=g) for f0, f1 in zip(f0s, f1s)]
+    t, x, y, z = build_trajectory_batch(total_frames, f0s, f1s, fps, p0, p1, g=g)
+    result = {
+        "ids": ids,
+        "labels": [tracks[tid]["label"] for tid in ids],
+        "f0": f0s,
+        "f1": f1s,
+        "params": params,
+        "t": t,
+        "x3d": x,
+        "y3d": y,
+        "z3d": z,
+    }
+    result.update(build_kinematics_batch(t, params))
+    return result
+
+
+def tracks_to_frame(result):
+    # série de todos os tracks num único DataFrame longo: track, label, frame, t e SERIES_COLUMNS
+    k, n = len(result["ids"]), len(result["t"])
+    data = {
+        "track": np.repeat(np.asarray(result["ids"], dtype=int), n),
+        "label": np.repeat(np.asarray(result["labels"], dtype=object), n),
+        "frame": np.tile(np.arange(n), k),
+        "t": np.tile(result["t"], k),
+    }
+    for col in SERIES_COLUMNS:
+        data[col] = np.asarray(result[col]).reshape(-1)
+    return pd.DataFrame(data)
+
+
+def track_overlays(tracks, result, skip=()):
+    # tracks extras para o overlay do vídeo (video_annot.build_overlay_table), na ordem de result
+    # skip: ids que já são desenhados como bola principal
+    overlays = []
+    for k, tid in enumerate(result["ids"]):
+        if tid in skip:
+            continue
+        track = tracks[tid]
+        overlays.append({
+            "name": f"{track['label'] or 'track'} #{tid}",
+            "frame": track["frame"],
+            "x2d": track["x2d"],
+            "y2d": track["y2d"],
+            "speed": result["speed"][k],
+        })
+    return overlays
@@ -1,19 +1,181 @@
 """
 módulo para visualização e plotagem
+
+matplotlib (e mpl_toolkits para o 3d) só é importado quando um gráfico é pedido, então
+análises sem gráficos não pagam o tempo de importação; render_plots desenha várias figuras
+em processos separados (o pyplot não é seguro entre threads)
+
+séries com mais de max_points amostras (gravações longas, reamostragem em kHz) são
+reduzidas antes de ir para o matplotlib por decimate (mínimo/máximo por faixa ou lttb),
+mantendo sempre os degraus de lançamento/pouso e o apogeu
 """
 
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # noqa
 
+# funções aceitas por render_plots
+PLOTS = ("plot_xyz", "plot_velocity_components", "plot_acceleration_components", "plot_energy_analysis")
+
+# pontos por linha acima dos quais a série é reduzida (uma figura de 1920 px não mostra mais)
+MAX_POINTS = 4000
+
+
+def _pyplot():
+    # importa o pyplot com o backend sem janela na primeira figura do processo
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D  # noqa
+    return plt
+
+
+def _minmax_indices(y, buckets):
+    # índices do mínimo e do máximo de y em cada uma de buckets faixas de amostras
+    n = len(y)
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    pad = np.full(buckets * size, np.nan)
+    pad[:n] = y
+    pad = pad.reshape(buckets, size)
+    # faixas só com NaN ficam com o primeiro índice da faixa
+    empty = np.isnan(pad).all(axis=1)
+    pad[empty, 0] = 0.0
+    base = np.arange(buckets) * size
+    return np.concatenate([base + np.nanargmin(pad, axis=1), base + np.nanargmax(pad, axis=1)])
+
+
+def _lttb_indices(x, y, buckets):
+    # largest-triangle-three-buckets: o primeiro, o último e um ponto por faixa do meio
+    n = len(x)
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    lo, hi = edges[:-1], edges[1:]
+    keep = (hi > lo)
+    lo, hi = lo[keep], hi[keep]
+    # média de cada faixa (o "terceiro vértice" da faixa anterior); a última usa o ponto final
+    xs = np.nan_to_num(x)
+    ys = np.nan_to_num(y)
+    count = hi - lo
+    mean_x = np.append(np.add.reduceat(xs[:n - 1], lo) / count, xs[-1])
+    mean_y = np.append(np.add.reduceat(ys[:n - 1], lo) / count, ys[-1])
+    out = np.empty(len(lo) + 2, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    prev = 0
+    for b in range(len(lo)):
+        px, py = xs[prev], ys[prev]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        seg = slice(lo[b], hi[b])
+        area = np.abs((px - cx) * (ys[seg] - py) - (px - xs[seg]) * (cy - py))
+        prev = lo[b] + int(np.argmax(area))
+        out[b + 1] = prev
+    return out
+
+
+def decimate(x, y, max_points=MAX_POINTS, keep=None, method="minmax"):
+    """
+    Índices de uma versão reduzida da série que preserva a forma da curva.
+
+    Args:
+        x: Abscissas (n,), crescentes (o tempo)
+        y: Valores (n,)
+        max_points: Orçamento de pontos; séries menores voltam inteiras
+        keep: Índices que sempre entram (degraus, apogeu); saem do orçamento (se sozinhos
+            já passam de max_points, só eles voltam)
+        method: "minmax" (mínimo e máximo por faixa, vetorizado) ou "lttb"
+            (largest-triangle-three-buckets, um ponto por faixa)
+
+    Returns:
+        ndarray: índices ordenados e sem repetição, até max_points (com o primeiro e o último)
+    """
+    n = len(y)
+    if not max_points or n <= max_points:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    extra = np.array([0, n - 1], dtype=np.int64)
+    if keep is not None:
+        extra = np.concatenate([extra, np.asarray(keep, dtype=np.int64)])
+        extra = np.unique(extra[(extra >= 0) & (extra < n)])
+    # o que sobra do orçamento depois dos índices obrigatórios vai para as faixas
+    budget = int(max_points) - len(extra)
+    if method == "minmax":
+        buckets = budget // 2
+        idx = _minmax_indices(y, buckets) if buckets > 0 else extra
+    elif method == "lttb":
+        # o primeiro e o último do lttb já estão em extra: um ponto novo por faixa
+        idx = _lttb_indices(np.asarray(x, dtype=float), y, budget) if budget > 0 else extra
+    else:
+        raise ValueError(f"método de redução desconhecido: {method}")
+    return np.unique(np.concatenate([idx, extra]))
+
+
+def key_indices(df):
+    """
+    Amostras que a redução não pode perder: os dois lados de cada degrau de lançamento e
+    pouso (velocidade passa de zero para o voo e volta) e o apogeu.
+
+    Args:
+        df: DataFrame (ou dict de arrays) com vx, vy, vz ou speed e, se houver, z3d
+
+    Returns:
+        ndarray: índices (sem ordem garantida)
+    """
+    if "speed" in df:
+        speed = np.asarray(df["speed"], dtype=float)
+    else:
+        speed = np.sqrt(sum(np.asarray(df[c], dtype=float) ** 2 for c in ("vx", "vy", "vz")))
+    flight = speed != 0
+    edges = np.flatnonzero(flight[1:] != flight[:-1])
+    out = [edges, edges + 1]
+    if "z3d" in df:
+        z = np.asarray(df["z3d"], dtype=float)
+        if np.isfinite(z).any():
+            out.append([int(np.nanargmax(z))])
+    return np.concatenate(out).astype(np.int64)
+
+
+def _render(job):
+    # executa um job (nome da função de plot, args, kwargs) e devolve o caminho gravado
+    name, args, kwargs = job
+    globals()[name](*args, **kwargs)
+    return args[1]
 
-def plot_xyz(df, out_png, cam_xyz, p0, p1):
-    # plota em gráfico 3d a trajetória da bola na sala
+
+def render_plots(jobs, workers=0):
+    """
+    Desenha várias figuras, em sequência ou num pool de processos.
+
+    Args:
+        jobs: Lista de (nome da função deste módulo, args, kwargs); args[1] é o png de saída,
+            ex.: ("plot_xyz", (df, "trajetoria_3d.png", cam, p0, p1), {})
+        workers: Processos em paralelo (0 ou 1 = no próprio processo)
+
+    Returns:
+        list: caminhos dos pngs, na ordem dos jobs
+    """
+    jobs = list(jobs)
+    for job in jobs:
+        if job[0] not in PLOTS:
+            raise ValueError(f"gráfico desconhecido: {job[0]}")
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(int(workers), len(jobs))) as pool:
+            return list(pool.map(_render, jobs))
+    return [_render(job) for job in jobs]
+
+
+def plot_xyz(df, out_png, cam_xyz, p0, p1, max_points=MAX_POINTS):
+    # plota em gráfico 3d a trajetória da bola na sala (curva reduzida a max_points, com o apogeu)
+    plt = _pyplot()
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection="3d")
+    _draw_scene(ax, df, cam_xyz, p0, p1, max_points)
+    fig.tight_layout()
+    fig.savefig(out_png, dpi=160)
+    plt.close(fig)
 
+
+def _draw_scene(ax, df, cam_xyz, p0, p1, max_points=MAX_POINTS, **path_kw):
+    # cena 3d de plot_xyz (curva, âncoras, câmera, limites, linhas de altura, eixos do chão);
+    # path_kw vai para a curva da trajetória (ex.: alpha na animação)
     x = df["x3d"].to_numpy()
     y = df["y3d"].to_numpy()
     z = df["z3d"].to_numpy()
@@ -21,7 +183,9 @@ def plot_xyz(df, out_png, cam_xyz, p0, p1):
 
     # curva da trajetória
     if m.any():
-        ax.plot(x[m], y[m], z[m], "b-", lw=3, label="trajetória 3d")
+        xm, ym, zm = x[m], y[m], z[m]
+        sel = decimate(np.arange(len(zm)), zm, max_points, keep=[int(np.argmax(zm))])
+        ax.plot(xm[sel], ym[sel], zm[sel], "b-", lw=3, label="trajetória 3d", **path_kw)
 
     # pontos de referência
     ax.scatter(*p0, c="green", s=160, marker="o", label="início", edgecolors="black", linewidth=1.5)
@@ -69,93 +233,115 @@ def plot_xyz(df, out_png, cam_xyz, p0, p1):
     ax.plot([0, L+pad], [0, 0], [0, 0], color="k", lw=1.0, alpha=0.8)
     ax.plot([0, 0], [0, L+pad], [0, 0], color="k", lw=1.0, alpha=0.8)
 
-    fig.tight_layout()
-    fig.savefig(out_png, dpi=160)
-    plt.close(fig)
 
+# painéis 2x2 das componentes: (coluna, estilo, rótulo do eixo y, título) por painel;
+# a coluna "|a|" é o módulo calculado de ax, ay, az
+COMPONENT_PANELS = {
+    "velocity": (
+        ("vx", "r-", "vx [m/s]", "Velocidade X"),
+        ("vy", "g-", "vy [m/s]", "Velocidade Y"),
+        ("vz", "b-", "vz [m/s]", "Velocidade Z"),
+        ("speed", "k-", "|v| [m/s]", "Módulo da Velocidade"),
+    ),
+    "acceleration": (
+        ("ax", "r-", "ax [m/s²]", "Aceleração X"),
+        ("ay", "g-", "ay [m/s²]", "Aceleração Y"),
+        ("az", "b-", "az [m/s²]", "Aceleração Z"),
+        ("|a|", "k-", "|a| [m/s²]", "Módulo da Aceleração"),
+    ),
+}
+
+
+class ComponentFigure:
+    """
+    Figura 2x2 das componentes montada uma vez e reaproveitada em muitos lançamentos.
+
+    Eixos, rótulos, títulos, grades e linhas são criados no construtor; render só troca os
+    dados das linhas (Line2D.set_data), reajusta os limites e grava o png.
+
+    Args:
+        kind: "velocity" ou "acceleration" (chaves de COMPONENT_PANELS)
+        fixed_layout: Calcula o tight_layout uma vez (no primeiro render) em vez de a cada
+            figura; os rótulos dos eixos podem ficar um pouco mais apertados ou folgados
+        dpi: Resolução do png
+        max_points: Pontos por linha acima dos quais a série é reduzida (decimate)
+        method: Método de decimate ("minmax" ou "lttb")
+    """
+
+    def __init__(self, kind="velocity", fixed_layout=False, dpi=160, max_points=MAX_POINTS, method="minmax"):
+        if kind not in COMPONENT_PANELS:
+            raise ValueError(f"tipo de figura desconhecido: {kind}")
+        plt = _pyplot()
+        self.panels = COMPONENT_PANELS[kind]
+        self.fixed_layout = fixed_layout
+        self.dpi = dpi
+        self.max_points = max_points
+        self.method = method
+        self._laid_out = False
+        self.fig, axes = plt.subplots(2, 2, figsize=(12, 8))
+        self.axes = axes.ravel()
+        self.lines = []
+        for ax, (_, style, ylabel, title) in zip(self.axes, self.panels):
+            self.lines.append(ax.plot([], [], style, lw=2)[0])
+            ax.set_xlabel("Tempo [s]")
+            ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            ax.grid(True, alpha=0.3)
+
+    def render(self, df, out_png):
+        """
+        Atualiza as linhas com um lançamento e grava o png.
+
+        Args:
+            df: DataFrame (ou dict de arrays) com t e as colunas dos painéis
+            out_png: Caminho do png
+
+        Returns:
+            str: out_png
+        """
+        t = np.asarray(df["t"])
+        keep = key_indices(df) if self.max_points and len(t) > self.max_points else None
+        for ax, line, (col, *_) in zip(self.axes, self.lines, self.panels):
+            if col == "|a|":
+                y = np.sqrt(np.asarray(df["ax"]) ** 2 + np.asarray(df["ay"]) ** 2 + np.asarray(df["az"]) ** 2)
+            else:
+                y = np.asarray(df[col])
+            sel = decimate(t, y, self.max_points, keep=keep, method=self.method)
+            line.set_data(t[sel], y[sel])
+            ax.relim()
+            ax.autoscale_view()
+        if not (self.fixed_layout and self._laid_out):
+            self.fig.tight_layout()
+            self._laid_out = True
+        self.fig.savefig(out_png, dpi=self.dpi)
+        return out_png
 
-def plot_velocity_components(df, out_png):
+    def close(self):
+        _pyplot().close(self.fig)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def plot_velocity_components(df, out_png, max_points=MAX_POINTS):
     # plota componentes de velocidade ao longo do tempo
-    fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-    
-    t = df["t"].to_numpy()
-    
-    # Velocidade x
-    axes[0, 0].plot(t, df["vx"], "r-", lw=2)
-    axes[0, 0].set_xlabel("Tempo [s]")
-    axes[0, 0].set_ylabel("vx [m/s]")
-    axes[0, 0].set_title("Velocidade X")
-    axes[0, 0].grid(True, alpha=0.3)
-    
-    # Velocidade y
-    axes[0, 1].plot(t, df["vy"], "g-", lw=2)
-    axes[0, 1].set_xlabel("Tempo [s]")
-    axes[0, 1].set_ylabel("vy [m/s]")
-    axes[0, 1].set_title("Velocidade Y")
-    axes[0, 1].grid(True, alpha=0.3)
-    
-    # Velocidade z
-    axes[1, 0].plot(t, df["vz"], "b-", lw=2)
-    axes[1, 0].set_xlabel("Tempo [s]")
-    axes[1, 0].set_ylabel("vz [m/s]")
-    axes[1, 0].set_title("Velocidade Z")
-    axes[1, 0].grid(True, alpha=0.3)
-    
-    # Módulo da velocidade
-    axes[1, 1].plot(t, df["speed"], "k-", lw=2)
-    axes[1, 1].set_xlabel("Tempo [s]")
-    axes[1, 1].set_ylabel("|v| [m/s]")
-    axes[1, 1].set_title("Módulo da Velocidade")
-    axes[1, 1].grid(True, alpha=0.3)
-    
-    fig.tight_layout()
-    fig.savefig(out_png, dpi=160)
-    plt.close(fig)
+    with ComponentFigure("velocity", max_points=max_points) as fig:
+        fig.render(df, out_png)
 
 
-def plot_acceleration_components(df, out_png):
+def plot_acceleration_components(df, out_png, max_points=MAX_POINTS):
     # plota componentes de aceleração ao longo do tempo
-    fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-    
-    t = df["t"].to_numpy()
-    
-    # Aceleração x
-    axes[0, 0].plot(t, df["ax"], "r-", lw=2)
-    axes[0, 0].set_xlabel("Tempo [s]")
-    axes[0, 0].set_ylabel("ax [m/s²]")
-    axes[0, 0].set_title("Aceleração X")
-    axes[0, 0].grid(True, alpha=0.3)
-    
-    # Aceleração y
-    axes[0, 1].plot(t, df["ay"], "g-", lw=2)
-    axes[0, 1].set_xlabel("Tempo [s]")
-    axes[0, 1].set_ylabel("ay [m/s²]")
-    axes[0, 1].set_title("Aceleração Y")
-    axes[0, 1].grid(True, alpha=0.3)
-    
-    # Aceleração z
-    axes[1, 0].plot(t, df["az"], "b-", lw=2)
-    axes[1, 0].set_xlabel("Tempo [s]")
-    axes[1, 0].set_ylabel("az [m/s²]")
-    axes[1, 0].set_title("Aceleração Z")
-    axes[1, 0].grid(True, alpha=0.3)
-    
-    # Módulo da aceleração
-    a_mod = np.sqrt(df["ax"]**2 + df["ay"]**2 + df["az"]**2)
-    axes[1, 1].plot(t, a_mod, "k-", lw=2)
-    axes[1, 1].set_xlabel("Tempo [s]")
-    axes[1, 1].set_ylabel("|a| [m/s²]")
-    axes[1, 1].set_title("Módulo da Aceleração")
-    axes[1, 1].grid(True, alpha=0.3)
-    
-    fig.tight_layout()
-    fig.savefig(out_png, dpi=160)
-    plt.close(fig)
+    with ComponentFigure("acceleration", max_points=max_points) as fig:
+        fig.render(df, out_png)
 
 
-def plot_energy_analysis(df, out_png, mass=0.27, g=9.81):
+def plot_energy_analysis(df, out_png, mass=0.27, g=9.81, max_points=MAX_POINTS):
     # plota análise de energia (cinética, potencial e total)
     from .kinematics import calculate_kinetic_energy, calculate_potential_energy, calculate_total_energy
+    plt = _pyplot()
     
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -164,9 +350,12 @@ def plot_energy_analysis(df, out_png, mass=0.27, g=9.81):
     pe = calculate_potential_energy(df, mass, g)
     te = calculate_total_energy(df, mass, g)
     
-    ax.plot(t, ke, "r-", lw=2, label="Energia Cinética")
-    ax.plot(t, pe, "g-", lw=2, label="Energia Potencial")
-    ax.plot(t, te, "k-", lw=2, label="Energia Total")
+    keep = key_indices(df) if max_points and len(t) > max_points else None
+    for values, style, label in ((ke, "r-", "Energia Cinética"), (pe, "g-", "Energia Potencial"),
+                                 (te, "k-", "Energia Total")):
+        values = np.asarray(values)
+        sel = decimate(t, values, max_points, keep=keep)
+        ax.plot(t[sel], values[sel], style, lw=2, label=label)
     
     ax.set_xlabel("Tempo [s]")
     ax.set_ylabel("Energia [J]")
@@ -177,3 +366,72 @@ def plot_energy_analysis(df, out_png, mass=0.27, g=9.81):
     fig.tight_layout()
     fig.savefig(out_png, dpi=160)
     plt.close(fig)
+
+
+def _plot_components_per_call(df, out_png, kind="velocity", dpi=160):
+    # implementação original de plot_velocity/acceleration_components (figura nova, tight_layout e
+    # close a cada chamada, série inteira), mantida só como linha de base de benchmark_plots
+    plt = _pyplot()
+    fig, axes = plt.subplots(2, 2, figsize=(12, 8))
+    t = df["t"].to_numpy()
+    for ax, (col, style, ylabel, title) in zip(axes.ravel(), COMPONENT_PANELS[kind]):
+        y = np.sqrt(df["ax"]**2 + df["ay"]**2 + df["az"]**2) if col == "|a|" else df[col]
+        ax.plot(t, y, style, lw=2)
+        ax.set_xlabel("Tempo [s]")
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(out_png, dpi=dpi)
+    plt.close(fig)
+
+
+def benchmark_plots(throws=30, kind="velocity", frames=120, dpi=160):
+    """
+    Figuras por segundo das funções de plot originais (uma figura por chamada) contra a
+    ComponentFigure reaproveitada.
+
+    Args:
+        throws: Lançamentos (figuras) por variante
+        kind: "velocity" ou "acceleration"
+        frames: Frames de cada série
+        dpi: Resolução dos pngs
+
+    Returns:
+        dict: throws e *_s / *_fps de legacy (figura nova), template e fixed (layout uma vez)
+    """
+    import tempfile
+    import time
+    from pathlib import Path
+
+    from .model import FlightModel, Trajectory
+
+    rng = np.random.default_rng(0)
+    series = []
+    for _ in range(int(throws)):
+        f0 = int(rng.integers(5, frames // 3))
+        f1 = int(rng.integers(frames // 2, frames - 1))
+        p0 = (0.0, 7.0, float(rng.uniform(1.0, 2.5)))
+        p1 = (float(rng.uniform(4.0, 8.0)), float(rng.uniform(5.0, 7.0)), 0.0)
+        series.append(Trajectory.build(frames, FlightModel.from_anchors(f0, f1, 30.0, p0, p1)).to_frame())
+    if kind not in COMPONENT_PANELS:
+        raise ValueError(f"tipo de figura desconhecido: {kind}")
+
+    results = {"throws": len(series)}
+    with tempfile.TemporaryDirectory() as tmp:
+        out = [str(Path(tmp) / f"fig_{i:05d}.png") for i in range(len(series))]
+        _pyplot()
+        start = time.perf_counter()
+        for df, png in zip(series, out):
+            _plot_components_per_call(df, png, kind, dpi=dpi)
+        results["legacy_s"] = time.perf_counter() - start
+
+        for name, fixed in (("template", False), ("fixed", True)):
+            start = time.perf_counter()
+            with ComponentFigure(kind, fixed_layout=fixed, dpi=dpi) as fig:
+                for df, png in zip(series, out):
+                    fig.render(df, png)
+            results[f"{name}_s"] = time.perf_counter() - start
+    for name in ("legacy", "template", "fixed"):
+        results[f"{name}_fps"] = len(series) / results[f"{name}_s"]
+    return results
@@ -0,0 +1,143 @@
+"""
+módulo para leitura e cache dos metadados de vídeo
+
+largura, altura, número de frames e fps ficam em cache por caminho + tamanho + mtime:
+em memória durante o processo e num json em .traj3d_cache ao lado do vídeo, para que
+execuções seguintes não precisem abrir o vídeo só para ler esses valores
+"""
+
+import json
+import os
+import tempfile
+
+import cv2
+
+from .utils import cache_dir_for
+
+PROBE_VERSION = 1
+
+# cache em memória: chave (caminho, tamanho, mtime) -> metadados
+_MEMORY = {}
+
+
+def _stat_key(video_path):
+    path = os.path.abspath(str(video_path))
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+
+def _sidecar_path(key, cache_dir=None):
+    path = key[0]
+    return cache_dir_for(path, cache_dir) / f"{os.path.basename(path)}.meta.json"
+
+
+def _read_sidecar(key, cache_dir=None):
+    try:
+        with open(_sidecar_path(key, cache_dir), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (data.get("version") != PROBE_VERSION or data.get("size") != key[1]
+            or data.get("mtime_ns") != key[2]):
+        return None
+    return data["meta"]
+
+
+def _write_sidecar(key, meta, cache_dir=None):
+    # o cache em disco é só um atalho: se a pasta não puder ser escrita, seguimos sem ele
+    # arquivo temporário com nome único: processos em paralelo (trechos) não escrevem no mesmo
+    data = {"version": PROBE_VERSION, "path": key[0], "size": key[1], "mtime_ns": key[2], "meta": meta}
+    tmp = None
+    try:
+        path = _sidecar_path(key, cache_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def read_capture_info(cap):
+    # metadados informados pelo contêiner na captura aberta
+    return {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "exact": False,
+    }
+
+
+def count_frames(video_path):
+    # conta os frames decodificáveis de verdade (grab sem retrieve), para quando o FRAME_COUNT mente
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
+    n = 0
+    while cap.grab():
+        n += 1
+    cap.release()
+    return n
+
+
+def probe_video(video_path, cap=None, exact=False, cache_dir=None, use_disk=True):
+    """
+    Lê os metadados do vídeo usando o cache sempre que possível.
+
+    Args:
+        video_path: Caminho do vídeo
+        cap: Captura já aberta do mesmo vídeo, ou função sem argumentos que abre uma (chamada só
+            em caso de falta no cache); evita abrir outra só para ler os metadados
+        exact: Conta os frames decodificando o vídeo em vez de confiar no contêiner
+        cache_dir: Pasta do cache em disco (padrão: .traj3d_cache ao lado do vídeo)
+        use_disk: Usa o json em disco além do cache em memória
+
+    Returns:
+        dict: width, height, frame_count, fps e exact (se frame_count foi contado)
+    """
+    key = _stat_key(video_path)
+    meta = _MEMORY.get(key)
+    if meta is None and use_disk:
+        meta = _read_sidecar(key, cache_dir)
+
+    changed = False
+    if meta is None:
+        if cap is not None:
+            meta = read_capture_info(cap() if callable(cap) else cap)
+        else:
+            tmp = cv2.VideoCapture(key[0])
+            if not tmp.isOpened():
+                raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
+            meta = read_capture_info(tmp)
+            tmp.release()
+        changed = True
+
+    # contagem pedida ou contêiner sem contagem confiável: conta de verdade uma vez e guarda
+    if (exact or meta["frame_count"] <= 0) and not meta.get("exact"):
+        meta = dict(meta, frame_count=count_frames(key[0]), exact=True)
+        changed = True
+
+    _MEMORY[key] = meta
+    if changed and use_disk:
+        _write_sidecar(key, meta, cache_dir)
+    return dict(meta)
+
+
+def clear_probe_cache(video_path=None, cache_dir=None):
+    # limpa o cache em memória (e o json em disco do vídeo indicado)
+    if video_path is None:
+        _MEMORY.clear()
+        return
+    key = _stat_key(video_path)
+    for k in [k for k in _MEMORY if k[0] == key[0]]:
+        del _MEMORY[k]
+    try:
+        _sidecar_path(key, cache_dir).unlink()
+    except OSError:
+        pass
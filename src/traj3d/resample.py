@@ -0,0 +1,148 @@
+"""
+módulo para avaliar o voo em tempos arbitrários e reamostrar em alta taxa
+
+evaluate recebe qualquer array de tempos (timestamps de sensor, 1 kHz, ...) e devolve
+posição, velocidade e aceleração com os coeficientes m_x, q_x, m_y, q_y, a, b, c e as mesmas
+regras de interpolate_position e build_kinematics: até t0 a bola está em p0, a partir de t1
+em p1, e velocidade/aceleração só valem em [t0, t1)
+
+resample_stream gera a série numa grade fixa em pedaços de tamanho fixo, então uma
+reamostragem de horas a 1 kHz nunca fica inteira na memória
+"""
+
+import numpy as np
+import pandas as pd
+
+from .kinematics import kinematics_into
+from .model import SERIES_COLUMNS
+
+
+def evaluate(t, params, out=None, dtype=None, block=1 << 16):
+    """
+    Posição, velocidade e aceleração em tempos arbitrários, vetorizado.
+
+    Args:
+        t: Tempos (n,) em segundos, em qualquer ordem
+        params: Parâmetros de make_position_functions (dict ou FlightModel)
+        out: Buffer (n, 11) para reaproveitar, colunas em model.SERIES_COLUMNS (opcional)
+        dtype: float64 (padrão) ou float32; com out, vale o dtype de out
+        block: Amostras por bloco
+
+    Returns:
+        ndarray: out preenchido (n, 11) com t, x3d, y3d, z3d, vx, vy, vz, speed, ax, ay, az;
+        em float64 a posição é idêntica à de interpolate_position
+    """
+    t = np.asarray(t).reshape(-1)
+    n = len(t)
+    if out is None:
+        out = np.empty((n, len(SERIES_COLUMNS)), dtype=dtype or np.float64, order="F")
+    elif out.shape != (n, len(SERIES_COLUMNS)):
+        raise ValueError(f"buffer com forma {out.shape}, esperado {(n, len(SERIES_COLUMNS))}")
+    out[:, 0] = t
+    t = out[:, 0]
+
+    t0, t1 = params["t0"], params["t1"]
+    ends = ((params["x0"], params["x1"]), (params["y0"], params["y1"]), (params["z0"], params["z1"]))
+    m_x, q_x = params["m_x"], params["q_x"]
+    m_y, q_y = params["m_y"], params["q_y"]
+    a, b, c = params["a"], params["b"], params["c"]
+
+    block = max(1, int(block))
+    before = np.empty(min(block, n), dtype=bool)
+    after = np.empty(min(block, n), dtype=bool)
+    tmp = np.empty(min(block, n), dtype=out.dtype)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        k = stop - start
+        tb = t[start:stop]
+        x, y, z = (out[start:stop, j] for j in (1, 2, 3))
+        le, ge, w = before[:k], after[:k], tmp[:k]
+
+        # fórmulas do voo na mesma ordem de interpolate_position
+        np.multiply(tb, m_x, out=x)
+        x += q_x
+        np.multiply(tb, m_y, out=y)
+        y += q_y
+        np.multiply(tb, a, out=z)
+        z *= tb
+        np.multiply(tb, b, out=w)
+        z += w
+        z += c
+
+        # fora do voo: p1 a partir de t1 e p0 até t0 (t <= t0 tem prioridade, como no if/elif)
+        np.greater_equal(tb, t1, out=ge)
+        np.less_equal(tb, t0, out=le)
+        for col, (p_start, p_end) in zip((x, y, z), ends):
+            np.copyto(col, p_end, where=ge)
+            np.copyto(col, p_start, where=le)
+
+    kinematics_into(t, params, out=out[:, 4:], block=block)
+    return out
+
+
+def sample_count(rate, start, stop):
+    # amostras da grade start + k / rate até stop (inclusive quando cai na grade)
+    if stop < start:
+        return 0
+    return int(np.floor((stop - start) * rate + 1e-9)) + 1
+
+
+def resample_stream(params, rate=1000.0, start=0.0, stop=None, chunk=1 << 16, dtype=None, reuse=False):
+    """
+    Gera a série reamostrada em start + k / rate, em pedaços de até chunk amostras.
+
+    Args:
+        params: Parâmetros de make_position_functions (dict ou FlightModel)
+        rate: Amostras por segundo
+        start: Primeiro tempo (s)
+        stop: Último tempo (s), inclusive; padrão: t1 (pouso)
+        chunk: Amostras por pedaço
+        dtype: float64 (padrão) ou float32
+        reuse: Reaproveita o mesmo buffer em todos os pedaços (o pedaço anterior é
+            sobrescrito; copie o que precisar guardar)
+
+    Yields:
+        ndarray: (m, 11) com as colunas de model.SERIES_COLUMNS, m <= chunk
+    """
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError("taxa de reamostragem precisa ser positiva")
+    stop = params["t1"] if stop is None else stop
+    total = sample_count(rate, start, stop)
+    chunk = max(1, int(chunk))
+    base = np.arange(min(chunk, max(total, 1)), dtype=np.float64)
+    buf = None
+    for k0 in range(0, total, chunk):
+        m = min(chunk, total - k0)
+        # tempo pelo índice inteiro (start + k / rate): sem erro acumulado em horas de série
+        t = (base[:m] + k0) / rate + start
+        if reuse:
+            if buf is None:
+                buf = np.empty((len(base), len(SERIES_COLUMNS)), dtype=dtype or np.float64, order="F")
+            yield evaluate(t, params, out=buf[:m])
+        else:
+            yield evaluate(t, params, dtype=dtype)
+
+
+def write_resampled_csv(params, path, rate=1000.0, start=0.0, stop=None, chunk=1 << 16):
+    """
+    Grava a série reamostrada em csv, pedaço por pedaço.
+
+    Args:
+        params: Parâmetros de make_position_functions (dict ou FlightModel)
+        path: Caminho do csv
+        rate: Amostras por segundo
+        start: Primeiro tempo (s)
+        stop: Último tempo (s), inclusive; padrão: t1 (pouso)
+        chunk: Amostras por pedaço
+
+    Returns:
+        int: número de amostras gravadas
+    """
+    rows = 0
+    with open(path, "w", newline="") as fh:
+        fh.write(",".join(SERIES_COLUMNS) + "\n")
+        for buf in resample_stream(params, rate, start, stop, chunk=chunk, reuse=True):
+            pd.DataFrame(buf, columns=SERIES_COLUMNS).to_csv(fh, header=False, index=False)
+            rows += len(buf)
+    return rows
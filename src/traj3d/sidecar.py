@@ -0,0 +1,282 @@
+"""
+módulo para exportar o overlay como arquivos auxiliares (legendas e primitivas)
+
+em vez de recodificar o vídeo, o overlay de cada frame é salvo como:
+- faixa de texto temporizada webvtt (.vtt) com o painel de informações
+- legenda ass (.ass) com textos posicionados em pixels e o círculo do cvat
+- npz compacto com as primitivas de desenho (texto, âncoras, círculos)
+
+o npz reproduz exatamente o vídeo anotado: `python -m traj3d.sidecar` queima o overlay
+sobre o vídeo original quando for preciso
+"""
+
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .video_annot import draw_primitives, open_video, overlay_primitives
+
+# códigos de tipo de primitiva no npz
+KIND_TEXT = 0
+KIND_CIRCLE = 1
+
+
+def iter_frame_primitives(table, fps, names=()):
+    # percorre a tabela de overlay devolvendo (frame, primitivas) de cada frame
+    for idx in range(len(table)):
+        yield idx, overlay_primitives(idx, fps, table[idx], names)
+
+
+def export_overlay(table, fps, out_dir, size, stem="bola_overlay", names=()):
+    # grava .vtt, .ass e .npz do overlay e devolve os caminhos
+    # names: rótulos dos tracks extras da tabela (ver video_annot.track_names)
+    out_dir = Path(out_dir)
+    paths = {
+        "vtt": out_dir / f"{stem}.vtt",
+        "ass": out_dir / f"{stem}.ass",
+        "npz": out_dir / f"{stem}.npz",
+    }
+    write_webvtt(table, fps, paths["vtt"], names)
+    write_ass(table, fps, paths["ass"], size, names)
+    save_overlay_npz(table, fps, paths["npz"], size, names)
+    return paths
+
+
+def _hud_lines(prims):
+    # textos do painel (preenchimento branco), sem repetir o contorno e sem os rótulos dos pontos
+    lines = []
+    seen = set()
+    for prim in prims:
+        if prim[0] == "text" and prim[4] == (255, 255, 255) and (prim[1], prim[2]) not in seen:
+            seen.add((prim[1], prim[2]))
+            lines.append(prim[1])
+    return lines
+
+
+def _vtt_time(t):
+    ms = int(round(t * 1000.0))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def write_webvtt(table, fps, out_path, names=()):
+    # faixa webvtt com o painel de informações; frames seguidos com o mesmo texto viram uma só deixa
+    cues = []
+    current, start = None, 0
+    for idx, prims in iter_frame_primitives(table, fps, names):
+        text = "\n".join(_hud_lines(prims))
+        if text != current:
+            if current:
+                cues.append((start, idx, current))
+            current, start = text, idx
+    if current:
+        cues.append((start, len(table), current))
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for i, (f0, f1, text) in enumerate(cues, 1):
+            f.write(f"{i}\n{_vtt_time(f0 / fps)} --> {_vtt_time(f1 / fps)} line:0 position:0% align:start\n")
+            f.write(f"{text}\n\n")
+    return out_path
+
+
+def _ass_time(t):
+    cs = int(round(t * 100.0))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h:d}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _ass_color(bgr):
+    # o ass usa &HBBGGRR&, a mesma ordem bgr do opencv
+    b, g, r = bgr
+    return f"&H{b:02X}{g:02X}{r:02X}&"
+
+
+def _ass_circle(radius):
+    # círculo em desenho vetorial do ass (4 béziers), com origem no canto superior esquerdo
+    r = radius
+    k = 0.5523 * r
+    return (f"m {r:g} 0 b {r + k:g} 0 {2 * r:g} {r - k:g} {2 * r:g} {r:g} "
+            f"b {2 * r:g} {r + k:g} {r + k:g} {2 * r:g} {r:g} {2 * r:g} "
+            f"b {r - k:g} {2 * r:g} 0 {r + k:g} 0 {r:g} "
+            f"b 0 {r - k:g} {r - k:g} 0 {r:g} 0")
+
+
+def _ass_events(prims):
+    # converte as primitivas de um frame em textos de evento do ass
+    events = []
+    seen = set()
+    for prim in prims:
+        if prim[0] == "text":
+            _, txt, org, scale, color, thickness = prim
+            if (txt, org) in seen:
+                continue
+            seen.add((txt, org))
+            if color == (255, 255, 255) or color == (0, 0, 0):
+                tags = f"\\an1\\pos({org[0]},{org[1]})\\fs{round(scale * 32)}"
+            else:
+                tags = f"\\an1\\pos({org[0]},{org[1]})\\fs{round(scale * 32)}\\bord0\\1c{_ass_color(color)}"
+            events.append(f"{{{tags}}}{txt}")
+        else:
+            _, center, radius, color, thickness = prim
+            tags = (f"\\an7\\pos({center[0] - radius},{center[1] - radius})\\bord{thickness / 2:g}"
+                    f"\\1a&HFF&\\3c{_ass_color(color)}\\p1")
+            events.append(f"{{{tags}}}{_ass_circle(radius)}{{\\p0}}")
+    return events
+
+
+def write_ass(table, fps, out_path, size, names=()):
+    # legenda ass com textos posicionados em pixels do vídeo original e o círculo do ponto cvat
+    w, h = size
+    header = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {w}\n"
+        f"PlayResY: {h}\n"
+        "ScaledBorderAndShadow: yes\n\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+        "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        "Style: HUD,DejaVu Sans,19,&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+        "0,0,0,0,100,100,0,0,1,1,0,1,0,0,0,1\n\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+
+    # eventos iguais em frames seguidos são unidos em um único intervalo
+    open_events = {}
+    closed = []
+    for idx, prims in iter_frame_primitives(table, fps, names):
+        events = _ass_events(prims)
+        current = set(events)
+        for ev in list(open_events):
+            if ev not in current:
+                closed.append((open_events.pop(ev), idx, ev))
+        for ev in events:
+            open_events.setdefault(ev, idx)
+    for ev, start in open_events.items():
+        closed.append((start, len(table), ev))
+    closed.sort(key=lambda item: item[0])
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for f0, f1, ev in closed:
+            f.write(f"Dialogue: 0,{_ass_time(f0 / fps)},{_ass_time(f1 / fps)},HUD,,0,0,0,,{ev}\n")
+    return out_path
+
+
+def save_overlay_npz(table, fps, out_path, size, names=()):
+    # primitivas de todos os frames em colunas: os textos ficam numa tabela de strings única
+    frames, kinds, text_ids = [], [], []
+    xs, ys, scales, colors, thicks, radii = [], [], [], [], [], []
+    texts = {}
+    for idx, prims in iter_frame_primitives(table, fps, names):
+        for prim in prims:
+            frames.append(idx)
+            if prim[0] == "text":
+                _, txt, org, scale, color, thickness = prim
+                kinds.append(KIND_TEXT)
+                text_ids.append(texts.setdefault(txt, len(texts)))
+                radii.append(0)
+            else:
+                _, org, radius, color, thickness = prim
+                kinds.append(KIND_CIRCLE)
+                text_ids.append(-1)
+                scale = 0.0
+                radii.append(radius)
+            xs.append(org[0])
+            ys.append(org[1])
+            scales.append(scale)
+            colors.append(color)
+            thicks.append(thickness)
+
+    np.savez_compressed(
+        out_path,
+        frame=np.asarray(frames, dtype=np.int32),
+        kind=np.asarray(kinds, dtype=np.uint8),
+        text_id=np.asarray(text_ids, dtype=np.int32),
+        x=np.asarray(xs, dtype=np.int32),
+        y=np.asarray(ys, dtype=np.int32),
+        scale=np.asarray(scales, dtype=np.float32),
+        color=np.asarray(colors, dtype=np.uint8).reshape(-1, 3),
+        thickness=np.asarray(thicks, dtype=np.int16),
+        radius=np.asarray(radii, dtype=np.int16),
+        texts=np.asarray(list(texts), dtype=str),
+        fps=np.float64(fps),
+        size=np.asarray(size, dtype=np.int32),
+        n_frames=np.int64(len(table)),
+    )
+    return out_path
+
+
+def load_overlay_npz(path):
+    # lê o npz de primitivas e devolve uma função frame -> lista de primitivas
+    data = np.load(path, allow_pickle=False)
+    frame = data["frame"]
+    n = int(data["n_frames"])
+    # deslocamentos de cada frame no vetor de primitivas (já gravado em ordem de frame)
+    offsets = np.searchsorted(frame, np.arange(n + 1))
+    kind, text_id = data["kind"], data["text_id"]
+    x, y, scale = data["x"], data["y"], data["scale"]
+    color, thickness, radius = data["color"], data["thickness"], data["radius"]
+    texts = data["texts"]
+
+    def primitives(idx):
+        if idx >= n:
+            return []
+        prims = []
+        for i in range(offsets[idx], offsets[idx + 1]):
+            c = tuple(int(v) for v in color[i])
+            if kind[i] == KIND_TEXT:
+                prims.append(("text", str(texts[text_id[i]]), (int(x[i]), int(y[i])),
+                              float(scale[i]), c, int(thickness[i])))
+            else:
+                prims.append(("circle", (int(x[i]), int(y[i])), int(radius[i]), c, int(thickness[i])))
+        return prims
+
+    return primitives, float(data["fps"])
+
+
+def burn_overlay(video_path, overlay_path, out_path):
+    # queima o overlay salvo no npz sobre o vídeo original
+    primitives, fps = load_overlay_npz(overlay_path)
+    cap, info = open_video(video_path)
+    writer = None
+    try:
+        size = (info["width"], info["height"])
+        writer = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        if not writer.isOpened():
+            raise RuntimeError("falha ao abrir VideoWriter")
+
+        for idx in range(info["frame_count"]):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            draw_primitives(frame, primitives(idx))
+            writer.write(frame)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    return out_path
+
+
+def main():
+    # comando pequeno para gerar o vídeo anotado a partir do overlay exportado
+    p = argparse.ArgumentParser(description="queima o overlay exportado (.npz) sobre o vídeo original")
+    p.add_argument("--video", required=True, help="caminho do vídeo original")
+    p.add_argument("--overlay", required=True, help="npz de primitivas gerado pela análise")
+    p.add_argument("--out", default="bola_annotado.mp4", help="vídeo anotado de saída")
+    args = p.parse_args()
+    print(burn_overlay(args.video, args.overlay, args.out))
+
+
+if __name__ == "__main__":
+    main()
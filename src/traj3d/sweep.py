@@ -0,0 +1,165 @@
+"""
+módulo para varredura de parâmetros (análise de sensibilidade) sem vídeo nem gráficos
+
+f0, f1, fps, p0, p1 e g são arrays que se combinam por broadcasting do numpy; cada
+combinação tem a sua série amostrada nos frames do voo (as mesmas contas de
+build_trajectory e build_kinematics) e vira um resumo: apogeu, tempo de voo, velocidade no
+lançamento e máxima e energia. as combinações são avaliadas em blocos com no máximo
+max_elements amostras de cada vez, então grades grandes não estouram a memória
+
+a posição da câmera não entra aqui: ela só define o ponto de vista dos gráficos e da
+reprojeção, não muda nenhum número do modelo
+"""
+
+import numpy as np
+import pandas as pd
+
+# estatísticas devolvidas por parameter_sweep, uma por combinação
+SWEEP_STATS = ("t0", "t1", "flight_time", "apex_z", "apex_t", "launch_speed", "max_speed",
+               "launch_energy", "max_energy")
+
+
+def _flatten_inputs(f0, f1, fps, p0, p1, g):
+    # combina as entradas por broadcasting e devolve (formato da grade, arrays achatados)
+    p0 = np.asarray(p0, dtype=float)
+    p1 = np.asarray(p1, dtype=float)
+    if p0.shape[-1:] != (3,) or p1.shape[-1:] != (3,):
+        raise ValueError("p0 e p1 precisam ter 3 coordenadas no último eixo")
+    shape = np.broadcast_shapes(np.shape(f0), np.shape(f1), np.shape(fps), np.shape(g),
+                                p0.shape[:-1], p1.shape[:-1])
+    flat = lambda v: np.broadcast_to(v, shape).reshape(-1)
+    cols = {
+        "f0": flat(np.asarray(f0)).astype(np.int64),
+        "f1": flat(np.asarray(f1)).astype(np.int64),
+        "fps": flat(np.asarray(fps, dtype=float)),
+        "g": flat(np.asarray(g, dtype=float)),
+    }
+    p0 = np.broadcast_to(p0, shape + (3,)).reshape(-1, 3)
+    p1 = np.broadcast_to(p1, shape + (3,)).reshape(-1, 3)
+    return shape, cols, p0, p1
+
+
+def _sweep_block(f0, f1, fps, g, p0, p1, mass):
+    # resumo de um bloco de combinações (r,) numa grade (r x k) de frames relativos ao lançamento
+    t0 = f0 / fps
+    t1 = f1 / fps
+    T = np.maximum(t1 - t0, 1e-9)
+    x0, y0, z0 = p0.T
+    x1, y1, z1 = p1.T
+
+    # coeficientes como em make_position_functions
+    m_x = (x1 - x0) / T
+    m_y = (y1 - y0) / T
+    a = -0.5 * g
+    b = (z1 - z0) / T + 0.5 * g * T + g * t0
+
+    span = np.maximum(f1 - f0, 0)
+    k = np.arange(int(span.max()) + 1)
+    valid = k <= span[:, None]
+    t = (f0[:, None] + k) / fps[:, None]
+    c = lambda v: v[:, None]
+
+    # posição z como em build_trajectory (x e y não entram nas estatísticas)
+    s = (t - c(t0)) / c(T)
+    s = np.where(t <= c(t0), 0.0, np.where(t >= c(t1), 1.0, s))
+    z = c(z0) + c(z1 - z0) * s + 0.5 * c(g) * c(T * T) * s * (1.0 - s)
+
+    # |v| como em build_kinematics: fórmulas só em [t0, t1)
+    inside = (t >= c(t0)) & (t < c(t1))
+    vz = 2.0 * c(a) * t + c(b)
+    speed = np.sqrt(np.where(inside, c(m_x) ** 2 + c(m_y) ** 2 + vz ** 2, 0.0))
+
+    energy = 0.5 * mass * speed ** 2 + mass * c(g) * z
+    rows = np.arange(len(f0))
+    apex = np.argmax(np.where(valid, z, -np.inf), axis=1)
+    return {
+        "t0": t0,
+        "t1": t1,
+        "flight_time": T,
+        "apex_z": z[rows, apex],
+        "apex_t": t[rows, apex],
+        "launch_speed": speed[:, 0],
+        "max_speed": np.where(valid, speed, 0.0).max(axis=1),
+        "launch_energy": energy[:, 0],
+        "max_energy": np.where(valid, energy, -np.inf).max(axis=1),
+    }
+
+
+def parameter_sweep(f0, f1, fps, p0, p1, g=9.81, mass=0.27, max_elements=250_000):
+    """
+    Avalia uma grade de parâmetros de uma vez e devolve o resumo de cada combinação.
+
+    Args:
+        f0: Frame(s) de início do voo
+        f1: Frame(s) de fim do voo
+        fps: Frames por segundo
+        p0: Posição(ões) inicial(is), último eixo (x, y, z)
+        p1: Posição(ões) final(is), último eixo (x, y, z)
+        g: Aceleração(ões) da gravidade
+        mass: Massa da bola para as energias (kg)
+        max_elements: Máximo de amostras (combinações x frames) avaliadas por bloco
+
+    Returns:
+        dict: arrays no formato da grade (broadcast das entradas) para cada chave de
+        SWEEP_STATS: t0, t1, flight_time (s), apex_z (m) e apex_t (s), launch_speed e
+        max_speed (m/s), launch_energy e max_energy (J, cinética + potencial)
+    """
+    shape, cols, p0, p1 = _flatten_inputs(f0, f1, fps, p0, p1, g)
+    m = len(cols["f0"])
+    out = {key: np.empty(m) for key in SWEEP_STATS}
+    if m == 0:
+        return {key: val.reshape(shape) for key, val in out.items()}
+
+    # blocos de combinações com a mesma quantidade máxima de amostras
+    span = int(np.maximum(cols["f1"] - cols["f0"], 0).max()) + 1
+    rows = max(1, int(max_elements) // span)
+    for start in range(0, m, rows):
+        sl = slice(start, min(start + rows, m))
+        res = _sweep_block(cols["f0"][sl], cols["f1"][sl], cols["fps"][sl], cols["g"][sl],
+                           p0[sl], p1[sl], mass)
+        for key in SWEEP_STATS:
+            out[key][sl] = res[key]
+    return {key: val.reshape(shape) for key, val in out.items()}
+
+
+def sweep_grid(f0, f1, fps, p0, p1, g=(9.81,), mass=0.27, max_elements=250_000):
+    """
+    Varredura no produto cartesiano de listas de valores.
+
+    Args:
+        f0: Lista de frames de início
+        f1: Lista de frames de fim
+        fps: Lista de fps
+        p0: Lista de posições iniciais (x, y, z)
+        p1: Lista de posições finais (x, y, z)
+        g: Lista de gravidades
+        mass: Massa da bola (kg)
+        max_elements: Máximo de amostras por bloco
+
+    Returns:
+        DataFrame: uma linha por combinação com os parâmetros e as colunas de SWEEP_STATS
+    """
+    axes = [np.asarray(f0), np.asarray(f1), np.asarray(fps, dtype=float),
+            np.asarray(p0, dtype=float).reshape(-1, 3), np.asarray(p1, dtype=float).reshape(-1, 3),
+            np.asarray(g, dtype=float)]
+    dims = [len(ax) for ax in axes]
+    # cada lista num eixo próprio da grade; p0/p1 mantêm as coordenadas no último eixo
+    shaped = []
+    for i, ax in enumerate(axes):
+        view = [1] * len(axes)
+        view[i] = dims[i]
+        shaped.append(ax.reshape(view + [3]) if ax.ndim == 2 else ax.reshape(view))
+    res = parameter_sweep(shaped[0], shaped[1], shaped[2], shaped[3], shaped[4], shaped[5],
+                          mass=mass, max_elements=max_elements)
+
+    idx = np.indices(dims).reshape(len(dims), -1)
+    p0s = axes[3][idx[3]]
+    p1s = axes[4][idx[4]]
+    data = {
+        "f0": axes[0][idx[0]], "f1": axes[1][idx[1]], "fps": axes[2][idx[2]],
+        "x0": p0s[:, 0], "y0": p0s[:, 1], "z0": p0s[:, 2],
+        "x1": p1s[:, 0], "y1": p1s[:, 1], "z1": p1s[:, 2],
+        "g": axes[5][idx[5]],
+    }
+    data.update((key, res[key].reshape(-1)) for key in SWEEP_STATS)
+    return pd.DataFrame(data)
@@ -0,0 +1,435 @@
+"""
+módulo para detectar e seguir a bola direto no vídeo, sem anotações do cvat
+
+duas fases, só com métodos clássicos de cpu (opencv):
+- aquisição: subtração de fundo (MOG2) num frame reduzido; blobs compactos do tamanho
+  esperado (longe da borda) são ligados entre frames seguidos e a bola é o encadeamento
+  que anda numa direção só e melhor se ajusta a uma parábola por alguns frames
+- rastreio: filtro de kalman de aceleração constante prevê a próxima posição e a busca
+  fica numa janela pequena em volta dela (diferença de 3 frames + blob); só a janela dos
+  três últimos frames vai para cinza, então o custo por frame não depende da resolução do vídeo
+
+os frames antes da aquisição (bola parada na mão, invisível para o MOG2) são preenchidos
+para trás por correlação com o recorte da bola, usando os últimos frames guardados em cinza
+numa largura reduzida (backfill_width), então a memória também não cresce com a resolução
+
+o resultado tem o mesmo formato de load_cvat_xy: DataFrame frame, x2d, y2d
+"""
+
+import argparse
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from .video_annot import open_video
+
+
+def make_kalman(x, y, vx=0.0, vy=0.0, process_noise=0.5, measurement_noise=2.0):
+    # kalman de aceleração constante em pixels por frame: estado (x, y, vx, vy, ax, ay)
+    kf = cv2.KalmanFilter(6, 2, 0, cv2.CV_64F)
+    A = np.eye(6)
+    A[0, 2] = A[1, 3] = A[2, 4] = A[3, 5] = 1.0
+    A[0, 4] = A[1, 5] = 0.5
+    kf.transitionMatrix = A
+    H = np.zeros((2, 6))
+    H[0, 0] = H[1, 1] = 1.0
+    kf.measurementMatrix = H
+    kf.processNoiseCov = np.diag([1.0, 1.0, 1.0, 1.0, 0.5, 0.5]) * process_noise
+    kf.measurementNoiseCov = np.eye(2) * measurement_noise
+    kf.errorCovPost = np.diag([4.0, 4.0, 25.0, 25.0, 4.0, 4.0])
+    kf.statePost = np.array([[x], [y], [vx], [vy], [0.0], [0.0]])
+    return kf
+
+
+class BallTracker:
+    """
+    Rastreador incremental da bola: recebe os frames em ordem e devolve a posição medida.
+
+    Args:
+        acquire_width: Largura do frame reduzido usado pelo MOG2 na aquisição
+        min_radius: Raio mínimo da bola em pixels do vídeo
+        max_radius: Raio máximo da bola em pixels do vídeo
+        confirm: Frames seguidos de movimento coerente para aceitar a bola
+        max_step: Deslocamento máximo entre frames na aquisição (pixels do vídeo)
+        min_speed: Velocidade média mínima (pixels/frame) de um encadeamento aceito
+        max_residual: Resíduo máximo (pixels) do ajuste parabólico do encadeamento
+        warmup: Frames iniciais do MOG2 ignorados enquanto ele aprende o fundo
+        max_misses: Frames sem medida antes de voltar para a aquisição
+        diff_threshold: Limiar da diferença de 3 frames dentro da janela
+        window: (mínimo, máximo) da meia largura da janela de busca
+        backfill: Quantos frames antes da aquisição guardar para o preenchimento para trás
+        backfill_score: Correlação mínima aceita no preenchimento para trás
+        backfill_width: Largura máxima dos frames guardados para o preenchimento para trás
+            (90 frames de 960 px em cinza ocupam ~45 MB, qualquer que seja o vídeo)
+    """
+
+    def __init__(self, acquire_width=424, min_radius=4, max_radius=40, confirm=5, max_step=60,
+                 min_speed=2.0, max_residual=1.5, warmup=5, max_misses=6, diff_threshold=15,
+                 window=(20, 96), backfill=90, backfill_score=0.6, backfill_width=960):
+        self.acquire_width = int(acquire_width)
+        self.min_radius = float(min_radius)
+        self.max_radius = float(max_radius)
+        self.confirm = max(2, int(confirm))
+        self.max_step = float(max_step)
+        self.min_speed = float(min_speed)
+        self.max_residual = float(max_residual)
+        self.warmup = int(warmup)
+        self._warmup = 0
+        self.max_misses = int(max_misses)
+        self.diff_threshold = int(diff_threshold)
+        self.window = (int(window[0]), int(window[1]))
+        self.backfill_score = float(backfill_score)
+        self.backfill_width = int(backfill_width)
+
+        self.detections = {}
+        # (índice, frame cinza reduzido, escala) antes da aquisição, para o preenchimento para trás
+        self._history = deque(maxlen=max(1, int(backfill) + 1))
+        # os três últimos frames como chegaram (referências, sem cópia nem conversão)
+        self._recent = deque(maxlen=3)
+        self._mog = None
+        self._chains = []
+        self._kf = None
+        self._misses = 0
+        self._radius = self.min_radius
+        self.time_acquire = 0.0
+        self.time_track = 0.0
+
+    @property
+    def tracking(self):
+        return self._kf is not None
+
+    def update(self, idx, frame):
+        # processa um frame (bgr) e devolve (x2d, y2d) medido ou None
+        self._recent.append(frame)
+        t = time.perf_counter()
+        if self._kf is None:
+            point = self._acquire(idx, frame)
+            self.time_acquire += time.perf_counter() - t
+        else:
+            point = self._track(idx)
+            self.time_track += time.perf_counter() - t
+        if point is not None:
+            self.detections[idx] = point
+        return point
+
+    def to_frame(self):
+        # detecções no formato de load_cvat_xy
+        frames = sorted(self.detections)
+        xy = np.array([self.detections[f] for f in frames], dtype=float).reshape(-1, 2)
+        return pd.DataFrame({"frame": np.array(frames, dtype=np.int64), "x2d": xy[:, 0], "y2d": xy[:, 1]})
+
+    # aquisição -----------------------------------------------------------------
+
+    def _acquire(self, idx, frame):
+        h, w = frame.shape[:2]
+        self._keep(idx, frame)
+        s = min(1.0, self.acquire_width / float(w))
+        small = cv2.resize(frame, (max(1, int(w * s)), max(1, int(h * s))), interpolation=cv2.INTER_AREA)
+        if self._mog is None:
+            self._mog = cv2.createBackgroundSubtractorMOG2(history=30, varThreshold=25, detectShadows=False)
+            self._mog.apply(small)
+            self._chains = []
+            self._warmup = self.warmup
+            return None
+
+        mask = self._mog.apply(small)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+        n, _, stats, centers = cv2.connectedComponentsWithStats(mask)
+
+        # blobs compactos do tamanho esperado, em coordenadas do vídeo
+        amin = np.pi * (self.min_radius * s) ** 2 * 0.3
+        amax = np.pi * (self.max_radius * s) ** 2
+        margin = self.max_radius * s
+        cands = []
+        for j in range(1, n):
+            bw, bh, area = stats[j, 2], stats[j, 3], stats[j, 4]
+            # blobs encostados na borda são quase sempre objetos entrando/saindo de cena
+            x0, y0 = stats[j, 0], stats[j, 1]
+            if (x0 < margin or y0 < margin or x0 + bw > small.shape[1] - margin
+                    or y0 + bh > small.shape[0] - margin):
+                continue
+            if amin <= area <= amax and 0.5 <= bw / bh <= 2.0 and area >= 0.4 * bw * bh:
+                cands.append((centers[j][0] / s, centers[j][1] / s, 0.5 * max(bw, bh) / s))
+
+        # liga cada candidato ao encadeamento do frame anterior que melhor o explica
+        chains = []
+        for cx, cy, r in cands:
+            best, best_d = None, None
+            for chain in self._chains:
+                px, py = chain[-1][1], chain[-1][2]
+                if len(chain) >= 2:
+                    px, py = 2 * px - chain[-2][1], 2 * py - chain[-2][2]
+                d = np.hypot(cx - px, cy - py)
+                if d <= self.max_step and (best_d is None or d < best_d):
+                    best, best_d = chain, d
+            chains.append((best or []) + [(idx, cx, cy, r)])
+        self._chains = chains
+
+        if self._warmup > 0:
+            # o MOG2 ainda está aprendendo o fundo: os blobs desses frames são ruído
+            self._warmup -= 1
+            self._chains = []
+            return None
+
+        moving = [(res, c) for c in chains if len(c) >= self.confirm
+                  for res in [self._coherent(c[-self.confirm:])] if res is not None]
+        if not moving:
+            return None
+
+        # o encadeamento mais bem explicado pela parábola
+        chain = min(moving, key=lambda m: m[0])[1]
+        (_, x0, y0, _), (_, x1, y1, r) = chain[-2], chain[-1]
+        self._radius = float(np.clip(r, self.min_radius, self.max_radius))
+        self._kf = make_kalman(x1, y1, x1 - x0, y1 - y0)
+        self._misses = 0
+        self._mog = None
+        for f, x, y, _ in chain:
+            self.detections[f] = (x, y)
+        self._backfill(chain[0][0])
+        # durante o rastreio só os frames sem medida são guardados (uma nova aquisição pode
+        # preenchê-los para trás)
+        self._history.clear()
+        return (x1, y1)
+
+    def _keep(self, idx, frame):
+        # guarda o frame em cinza, reduzido a backfill_width, para o preenchimento para trás
+        # (redução bilinear: em 4k custa menos que converter o frame cheio para cinza)
+        h, w = frame.shape[:2]
+        sb = min(1.0, self.backfill_width / float(w))
+        if sb < 1.0:
+            frame = cv2.resize(frame, (max(1, int(w * sb)), max(1, int(h * sb))), interpolation=cv2.INTER_LINEAR)
+        self._history.append((idx, _gray(frame), sb))
+
+    def _coherent(self, chain):
+        # trecho de lançamento: anda pelo menos min_speed px/frame numa direção só e uma
+        # parábola (aceleração constante) explica os pontos com resíduo pequeno
+        f = np.array([c[0] for c in chain], dtype=float)
+        xy = np.array([(c[1], c[2]) for c in chain])
+        steps = np.diff(xy, axis=0)
+        travel = np.hypot(*(xy[-1] - xy[0]))
+        if travel < self.min_speed * (f[-1] - f[0]) or travel < 2 * self.min_radius:
+            return None
+        # todos os passos apontam para o mesmo lado do deslocamento total
+        if np.any(steps @ (xy[-1] - xy[0]) <= 0):
+            return None
+        fit = np.polyfit(f - f[0], xy, 2)
+        resid = xy - np.stack([np.polyval(fit[:, k], f - f[0]) for k in range(2)], axis=1)
+        rms = float(np.sqrt(np.mean(resid ** 2)))
+        return rms if rms <= self.max_residual else None
+
+    def _backfill(self, first):
+        # volta no tempo a partir do primeiro ponto do encadeamento, procurando o recorte da bola
+        # numa janela pequena nos frames guardados (a bola parada não aparece no MOG2); a busca
+        # roda na escala dos frames guardados e as posições voltam para pixels do vídeo
+        frames = {i: (g, sb) for i, g, sb in self._history}
+        if first not in frames:
+            return
+        sb = frames[first][1]
+        x, y = self.detections[first]
+        x, y = x * sb, y * sb
+        r = int(np.ceil(self._radius * sb)) + 2
+        tmpl = _crop(frames[first][0], x, y, r)
+        if tmpl is None:
+            return
+        idx = first - 1
+        while idx in frames and idx not in self.detections:
+            found = _match(frames[idx][0], tmpl, x, y, r + int(self.window[0] * sb) // 2)
+            if found is None or found[2] < self.backfill_score:
+                break
+            x, y = found[0], found[1]
+            self.detections[idx] = (x / sb, y / sb)
+            idx -= 1
+
+    # rastreio -------------------------------------------------------------------
+
+    def _track(self, idx):
+        kf = self._kf
+        pred = kf.predict()
+        px, py = float(pred[0, 0]), float(pred[1, 0])
+        P = kf.errorCovPre
+        half = int(np.clip(3.0 * np.sqrt(max(P[0, 0], P[1, 1])) + 2 * self._radius, *self.window))
+
+        point = None
+        if len(self._recent) >= 3:
+            point = self._measure(px, py, half)
+        if point is None:
+            # sem medida: fica com a previsão e volta para a aquisição se demorar demais
+            self._keep(idx, self._recent[-1])
+            kf.statePost = kf.statePre.copy()
+            kf.errorCovPost = kf.errorCovPre.copy()
+            self._misses += 1
+            h, w = self._recent[-1].shape[:2]
+            if self._misses > self.max_misses or not (0 <= px < w and 0 <= py < h):
+                self._kf = None
+            return None
+
+        kf.correct(np.array([[point[0]], [point[1]]]))
+        self._misses = 0
+        return point
+
+    def _measure(self, px, py, half):
+        # diferença de 3 frames na janela: só o que mudou em relação aos dois frames anteriores
+        # (o "fantasma" da posição anterior some); o blob que mais pesa perto da previsão vence
+        # só a janela dos três frames é convertida para cinza
+        h, w = self._recent[-1].shape[:2]
+        x0, y0 = max(0, int(px) - half), max(0, int(py) - half)
+        x1, y1 = min(w, int(px) + half), min(h, int(py) + half)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+        win, prev1, prev2 = (_gray(f[y0:y1, x0:x1]) for f in reversed(self._recent))
+        diff = cv2.min(cv2.absdiff(win, prev1), cv2.absdiff(win, prev2))
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+
+        best, best_score = None, 0.0
+        for j in range(1, n):
+            bx, by, bw, bh, area = stats[j]
+            if area < np.pi * self.min_radius ** 2 * 0.5:
+                continue
+            cx, cy = x0 + bx + bw / 2.0, y0 + by + bh / 2.0
+            score = area / (1.0 + np.hypot(cx - px, cy - py) / max(self._radius, 1.0))
+            if score > best_score:
+                best, best_score = (cx, cy), score
+        return best
+
+
+def _gray(frame):
+    # frame (ou recorte) bgr em cinza; já em cinza passa direto
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def _crop(gray, x, y, r):
+    # recorte quadrado de meia largura r em volta de (x, y); None se sair do frame
+    h, w = gray.shape
+    x, y = int(round(x)), int(round(y))
+    if x - r < 0 or y - r < 0 or x + r + 1 > w or y + r + 1 > h:
+        return None
+    return gray[y - r:y + r + 1, x - r:x + r + 1]
+
+
+def _match(gray, tmpl, x, y, half):
+    # melhor posição do recorte numa janela em volta de (x, y): (x, y, correlação) ou None
+    h, w = gray.shape
+    r = tmpl.shape[0] // 2
+    x0, y0 = max(0, int(round(x)) - half - r), max(0, int(round(y)) - half - r)
+    x1, y1 = min(w, int(round(x)) + half + r + 1), min(h, int(round(y)) + half + r + 1)
+    if x1 - x0 <= tmpl.shape[1] or y1 - y0 <= tmpl.shape[0]:
+        return None
+    res = cv2.matchTemplate(gray[y0:y1, x0:x1], tmpl, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (mx, my) = cv2.minMaxLoc(res)
+    return x0 + mx + r, y0 + my + r, score
+
+
+def track_ball(video, max_frames=None, **options):
+    """
+    Detecta e segue a bola no vídeo inteiro.
+
+    Args:
+        video: Caminho do vídeo ou captura já aberta (liberada aqui)
+        max_frames: Para depois deste número de frames (padrão: todos)
+        **options: Parâmetros de BallTracker
+
+    Returns:
+        DataFrame: frame, x2d, y2d nos frames em que a bola foi medida (como load_cvat_xy)
+    """
+    return _run_tracker(video, max_frames, **options)[0]
+
+
+def _run_tracker(video, max_frames=None, **options):
+    # passada pelo vídeo devolvendo (DataFrame, tracker, frames lidos, tempo de leitura)
+    cap = video if isinstance(video, cv2.VideoCapture) else open_video(video)[0]
+    tracker = BallTracker(**options)
+    n = 0
+    t_read = 0.0
+    try:
+        while max_frames is None or n < max_frames:
+            t = time.perf_counter()
+            ok, frame = cap.read()
+            t_read += time.perf_counter() - t
+            if not ok:
+                break
+            tracker.update(n, frame)
+            n += 1
+    finally:
+        cap.release()
+    df = tracker.to_frame()
+    if df.empty:
+        raise RuntimeError("não encontrei a bola no vídeo")
+    return df, tracker, n, t_read
+
+
+def benchmark_tracking(video_path, xml_path, **options):
+    """
+    Compara o rastreio automático com as anotações do cvat.
+
+    Args:
+        video_path: Caminho do vídeo
+        xml_path: annotations.xml de referência
+        **options: Parâmetros de BallTracker
+
+    Returns:
+        dict: cobertura dos frames anotados, erros em pixels (mediana, média, p90, máximo),
+        fração com erro até 10 px e frames por segundo (total e só do rastreador)
+    """
+    from .io_cvat import load_cvat_xy
+
+    ref = load_cvat_xy(xml_path, cache=False)
+    t = time.perf_counter()
+    df, tracker, n, t_read = _run_tracker(video_path, **options)
+    total_time = time.perf_counter() - t
+
+    joined = ref.merge(df, on="frame", suffixes=("_ref", ""))
+    err = np.hypot(joined["x2d"] - joined["x2d_ref"], joined["y2d"] - joined["y2d_ref"]).to_numpy()
+    t_tracker = tracker.time_acquire + tracker.time_track
+    tracked_frames = max(len(df), 1)
+    return {
+        "frames": n,
+        "annotated": len(ref),
+        "tracked": len(df),
+        "coverage": len(joined) / max(len(ref), 1),
+        "err_median": float(np.median(err)) if len(err) else float("nan"),
+        "err_mean": float(np.mean(err)) if len(err) else float("nan"),
+        "err_p90": float(np.percentile(err, 90)) if len(err) else float("nan"),
+        "err_max": float(np.max(err)) if len(err) else float("nan"),
+        "within_10px": float(np.mean(err <= 10.0)) if len(err) else 0.0,
+        "fps_total": n / total_time if total_time > 0 else float("inf"),
+        "fps_tracker": n / t_tracker if t_tracker > 0 else float("inf"),
+        "ms_acquire": 1e3 * tracker.time_acquire,
+        "ms_track_per_frame": 1e3 * tracker.time_track / tracked_frames,
+        "dataframe": df,
+    }
+
+
+def main():
+    # rastreia a bola e grava o csv frame,x2d,y2d; com --xml também compara com o cvat
+    p = argparse.ArgumentParser(description="rastreio automático da bola (sem cvat)")
+    p.add_argument("--video", required=True, help="caminho do vídeo")
+    p.add_argument("--xml", default=None, help="annotations.xml para comparar (benchmark)")
+    p.add_argument("--out", default=None, help="csv de saída com frame,x2d,y2d")
+    args = p.parse_args()
+
+    if args.xml:
+        res = _format_benchmark(benchmark_tracking(args.video, args.xml))
+        df = res.pop("dataframe")
+        for key, value in res.items():
+            print(f"{key}: {value}")
+    else:
+        df = track_ball(args.video)
+        print(f"bola encontrada em {len(df)} frames")
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(args.out)
+
+
+def _format_benchmark(res):
+    # arredonda os números do benchmark para exibição
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in res.items()}
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,32 @@ def build_trajectory(total_frames, f0, f1, fps, p0, p1, g=9.81):
     return pd.DataFrame({"frame": frames, "t": t, "x3d": x, "y3d": y, "z3d": z})
 
 
+def build_trajectory_batch(total_frames, f0, f1, fps, p0, p1, g=9.81):
+    """
+    trajetórias de vários voos de uma vez, mesma conta de build_trajectory
+
+    f0 e f1 são arrays (um voo por linha); devolve t (frames,) e x, y, z como
+    arrays (voos x frames), sem laço em python
+    """
+    frames = np.arange(total_frames, dtype=int)
+    t = frames / float(fps)
+
+    t0 = np.asarray(f0, dtype=float)[:, None] / float(fps)
+    t1 = np.asarray(f1, dtype=float)[:, None] / float(fps)
+    T = np.maximum(t1 - t0, 1e-9)
+
+    x0, y0, z0 = p0
+    x1, y1, z1 = p1
+
+    s = (t - t0) / T
+    s = np.where(t <= t0, 0.0, np.where(t >= t1, 1.0, s))
+
+    x = x0 + s * (x1 - x0)
+    y = y0 + s * (y1 - y0)
+    z = z0 + (z1 - z0) * s + 0.5 * g * (T*T) * s * (1.0 - s)
+    return t, x, y, z
+
+
 def make_position_functions(f0, f1, fps, p0, p1, g=9.81):
     """
     Calcula coeficientes para derivação algébrica das funções de posição.
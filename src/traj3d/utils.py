@@ -2,9 +2,15 @@
 utilitários e funções auxiliares para traj3d
 """
 
+import os
 import re
+from pathlib import Path
+
 import numpy as np
 
+# pasta de cache criada ao lado dos arquivos de entrada
+CACHE_DIRNAME = ".traj3d_cache"
+
 
 def parse_triplet(txt):
     # recebe "x,y,z" ou "x y z" e converte para floats
@@ -14,6 +20,21 @@ def parse_triplet(txt):
     return float(a[0]), float(a[1]), float(a[2])
 
 
+def parse_size(txt):
+    # recebe "LxA" ou "L,A" e converte para inteiros (largura, altura)
+    a = re.split(r"[ ,;xX]+", txt.strip())
+    if len(a) != 2:
+        raise ValueError(f"esperado largura x altura, recebi: {txt}")
+    return int(a[0]), int(a[1])
+
+
+def cache_dir_for(path, cache_dir=None):
+    # pasta de cache para um arquivo de entrada: a indicada ou .traj3d_cache ao lado dele
+    if cache_dir is not None:
+        return Path(cache_dir)
+    return Path(os.path.dirname(os.path.abspath(str(path)))) / CACHE_DIRNAME
+
+
 def validate_video_path(video_path):
     # valida se o caminho do vídeo é válido
     import os
@@ -2,105 +2,637 @@
 módulo para anotação de vídeo e utilidades de desenho
 """
 
+import itertools
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
 import cv2
 import numpy as np
 
+from .compositor import OverlayCompositor
+from .probe import probe_video, read_capture_info
+from .detection import detect_flight_events_batch, pad_tracks
 
-def annotate_video(video_path, df, out_path, fps, df_cvat=None):
-    # anota no vídeo o frame, tempo, posição 3d, módulo da velocidade, módulo da aceleração e o ponto 2d do cvat
-    cap = cv2.VideoCapture(video_path)
+
+# colunas da tabela de overlay: uma linha por frame do vídeo
+OVERLAY_COLUMNS = ("x3d", "y3d", "z3d", "speed", "ax", "ay", "az", "x2d", "y2d")
+# colunas de cada track extra, depois das colunas acima
+TRACK_COLUMNS = ("x2d", "y2d", "speed")
+# cores bgr dos tracks extras (a bola principal continua verde)
+TRACK_COLORS = ((255, 128, 0), (0, 200, 255), (255, 0, 255), (0, 128, 255), (255, 255, 0), (128, 0, 255))
+# cor bgr do caminho 3d projetado na imagem
+PATH_COLOR = (0, 0, 255)
+
+
+def open_capture(video_path):
+    # captura do vídeo, com erro claro se não abrir
+    cap = cv2.VideoCapture(str(video_path))
     if not cap.isOpened():
         raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
+    return cap
+
+
+def open_video(video_path, exact=False, cache_dir=None, cache=True):
+    # abre o vídeo uma única vez e devolve a captura junto com os metadados
+    # os metadados vêm do cache de probe; se faltarem, são lidos desta mesma captura
+    # cache=False ignora o json em disco (o cache em memória do processo continua)
+    # quem só precisa dos metadados usa probe_video, que não abre o vídeo com o cache válido
+    cap = open_capture(video_path)
+    try:
+        info = probe_video(video_path, cap=cap, exact=exact, cache_dir=cache_dir, use_disk=cache)
+    except Exception:
+        cap.release()
+        raise
+    return cap, info
+
+
+def build_overlay_table(df, df_cvat=None, total=0, tracks=None):
+    # junta num único array (frames x 9) tudo o que é desenhado em cada frame
+    # colunas ausentes ficam como nan e simplesmente não são desenhadas
+    # tracks: lista opcional de tracks extras ({"name", "frame", "x2d", "y2d", "speed"}), cada um
+    # acrescenta 3 colunas (TRACK_COLUMNS) desenhadas junto na mesma passada
+    tracks = tracks or []
+    n = max(int(total), len(df))
+    if df_cvat is not None and len(df_cvat):
+        n = max(n, int(df_cvat["frame"].max()) + 1)
+    for track in tracks:
+        if len(track["frame"]):
+            n = max(n, int(np.max(track["frame"])) + 1)
+
+    base = len(OVERLAY_COLUMNS)
+    table = np.full((n, base + len(TRACK_COLUMNS) * len(tracks)), np.nan)
+    for j, col in enumerate(OVERLAY_COLUMNS[:7]):
+        if col in df.columns:
+            table[:len(df), j] = df[col].to_numpy(dtype=float)
+
+    if df_cvat is not None and len(df_cvat):
+        frames = df_cvat["frame"].to_numpy(dtype=int)
+        ok = frames >= 0
+        table[frames[ok], 7] = df_cvat["x2d"].to_numpy(dtype=float)[ok]
+        table[frames[ok], 8] = df_cvat["y2d"].to_numpy(dtype=float)[ok]
+
+    for j, track in enumerate(tracks):
+        col = base + len(TRACK_COLUMNS) * j
+        frames = np.asarray(track["frame"], dtype=int)
+        ok = frames >= 0
+        table[frames[ok], col] = np.asarray(track["x2d"], dtype=float)[ok]
+        table[frames[ok], col + 1] = np.asarray(track["y2d"], dtype=float)[ok]
+        speed = np.asarray(track["speed"], dtype=float)[:n]
+        table[:len(speed), col + 2] = speed
+    return table
+
+
+def track_names(tracks):
+    # rótulos dos tracks extras, na ordem das colunas da tabela de overlay
+    return [track["name"] for track in tracks or []]
+
+
+def overlay_primitives(frame_idx, fps, row, names=()):
+    # lista das primitivas de desenho de uma linha da tabela de overlay, na ordem em que são desenhadas
+    # ("text", texto, origem, escala, cor bgr, espessura) ou ("circle", centro, raio, cor bgr, espessura)
+    # names: rótulos dos tracks extras (colunas depois das 9 primeiras)
+    x, y, z, spd, ax, ay, az, x2d, y2d = row[:len(OVERLAY_COLUMNS)]
+    prims = []
+    if not (np.isnan(x) or np.isnan(y) or np.isnan(z)):
+        prims += position_primitives(frame_idx, fps, x, y, z)
+
+        if np.isfinite(spd):
+            prims += velocity_primitives(spd)
 
-    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if np.isfinite(ax) and np.isfinite(ay) and np.isfinite(az):
+            prims += acceleration_primitives(np.sqrt(ax**2 + ay**2 + az**2))
 
-    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for j in range((len(row) - len(OVERLAY_COLUMNS)) // len(TRACK_COLUMNS)):
+        tx, ty, tspd = row[len(OVERLAY_COLUMNS) + len(TRACK_COLUMNS) * j:][:len(TRACK_COLUMNS)]
+        if not (np.isnan(tx) or np.isnan(ty)):
+            name = names[j] if j < len(names) else f"#{j + 1}"
+            prims += track_point_primitives(tx, ty, name, tspd, TRACK_COLORS[j % len(TRACK_COLORS)])
+
+    if not (np.isnan(x2d) or np.isnan(y2d)):
+        prims += cvat_point_primitives(x2d, y2d)
+    return prims
+
+
+def draw_primitives(frame, prims):
+    # desenha as primitivas com as mesmas chamadas do opencv de sempre
+    for prim in prims:
+        if prim[0] == "text":
+            _, txt, org, scale, color, thickness = prim
+            cv2.putText(frame, txt, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        else:
+            _, center, radius, color, thickness = prim
+            cv2.circle(frame, center, radius, color, thickness)
+
+
+def draw_overlay(frame, frame_idx, fps, row, compositor=None, names=()):
+    # desenha no frame todas as informações de uma linha da tabela de overlay
+    # com um OverlayCompositor os textos saem do cache de sprites em vez de novas chamadas ao putText
+    prims = overlay_primitives(frame_idx, fps, row, names)
+    if compositor is not None:
+        compositor.draw(frame, prims)
+    else:
+        draw_primitives(frame, prims)
+
+
+def default_key_frames(total):
+    # primeiro, meio e último frame do vídeo com os nomes de arquivo de sempre
+    return [
+        (0, "primeiro_frame.png"),
+        (total // 2, "frame_meio.png"),
+        (max(total - 1, 0), "ultimo_frame.png"),
+    ]
+
+
+def annotate_video(video, df, out_path, fps, df_cvat=None, key_frames=None, workers=0, chunks=0,
+                   text_cache=0, preview_scale=None, preview_roi=None, info=None, tracks=None, path=None):
+    # anota no vídeo o frame, tempo, posição 3d, módulo da velocidade, módulo da aceleração e o ponto 2d do cvat
+    # video pode ser um caminho ou uma captura já aberta (por open_video, com info = metadados devolvidos);
+    # a captura é liberada aqui
+    # key_frames: lista opcional de (frame, caminho png) salvos durante a mesma passada de decodificação
+    # workers > 0 liga o pipeline com threads (leitura -> desenho -> escrita)
+    # chunks > 1 divide o vídeo em trechos renderizados em processos separados (exige caminho do vídeo;
+    # sem ffmpeg para juntar os trechos segue a passada sequencial)
+    # text_cache > 0 desenha os textos por um cache lru com até text_cache sprites
+    # preview_scale (ex.: 0.5) e/ou preview_roi=(w, h) geram uma prévia reduzida: recorte móvel em volta
+    # do centro do box do cvat e/ou escala, com o overlay desenhado já na prévia; os frames-chave também
+    # saem da prévia e ganham o sufixo _preview (primeiro_frame_preview.png), sem sobrescrever os pngs
+    # em resolução cheia de uma rodada normal
+    # tracks: tracks extras desenhados junto (ver build_overlay_table)
+    # path: array (frames, 2) opcional com o caminho 3d projetado em pixels (NaN onde não desenhar),
+    # desenhado como trilha até o frame atual (ver camera.project_series)
+    preview = _preview_options(preview_scale, preview_roi)
+    if chunks and chunks > 1:
+        if isinstance(video, cv2.VideoCapture):
+            raise ValueError("renderização em trechos precisa do caminho do vídeo, não de uma captura")
+        return annotate_video_chunked(video, df, out_path, fps, df_cvat, key_frames, chunks,
+                                      text_cache=text_cache, preview=preview, tracks=tracks, path=path)
+
+    if isinstance(video, cv2.VideoCapture):
+        cap = video
+        info = info or read_capture_info(cap)
+    else:
+        cap, info = open_video(video)
+    if preview:
+        key_frames = preview_key_frames(key_frames)
+
+    w, h, total = info["width"], info["height"], info["frame_count"]
+
+    table = build_overlay_table(df, df_cvat, total, tracks)
+    annotate, out_size = _frame_renderer(table, fps, (w, h), text_cache, preview, track_names(tracks), path)
+    if preview and preview["roi"] is None:
+        _request_decode_size(cap, out_size)
+
+    writer = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, out_size)
     if not writer.isOpened():
+        cap.release()
         raise RuntimeError("falha ao abrir VideoWriter")
 
-    x = df["x3d"].to_numpy()
-    y = df["y3d"].to_numpy()
-    z = df["z3d"].to_numpy()
-    spd = df["speed"].to_numpy() if "speed" in df.columns else None
-    ax = df["ax"].to_numpy() if "ax" in df.columns else None
-    ay = df["ay"].to_numpy() if "ay" in df.columns else None
-    az = df["az"].to_numpy() if "az" in df.columns else None
-    by_frame_cvat = {int(r.frame): r for r in df_cvat.itertuples(index=False)} if df_cvat is not None else {}
-
-    for idx in range(total):
-        ok, frame = cap.read()
-        if not ok:
-            break
-
-        if idx < len(x) and not (np.isnan(x[idx]) or np.isnan(y[idx]) or np.isnan(z[idx])):
-            # Desenhar informações de posição e tempo
-            draw_position_info(frame, idx, fps, x[idx], y[idx], z[idx])
-            
-            # Desenhar velocidade se disponível
-            if spd is not None and idx < len(spd) and np.isfinite(spd[idx]):
-                draw_velocity_info(frame, spd[idx])
-            
-            # Desenhar aceleração se disponível
-            if (ax is not None and ay is not None and az is not None and 
-                idx < len(ax) and np.isfinite(ax[idx]) and np.isfinite(ay[idx]) and np.isfinite(az[idx])):
-                a_mod = np.sqrt(ax[idx]**2 + ay[idx]**2 + az[idx]**2)
-                draw_acceleration_info(frame, a_mod)
-
-        # Desenhar ponto 2D do CVAT
-        r2 = by_frame_cvat.get(idx)
-        if r2 is not None and not (np.isnan(r2.x2d) or np.isnan(r2.y2d)):
-            draw_cvat_point(frame, r2.x2d, r2.y2d)
+    pending = _group_key_frames(key_frames)
+    saved = []
 
+    def emit(idx, frame):
+        # salva os frames-chave à medida que passam, sem reabrir nem buscar no vídeo
+        for path in pending.pop(idx, ()):
+            cv2.imwrite(str(path), frame)
+            saved.append(path)
+            print(f"Frame {idx} salvo como: {path}")
         writer.write(frame)
 
-    cap.release()
-    writer.release()
+    try:
+        if workers and workers > 0:
+            _run_threaded(cap, total, annotate, emit, workers)
+        else:
+            for idx in _frame_indices(total):
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                emit(idx, annotate(idx, frame))
+    finally:
+        cap.release()
+        writer.release()
 
+    for frame_idx in sorted(pending):
+        print(f"Aviso: não foi possível ler o frame {frame_idx}")
+    return saved
 
-def draw_position_info(frame, frame_idx, fps, x, y, z):
-    # desenha informações de posição e tempo no frame
+
+def _frame_indices(total):
+    # índices dos frames a ler; sem contagem no contêiner (total 0) lê até o fim do vídeo
+    return range(total) if total > 0 else itertools.count()
+
+
+def preview_key_frames(key_frames):
+    # nomes dos frames-chave de uma prévia: mesmo caminho com o sufixo _preview
+    return [(idx, Path(path).with_name(f"{Path(path).stem}_preview{Path(path).suffix}"))
+            for idx, path in key_frames or []]
+
+
+def _preview_options(scale=None, roi=None):
+    # normaliza as opções de prévia; None quando o vídeo sai em resolução cheia
+    if scale is not None and not (0 < float(scale) <= 1):
+        raise ValueError(f"escala da prévia deve estar em (0, 1], recebi: {scale}")
+    if roi is not None:
+        roi = (int(roi[0]), int(roi[1]))
+        if roi[0] <= 0 or roi[1] <= 0:
+            raise ValueError(f"recorte da prévia inválido: {roi}")
+    if (scale is None or float(scale) == 1.0) and roi is None:
+        return None
+    return {"scale": float(scale) if scale is not None else 1.0, "roi": roi}
+
+
+def _even(v):
+    # dimensões pares evitam problemas com codificadores
+    return max(2, int(v) - int(v) % 2)
+
+
+def _roi_centers(table, size):
+    # centro do box do cvat em cada frame; sem anotação, repete o último centro conhecido
+    # (antes do primeiro, usa o primeiro; sem nenhum, o centro do vídeo)
+    n = len(table)
+    cx = table[:, 7]
+    cy = table[:, 8]
+    ok = ~(np.isnan(cx) | np.isnan(cy))
+    if not ok.any():
+        return np.full(n, size[0] / 2.0), np.full(n, size[1] / 2.0)
+    last = np.maximum.accumulate(np.where(ok, np.arange(n), -1))
+    last[last < 0] = np.flatnonzero(ok)[0]
+    return cx[last], cy[last]
+
+
+def _path_trail(path):
+    # prepara o caminho projetado uma vez: pontos válidos compactados em int32 e, para cada frame,
+    # quantos deles já passaram; a trilha do frame idx é pts[:count[idx]], sem laço por frame
+    if path is None:
+        return None
+    path = np.asarray(path, dtype=float).reshape(-1, 2)
+    ok = np.isfinite(path).all(axis=1)
+    # truncado como int() e limitado para caber em int32 mesmo com pontos perto do infinito
+    pts = np.clip(path[ok], -1e6, 1e6).astype(np.int32)
+    return pts, np.cumsum(ok), ok
+
+
+def draw_path_trail(frame, trail, idx, offset=(0, 0), scale=(1.0, 1.0)):
+    # desenha a trilha do caminho projetado até o frame idx e marca o ponto do frame atual
+    # offset/scale levam os pontos para as coordenadas de uma prévia recortada/reduzida
+    if trail is None:
+        return
+    pts, count, ok = trail
+    if not len(count):
+        return
+    k = int(count[min(idx, len(count) - 1)])
+    if k == 0:
+        return
+    seg = pts[:k]
+    if offset != (0, 0) or scale != (1.0, 1.0):
+        seg = ((seg - np.array(offset)) * np.array(scale)).astype(np.int32)
+    draw_trajectory_trail(frame, seg, PATH_COLOR, 2)
+    if idx < len(ok) and ok[idx]:
+        cv2.circle(frame, (int(seg[-1][0]), int(seg[-1][1])), 4, PATH_COLOR, -1)
+
+
+def _frame_renderer(table, fps, size, text_cache=0, preview=None, names=(), path=None):
+    # devolve (render(idx, frame) -> frame anotado, tamanho de saída); compartilhado por todos os modos
+    compositor = OverlayCompositor(text_cache) if text_cache and text_cache > 0 else None
+    n = len(table)
+    trail = _path_trail(path)
+
+    if preview is None:
+        def render(idx, frame):
+            draw_path_trail(frame, trail, idx)
+            if idx < n:
+                draw_overlay(frame, idx, fps, table[idx], compositor, names)
+            return frame
+        return render, tuple(size)
+
+    w, h = size
+    scale = preview["scale"]
+    if preview["roi"] is not None:
+        rw, rh = min(preview["roi"][0], w), min(preview["roi"][1], h)
+        cx, cy = _roi_centers(table, size)
+        # canto superior esquerdo do recorte, sempre dentro do frame
+        x0s = np.clip(np.rint(cx - rw / 2.0), 0, w - rw).astype(int)
+        y0s = np.clip(np.rint(cy - rh / 2.0), 0, h - rh).astype(int)
+    else:
+        rw, rh = w, h
+        x0s = y0s = None
+    out_size = (_even(rw * scale), _even(rh * scale))
+    sx, sy = out_size[0] / rw, out_size[1] / rh
+
+    def render(idx, frame):
+        x0 = y0 = 0
+        if x0s is not None:
+            k = min(idx, n - 1)
+            x0, y0 = (int(x0s[k]), int(y0s[k])) if n else (0, 0)
+            frame = frame[y0:y0 + rh, x0:x0 + rw]
+        if (frame.shape[1], frame.shape[0]) != out_size:
+            frame = cv2.resize(frame, out_size, interpolation=cv2.INTER_AREA)
+        elif x0s is not None:
+            frame = np.ascontiguousarray(frame)
+        draw_path_trail(frame, trail, idx, (x0, y0), (sx, sy))
+        if idx < n:
+            # os pontos do cvat vão para as coordenadas da prévia; os textos ficam no canto da prévia
+            row = table[idx].copy()
+            row[7] = (row[7] - x0) * sx
+            row[8] = (row[8] - y0) * sy
+            extra = row[len(OVERLAY_COLUMNS):]
+            extra[0::len(TRACK_COLUMNS)] = (extra[0::len(TRACK_COLUMNS)] - x0) * sx
+            extra[1::len(TRACK_COLUMNS)] = (extra[1::len(TRACK_COLUMNS)] - y0) * sy
+            draw_overlay(frame, idx, fps, row, compositor, names)
+        return frame
+
+    return render, out_size
+
+
+def _request_decode_size(cap, out_size):
+    # pede ao backend para decodificar já em resolução reduzida; backends de arquivo (ffmpeg)
+    # costumam ignorar e aí o render reduz com cv2.resize
+    if cap.set(cv2.CAP_PROP_FRAME_WIDTH, out_size[0]) and cap.set(cv2.CAP_PROP_FRAME_HEIGHT, out_size[1]):
+        return True
+    return False
+
+
+def _group_key_frames(key_frames):
+    # {frame: [caminhos]} para consulta rápida durante a passada
+    # caminhos repetidos no mesmo frame entram uma vez só (gravações em paralelo do mesmo arquivo)
+    pending = {}
+    for frame_idx, path in key_frames or []:
+        paths = pending.setdefault(int(frame_idx), [])
+        if all(str(p) != str(path) for p in paths):
+            paths.append(path)
+    return pending
+
+
+def annotate_video_chunked(video_path, df, out_path, fps, df_cvat=None, key_frames=None, chunks=2,
+                           text_cache=0, preview=None, tracks=None, path=None):
+    # divide [0, total) em trechos; cada processo abre o vídeo, busca o início do seu trecho
+    # (conferida pelo tempo do frame, ver _seek_frame), anota e codifica um segmento mp4v, e o ffmpeg
+    # junta os segmentos sem recodificar
+    # cada segmento é um codificador independente (gop e controle de taxa recomeçam em cada trecho):
+    # o conteúdo de cada frame é o mesmo, mas o vídeo decodificado não é idêntico bit a bit ao da
+    # passada sequencial, só próximo (perda do mp4v)
+    # a tabela de overlay vai para os processos por memória compartilhada, sem serializar DataFrames
+    info = probe_video(video_path)
+    total = info["frame_count"]
+    size = (info["width"], info["height"])
+    ffmpeg = shutil.which("ffmpeg")
+    if total <= 0 or not ffmpeg:
+        # sem contagem de frames não há como dividir; sem ffmpeg juntar os trechos exigiria decodificar e
+        # recodificar tudo num único codificador, mais lento que a passada sequencial
+        if total <= 0:
+            print("Aviso: o vídeo não informa a contagem de frames; anotando sem dividir em trechos")
+        else:
+            print("Aviso: ffmpeg não encontrado para juntar os trechos; anotando sem dividir em trechos")
+        return annotate_video(video_path, df, out_path, fps, df_cvat, key_frames, text_cache=text_cache,
+                              preview_scale=preview["scale"] if preview else None,
+                              preview_roi=preview["roi"] if preview else None, tracks=tracks, path=path)
+
+    table = build_overlay_table(df, df_cvat, total, tracks)
+    names = track_names(tracks)
+    pending = _group_key_frames(preview_key_frames(key_frames) if preview else key_frames)
+    chunks = max(1, min(int(chunks), total))
+    bounds = np.linspace(0, total, chunks + 1).astype(int)
+
+    out_path = Path(out_path)
+    tmpdir = Path(tempfile.mkdtemp(prefix=".traj3d_trechos_", dir=out_path.parent))
+    shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+    try:
+        np.ndarray(table.shape, dtype=table.dtype, buffer=shm.buf)[:] = table
+        jobs = []
+        for k in range(chunks):
+            start, stop = int(bounds[k]), int(bounds[k + 1])
+            keys = {i: paths for i, paths in pending.items() if start <= i < stop}
+            seg = tmpdir / f"trecho_{k:04d}.mp4"
+            jobs.append((str(video_path), shm.name, table.shape, fps, start, stop,
+                         str(seg), size, "mp4v", keys, text_cache, preview, names, path))
+
+        with ProcessPoolExecutor(max_workers=chunks) as pool:
+            results = list(pool.map(_render_chunk, jobs))
+        _concat_segments_ffmpeg(ffmpeg, [job[6] for job in jobs], out_path, tmpdir)
+    finally:
+        shm.close()
+        shm.unlink()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    saved = []
+    for k, (n_read, chunk_saved) in enumerate(results):
+        saved.extend(chunk_saved)
+        start = int(bounds[k])
+        for frame_idx in range(start, start + n_read):
+            pending.pop(frame_idx, None)
+    for frame_idx in sorted(pending):
+        print(f"Aviso: não foi possível ler o frame {frame_idx}")
+    return saved
+
+
+def _render_chunk(job):
+    # trabalho de um processo: [start, stop) do vídeo anotado gravado num segmento próprio
+    (video_path, shm_name, shape, fps, start, stop, seg_path, size, fourcc, keys, text_cache, preview,
+     names, path) = job
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        render, out_size = _frame_renderer(table, fps, size, text_cache, preview, names, path)
+        cap, info = open_video(video_path)
+        if preview and preview["roi"] is None:
+            _request_decode_size(cap, out_size)
+        # o primeiro frame do trecho: busca conferida pelo tempo do frame ou, se ela errar (ou o vídeo
+        # não informar fps), leitura do início avançando com grab()
+        rate = info["fps"] or 0.0
+        grabbed = start > 0 and rate > 0 and _seek_frame(cap, start, rate)
+        if start > 0 and not grabbed:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            for _ in range(start):
+                if not cap.grab():
+                    break
+        writer = cv2.VideoWriter(seg_path, cv2.VideoWriter_fourcc(*fourcc), fps, out_size)
+        if not writer.isOpened():
+            cap.release()
+            raise RuntimeError("falha ao abrir VideoWriter")
+
+        saved = []
+        idx = start
+        while idx < stop:
+            if grabbed:
+                ok, frame = cap.retrieve()
+                grabbed = False
+            else:
+                ok, frame = cap.read()
+            if not ok:
+                break
+            frame = render(idx, frame)
+            for key_path in keys.get(idx, ()):
+                cv2.imwrite(str(key_path), frame)
+                saved.append(key_path)
+                print(f"Frame {idx} salvo como: {key_path}")
+            writer.write(frame)
+            idx += 1
+
+        cap.release()
+        writer.release()
+        del table, render
+    finally:
+        shm.close()
+    return idx - start, saved
+
+
+def _concat_segments_ffmpeg(ffmpeg, segments, out_path, tmpdir):
+    # concatena os segmentos mp4 sem recodificar (concat demuxer do ffmpeg)
+    listing = Path(tmpdir) / "trechos.txt"
+    listing.write_text("".join(f"file '{Path(seg).resolve()}'\n" for seg in segments))
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+           "-i", str(listing), "-c", "copy", str(out_path)]
+    if subprocess.run(cmd).returncode != 0:
+        raise RuntimeError("ffmpeg falhou ao concatenar os trechos do vídeo")
+
+
+def _run_threaded(cap, total, annotate, emit, workers):
+    # pipeline: uma thread decodifica, n threads desenham e uma thread codifica
+    # as filas são limitadas, então a leitura espera quando a escrita fica para trás (memória fica limitada)
+    # a ordem dos frames é mantida porque a fila de escrita recebe os futures na ordem de leitura
+    depth = 2 * workers
+    read_q = queue.Queue(maxsize=depth)
+    write_q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors = []
+
+    def put(q, item):
+        # put que desiste se outra etapa falhou, para não travar com a fila cheia
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for idx in _frame_indices(total):
+                ok, frame = cap.read()
+                if not ok or not put(read_q, (idx, frame)):
+                    break
+        except Exception as exc:
+            errors.append(exc)
+            stop.set()
+        finally:
+            read_q.put(None)
+
+    def writer_loop():
+        try:
+            while True:
+                item = write_q.get()
+                if item is None:
+                    break
+                idx, fut = item
+                emit(idx, fut.result())
+        except Exception as exc:
+            errors.append(exc)
+            stop.set()
+            # esvazia a fila para liberar quem estiver esperando
+            while write_q.get() is not None:
+                pass
+
+    t_read = threading.Thread(target=reader, name="traj3d-leitura", daemon=True)
+    t_write = threading.Thread(target=writer_loop, name="traj3d-escrita", daemon=True)
+    t_read.start()
+    t_write.start()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="traj3d-desenho") as pool:
+        item = read_q.get()
+        while item is not None:
+            idx, frame = item
+            if not put(write_q, (idx, pool.submit(annotate, idx, frame))):
+                break
+            item = read_q.get()
+        # consome o que sobrou até o sentinela para o leitor nunca ficar preso na fila cheia
+        while item is not None:
+            item = read_q.get()
+        write_q.put(None)
+        t_write.join()
+
+    stop.set()
+    t_read.join()
+    if errors:
+        raise errors[0]
+
+
+def _outlined_text(txt, org, scale=0.6):
+    # texto com contorno preto e preenchimento branco para melhor legibilidade
+    return [
+        ("text", txt, org, scale, (0, 0, 0), 3),
+        ("text", txt, org, scale, (255, 255, 255), 2),
+    ]
+
+
+def position_primitives(frame_idx, fps, x, y, z):
+    # informações de posição e tempo
     txt1 = f"frame {frame_idx}  t {frame_idx/fps:0.3f}s"
     txt2 = f"x {x:0.3f}  y {y:0.3f}  z {z:0.3f}"
-    
-    # Desenhar com contorno preto e texto branco para melhor legibilidade
-    cv2.putText(frame, txt1, (15, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-    cv2.putText(frame, txt1, (15, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-    cv2.putText(frame, txt2, (15, 52), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-    cv2.putText(frame, txt2, (15, 52), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return _outlined_text(txt1, (15, 30)) + _outlined_text(txt2, (15, 52))
+
+
+def velocity_primitives(speed):
+    # informações de velocidade
+    return _outlined_text(f"|v| {speed:0.3f} m/s", (15, 74))
+
+
+def acceleration_primitives(a_mod):
+    # informações de aceleração
+    return _outlined_text(f"|a| {a_mod:0.3f} m/s^2", (15, 96))
+
+
+def cvat_point_primitives(x2d, y2d):
+    # ponto 2d do cvat com o rótulo ao lado
+    p = (int(x2d), int(y2d))
+    return [
+        ("circle", p, 8, (0, 255, 0), 2),
+        ("text", "Bola", (p[0] + 12, p[1] - 12), 0.5, (0, 255, 0), 2),
+    ]
+
+
+def track_point_primitives(x2d, y2d, name, speed, color):
+    # ponto 2d de um track extra com o rótulo e o módulo da velocidade ao lado
+    p = (int(x2d), int(y2d))
+    txt = name if np.isnan(speed) else f"{name} {speed:0.2f} m/s"
+    return [
+        ("circle", p, 8, color, 2),
+        ("text", txt, (p[0] + 12, p[1] - 12), 0.5, color, 2),
+    ]
+
+
+def draw_position_info(frame, frame_idx, fps, x, y, z):
+    # desenha informações de posição e tempo no frame
+    draw_primitives(frame, position_primitives(frame_idx, fps, x, y, z))
 
 
 def draw_velocity_info(frame, speed):
     # desenha informações de velocidade no frame
-    txt3 = f"|v| {speed:0.3f} m/s"
-    cv2.putText(frame, txt3, (15, 74), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-    cv2.putText(frame, txt3, (15, 74), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    draw_primitives(frame, velocity_primitives(speed))
 
 
 def draw_acceleration_info(frame, a_mod):
     # desenha informações de aceleração no frame
-    txt4 = f"|a| {a_mod:0.3f} m/s^2"
-    cv2.putText(frame, txt4, (15, 96), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3)
-    cv2.putText(frame, txt4, (15, 96), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    draw_primitives(frame, acceleration_primitives(a_mod))
 
 
 def draw_cvat_point(frame, x2d, y2d):
     # desenha o ponto 2d do cvat no frame
-    p = (int(x2d), int(y2d))
-    cv2.circle(frame, p, 8, (0, 255, 0), 2)
-    cv2.putText(frame, "Bola", (p[0] + 12, p[1] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    draw_primitives(frame, cvat_point_primitives(x2d, y2d))
 
 
 def draw_trajectory_trail(frame, trajectory_points, color=(255, 0, 0), thickness=2):
-    # desenha uma trilha da trajetória no frame
+    # desenha uma trilha da trajetória no frame (uma chamada ao polylines para todos os segmentos)
     if len(trajectory_points) < 2:
         return
-    
-    for i in range(1, len(trajectory_points)):
-        pt1 = (int(trajectory_points[i-1][0]), int(trajectory_points[i-1][1]))
-        pt2 = (int(trajectory_points[i][0]), int(trajectory_points[i][1]))
-        cv2.line(frame, pt1, pt2, color, thickness)
+
+    pts = np.asarray(trajectory_points)[:, :2].astype(np.int32)
+    cv2.polylines(frame, [pts], False, color, thickness)
 
 
 def draw_velocity_vector(frame, x2d, y2d, vx, vy, scale=10, color=(0, 255, 255)):
@@ -122,72 +654,126 @@ def create_info_panel(frame, info_dict, position=(10, 10)):
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
 
 
-def extract_key_frames(video_path, df, output_dir, df_cvat=None):
-    # extrai 3 frames específicos: primeiro, meio e último frame do vídeo anotado
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError(f"não consegui abrir o vídeo: {video_path}")
+def extract_key_frames(video, df, output_dir, df_cvat=None, fps=None, frames=None,
+                       seek_gap=300, png_workers=4, info=None, tracks=None, path=None):
+    # extrai frames anotados do vídeo; por padrão o primeiro, o do meio e o último
+    # video pode ser um caminho ou uma captura já aberta (liberada aqui)
+    # frames: lista de índices ou de (índice, nome do png); é ordenada e lida numa passada só para frente:
+    # frames intermediários são pulados com grab() (sem retrieve) e só lacunas maiores que seek_gap
+    # usam busca de verdade, que no mp4 volta ao keyframe anterior e decodifica até o alvo; a busca é
+    # conferida pelo tempo do frame decodificado e, se errar, a leitura recomeça do início com grab()
+    # os pngs são codificados num pool de threads enquanto a leitura continua
+    if isinstance(video, cv2.VideoCapture):
+        cap = video
+        info = info or read_capture_info(cap)
+    else:
+        cap, info = open_video(video)
+    total = info["frame_count"]
+    fps = fps or info["fps"]
+    table = build_overlay_table(df, df_cvat, total, tracks)
+    names = track_names(tracks)
+    trail = _path_trail(path)
+
+    if frames is None:
+        frames = default_key_frames(total)
+    wanted = _group_key_frames(
+        (f, output_dir / f"frame_{int(f):06d}.png") if np.isscalar(f) else (f[0], output_dir / f[1])
+        for f in frames
+    )
 
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    
-    # Calcular frames específicos
-    first_frame = 0
-    middle_frame = total // 2
-    last_frame = total - 1
-    
-    frames_to_extract = [
-        (first_frame, "primeiro_frame.png"),
-        (middle_frame, "frame_meio.png"), 
-        (last_frame, "ultimo_frame.png")
-    ]
-    
-    # Preparar dados para anotação
-    x = df["x3d"].to_numpy()
-    y = df["y3d"].to_numpy()
-    z = df["z3d"].to_numpy()
-    spd = df["speed"].to_numpy() if "speed" in df.columns else None
-    ax = df["ax"].to_numpy() if "ax" in df.columns else None
-    ay = df["ay"].to_numpy() if "ay" in df.columns else None
-    az = df["az"].to_numpy() if "az" in df.columns else None
-    by_frame_cvat = {int(r.frame): r for r in df_cvat.itertuples(index=False)} if df_cvat is not None else {}
-    
     extracted_files = []
-    
-    for frame_idx, filename in frames_to_extract:
-        # Ir para o frame específico
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ok, frame = cap.read()
-        
-        if not ok:
-            print(f"Aviso: não foi possível ler o frame {frame_idx}")
-            continue
-            
-        # Anotar o frame se houver dados válidos
-        if frame_idx < len(x) and not (np.isnan(x[frame_idx]) or np.isnan(y[frame_idx]) or np.isnan(z[frame_idx])):
-            # Desenhar informações de posição e tempo
-            draw_position_info(frame, frame_idx, fps, x[frame_idx], y[frame_idx], z[frame_idx])
-            
-            # Desenhar velocidade se disponível
-            if spd is not None and frame_idx < len(spd) and np.isfinite(spd[frame_idx]):
-                draw_velocity_info(frame, spd[frame_idx])
-            
-            # Desenhar aceleração se disponível
-            if (ax is not None and ay is not None and az is not None and 
-                frame_idx < len(ax) and np.isfinite(ax[frame_idx]) and np.isfinite(ay[frame_idx]) and np.isfinite(az[frame_idx])):
-                a_mod = np.sqrt(ax[frame_idx]**2 + ay[frame_idx]**2 + az[frame_idx]**2)
-                draw_acceleration_info(frame, a_mod)
-
-        # Desenhar ponto 2D do CVAT
-        r2 = by_frame_cvat.get(frame_idx)
-        if r2 is not None and not (np.isnan(r2.x2d) or np.isnan(r2.y2d)):
-            draw_cvat_point(frame, r2.x2d, r2.y2d)
-        
-        # Salvar o frame
-        output_path = output_dir / filename
-        cv2.imwrite(str(output_path), frame)
-        extracted_files.append(output_path)
-        print(f"Frame {frame_idx} salvo como: {output_path}")
-    
+    rate = info["fps"] or 0.0
+    pos = 0  # índice do próximo frame que a captura entrega
+    with ThreadPoolExecutor(max_workers=max(1, png_workers)) as pool:
+        jobs = []
+        for frame_idx in sorted(wanted):
+            ok = frame_idx >= 0
+            grabbed = False
+            if ok and frame_idx - pos > seek_gap and rate > 0:
+                grabbed = _seek_frame(cap, frame_idx, rate)
+                if grabbed:
+                    pos = frame_idx + 1
+                else:
+                    # busca imprecisa: recomeça do início e avança com grab()
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    pos = 0
+            while ok and not grabbed and pos < frame_idx:
+                ok = cap.grab()
+                pos += 1
+            if ok and grabbed:
+                ok, frame = cap.retrieve()
+            elif ok:
+                ok, frame = cap.read()
+                pos += 1
+
+            if not ok:
+                print(f"Aviso: não foi possível ler o frame {frame_idx}")
+                continue
+
+            draw_path_trail(frame, trail, frame_idx)
+            if frame_idx < len(table):
+                draw_overlay(frame, frame_idx, fps, table[frame_idx], names=names)
+
+            for output_path in wanted[frame_idx]:
+                jobs.append((frame_idx, output_path, pool.submit(cv2.imwrite, str(output_path), frame)))
+
+        for frame_idx, output_path, job in jobs:
+            if not job.result():
+                print(f"Aviso: não foi possível salvar {output_path}")
+                continue
+            extracted_files.append(output_path)
+            print(f"Frame {frame_idx} salvo como: {output_path}")
+
     cap.release()
     return extracted_files
+
+
+def _seek_frame(cap, frame_idx, rate):
+    # busca até frame_idx e pega (grab) o frame; o POS_FRAMES do backend ffmpeg só devolve o índice
+    # pedido, então a busca é conferida pelo tempo do frame decodificado (POS_MSEC, do pts)
+    # True se o frame pego é o pedido (a meio frame de distância) e pode ser lido com retrieve()
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    if not cap.grab():
+        return False
+    return abs(cap.get(cv2.CAP_PROP_POS_MSEC) - frame_idx * 1000.0 / rate) <= 500.0 / rate
+
+
+def resolve_key_frames(spec, total, df_cvat=None, every=None):
+    # converte a lista do usuário em [(frame, nome do png)]
+    # aceita índices e as palavras inicio, meio, fim, lancamento, pico e pouso; every=n soma um frame a cada n
+    named = dict((("inicio", 0), ("meio", 1), ("fim", 2)))
+    defaults = default_key_frames(total)
+    events = None
+    out = []
+    for item in (spec or []):
+        item = str(item).strip().lower()
+        if not item:
+            continue
+        if item in named:
+            out.append(defaults[named[item]])
+        elif item in ("lancamento", "pico", "pouso"):
+            if df_cvat is None:
+                raise ValueError(f"frame '{item}' precisa das anotações do cvat")
+            if events is None:
+                events = dict(flight_key_frames(df_cvat))
+            out.append((events[item], f"frame_{item}.png"))
+        else:
+            idx = int(item)
+            out.append((idx, f"frame_{idx:06d}.png"))
+    if every:
+        out += [(idx, f"frame_{idx:06d}.png") for idx in range(0, total, int(every))]
+    # o mesmo frame pedido duas vezes (ex.: 0 e every) viraria duas gravações do mesmo png
+    return list(dict.fromkeys(out))
+
+
+def flight_key_frames(df_cvat):
+    # frames de lançamento, pico de altura e pouso detectados nos pontos do cvat (numa chamada só)
+    frames, y2d, lengths = pad_tracks([{"frame": df_cvat["frame"].to_numpy(),
+                                        "x2d": df_cvat["x2d"].to_numpy(dtype=float),
+                                        "y2d": df_cvat["y2d"].to_numpy(dtype=float)}])
+    events = detect_flight_events_batch(frames, y2d, lengths)
+    return [
+        ("lancamento", int(events["launch"][0])),
+        ("pico", int(events["peak"][0])),
+        ("pouso", int(events["landing"][0])),
+    ]
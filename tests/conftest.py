@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# o pacote fica em src/, como no main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
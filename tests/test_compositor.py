@@ -0,0 +1,64 @@
+"""
+compara o OverlayCompositor com o desenho direto do putText (até TOL níveis de diferença) e mede
+se o sprite sai mais barato que o putText
+"""
+
+import numpy as np
+import pytest
+
+from traj3d.compositor import OverlayCompositor, benchmark_compositor
+from traj3d.video_annot import draw_primitives, overlay_primitives
+
+# diferença máxima por canal entre sprite e putText (arredondamento do alfa em uint8)
+TOL = 2
+
+
+def _both(comp, prims, shape, rng):
+    # desenha as mesmas primitivas pelo putText e pelo compositor sobre o mesmo fundo aleatório
+    bg = rng.integers(0, 256, shape, dtype=np.uint8)
+    direct = bg.copy()
+    cached = bg.copy()
+    draw_primitives(direct, prims)
+    comp.draw(cached, prims)
+    return direct, cached
+
+
+def _assert_close(cached, direct):
+    np.testing.assert_array_less(np.abs(cached.astype(int) - direct), TOL + 1)
+
+
+def test_overlay_matches_puttext():
+    # overlay real: rótulos fixos (viram sprites) e ponto do cvat andando, inclusive pelas bordas
+    rng = np.random.default_rng(0)
+    comp = OverlayCompositor(64)
+    for f in range(120):
+        row = np.array([1.2345, -0.5, 2.0, 3.25 if f % 3 else np.nan, 0.0, 0.0, -9.81,
+                        rng.uniform(-20, 660), rng.uniform(-20, 500)])
+        prims = overlay_primitives(f % 4, 30.0, row)
+        direct, cached = _both(comp, prims, (480, 640, 3), rng)
+        _assert_close(cached, direct)
+    assert comp.hits > 0
+
+
+@pytest.mark.parametrize("scale,thickness", [(0.5, 1), (0.6, 2), (1.3, 3)])
+def test_random_labels_match_puttext(scale, thickness):
+    # textos, cores e origens aleatórios (com contorno), desenhados duas vezes para passar pelo sprite
+    rng = np.random.default_rng(thickness)
+    comp = OverlayCompositor(32, admit=1)
+    for k in range(40):
+        txt = f"x {rng.normal():0.3f} |v| Bola {k % 5}"
+        org = (int(rng.integers(-30, 300)), int(rng.integers(-10, 250)))
+        outline = tuple(int(c) for c in rng.integers(0, 256, 3))
+        fill = tuple(int(c) for c in rng.integers(0, 256, 3))
+        prims = [("text", txt, org, scale, outline, thickness + 1),
+                 ("text", txt, org, scale, fill, thickness)]
+        for _ in range(2):
+            direct, cached = _both(comp, prims, (240, 320, 3), rng)
+            _assert_close(cached, direct)
+
+
+def test_sprites_beat_puttext():
+    # rótulos repetidos saem mais baratos pelo sprite (melhor de três medidas, para ruído do sistema)
+    best = min((benchmark_compositor(size=(1280, 720), frames=100) for _ in range(3)),
+               key=lambda r: r["sprite_us"] / r["puttext_us"])
+    assert best["sprite_us"] < best["puttext_us"]
@@ -0,0 +1,234 @@
+"""
+compara a detecção em lote com as funções por track (e com a versão original em pandas) e o
+OnlineFlightDetector com detect_flight_events_batch nos mesmos pontos (tracks sem picos de
+ruído), além dos casos em que o detector em fluxo ignora um pico ou um segundo mínimo
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traj3d.detection import (OnlineFlightDetector, detect_flight_events_batch, detect_flight_window,
+                              detect_flight_windows_batch, detect_landing_frame, detect_launch_frame,
+                              find_peak_height_frame, pad_tracks)
+from traj3d.io_cvat import iter_box_centers, load_cvat_tracks
+
+ANNOTATIONS = Path(__file__).resolve().parents[1] / "annotations.xml"
+# janelas de confirmação do detector em fluxo (com 0 ou 1 ponto o pouso pode sair logo depois
+# do apogeu, onde a bola ainda desce menos que o limiar por frame)
+LAGS = (3, 10)
+
+
+def _online(frames, x2d, y2d, lag):
+    # passa os pontos um a um pelo detector; devolve result() e o evento emitido de cada tipo
+    # (cada um no máximo uma vez)
+    det = OnlineFlightDetector(lag=lag)
+    last = {}
+    for f, x, y in zip(frames, x2d, y2d):
+        for kind, frame, seen in det.update(f, x, y):
+            assert seen == f
+            assert kind not in last, kind
+            last[kind] = frame
+    for kind, frame, _ in det.finish():
+        assert kind not in last, kind
+        last[kind] = frame
+    return det.result(), last
+
+
+def _check(tracks, lag):
+    # cada track (dict com frame, x2d, y2d) pelo detector em fluxo e todos juntos pelo lote
+    frames, y2d, lengths = pad_tracks(tracks)
+    batch = detect_flight_events_batch(frames, y2d, lengths)
+    for k, track in enumerate(tracks):
+        result, last = _online(track["frame"], track["x2d"], track["y2d"], lag)
+        expected = {kind: int(batch[kind][k]) for kind in ("launch", "peak", "landing")}
+        assert result == expected, k
+        if lengths[k]:
+            assert last == expected, k
+        else:
+            assert last == {}, k
+
+
+def _longer_than_window(tracks, lag):
+    # voos mais curtos que a janela de confirmação terminam antes de o lançamento ser confirmado;
+    # os tracks vazios ficam
+    valid = lambda t: int((~(np.isnan(t["x2d"]) | np.isnan(t["y2d"]))).sum())
+    return [t for t in tracks if valid(t) == 0 or valid(t) >= 3 * (lag + 1)]
+
+
+def _random_tracks(rng, n, noise=2.0):
+    # parábolas em coordenadas de imagem com ruído, buracos nan e alguns tracks vazios ou curtos
+    tracks = []
+    for _ in range(n):
+        m = int(rng.integers(0, 120))
+        start = int(rng.integers(0, 50))
+        frames = start + np.cumsum(rng.integers(1, 3, m))
+        t = np.linspace(0.0, 1.0, m)
+        y = 400.0 - rng.uniform(50, 300) * 4 * t * (1 - t) + rng.normal(0, rng.uniform(0, noise), m)
+        x = 100.0 + 300.0 * t
+        y[rng.random(m) < 0.05] = np.nan
+        x[rng.random(m) < 0.02] = np.nan
+        tracks.append({"frame": frames, "x2d": x, "y2d": y})
+    return tracks
+
+
+def _write_cvat(path, tracks):
+    # export mínimo do cvat com um track por entrada (box de 10 px em volta do centro)
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', "<annotations>"]
+    for k, track in enumerate(tracks):
+        lines.append(f'  <track id="{k}" label="ball" source="manual">')
+        for f, x, y in zip(track["frame"], track["x2d"], track["y2d"]):
+            lines.append(f'    <box frame="{f}" outside="0" occluded="0" xtl="{x - 5:.2f}" '
+                         f'ytl="{y - 5:.2f}" xbr="{x + 5:.2f}" ybr="{y + 5:.2f}" z_order="0"></box>')
+        lines.append("  </track>")
+    lines.append("</annotations>")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def _pandas_events(d):
+    # implementação original por track (cópia do DataFrame, coluna dy, máscara booleana)
+    d = d.copy()
+    d["dy"] = d["y2d"].diff()
+    fall, rise = d["dy"] < -0.5, d["dy"] > 0.5
+    return {
+        "launch": int(d.loc[fall, "frame"].iloc[0]) if fall.any() else int(d["frame"].iloc[0]),
+        "peak": int(d.loc[d["y2d"].idxmin(), "frame"]),
+        "landing": int(d.loc[rise, "frame"].iloc[-1]) if rise.any() else int(d["frame"].iloc[-1]),
+    }
+
+
+def _track_events(d):
+    return {"launch": detect_launch_frame(d), "peak": find_peak_height_frame(d), "landing": detect_landing_frame(d)}
+
+
+def test_batch_matches_per_track_with_nan_gaps():
+    # linhas com nan no meio, passadas como estão: os saltos através de um nan não contam em nenhum dos lados
+    tracks = [t for t in _random_tracks(np.random.default_rng(7), 500) if np.isfinite(t["y2d"]).any()]
+    width = max(len(t["frame"]) for t in tracks)
+    frames = np.full((len(tracks), width), -1, dtype=np.int64)
+    y2d = np.full((len(tracks), width), np.nan)
+    for k, t in enumerate(tracks):
+        frames[k, :len(t["frame"])] = t["frame"]
+        y2d[k, :len(t["y2d"])] = t["y2d"]
+    batch = detect_flight_events_batch(frames, y2d, [len(t["frame"]) for t in tracks])
+
+    for k, t in enumerate(tracks):
+        d = pd.DataFrame(t)
+        expected = {kind: int(batch[kind][k]) for kind in ("launch", "peak", "landing")}
+        assert _track_events(d) == expected, k
+        assert _pandas_events(d) == expected, k
+
+
+def test_batch_matches_per_track_after_dropping_nan():
+    # caminho de pad_tracks: pontos com x2d ou y2d nan saem antes; o mesmo vale para a janela do voo
+    tracks = _random_tracks(np.random.default_rng(8), 500)
+    frames, y2d, lengths = pad_tracks(tracks)
+    batch = detect_flight_events_batch(frames, y2d, lengths)
+    f0, f1 = detect_flight_windows_batch(frames, y2d, lengths)
+
+    for k, t in enumerate(tracks):
+        ok = ~(np.isnan(t["x2d"]) | np.isnan(t["y2d"]))
+        d = pd.DataFrame({name: col[ok] for name, col in t.items()})
+        if not len(d):
+            assert batch["launch"][k] == batch["peak"][k] == batch["landing"][k] == f0[k] == f1[k] == -1
+            continue
+        expected = {kind: int(batch[kind][k]) for kind in ("launch", "peak", "landing")}
+        assert _track_events(d) == expected, k
+        assert _pandas_events(d) == expected, k
+        assert detect_flight_window(d) == (f0[k], f1[k]), k
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_online_matches_batch_on_annotations(lag):
+    # annotations.xml do repositório: todos os tracks e o primeiro lido em fluxo do xml
+    tracks = list(load_cvat_tracks(ANNOTATIONS, cache=False).values())
+    _check(tracks, lag)
+
+    frames, x2d, y2d = (np.array(c) for c in zip(*iter_box_centers(ANNOTATIONS)))
+    result, last = _online(frames, x2d, y2d, lag)
+    assert result == last == {kind: int(v[0]) for kind, v in
+                              detect_flight_events_batch(*pad_tracks([(frames, y2d)])).items()}
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_online_matches_batch_on_random_tracks(lag):
+    # sem ruído (com buracos nan) toda queda forte é o começo de uma subida que continua
+    _check(_longer_than_window(_random_tracks(np.random.default_rng(lag), 500, noise=0.0), lag), lag)
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_online_emits_each_event_once_on_noisy_tracks(lag):
+    # com ruído o fluxo pode discordar do lote, mas cada evento sai uma vez e result() é o emitido
+    for k, track in enumerate(_random_tracks(np.random.default_rng(50 + lag), 500)):
+        result, last = _online(track["frame"], track["x2d"], track["y2d"], lag)
+        if np.isfinite(track["x2d"] + track["y2d"]).any():
+            assert last == result, k
+        else:
+            assert last == {} and result == {"launch": -1, "peak": -1, "landing": -1}, k
+
+
+def _flight(rest_before=20, rest_after=30):
+    # bola parada, voo parabólico de 40 frames e bola parada de novo no chão
+    t = np.linspace(0.0, 1.0, 41)
+    y = np.concatenate([np.full(rest_before, 400.0), 400.0 - 200.0 * 4 * t * (1 - t), np.full(rest_after, 400.0)])
+    return np.arange(len(y)), y
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_one_frame_spikes_do_not_fire(lag):
+    # pico de um frame com a bola parada antes do lançamento e depois do pouso: o lote dispara
+    # nos dois, o fluxo fica com os eventos do voo limpo
+    frames, clean = _flight()
+    y = clean.copy()
+    y[8] -= 10.0
+    y[len(y) - 6] += 10.0
+    x = np.zeros(len(y))
+
+    spiky = {kind: int(v[0]) for kind, v in detect_flight_events_batch(*pad_tracks([(frames, y)])).items()}
+    expected = {kind: int(v[0]) for kind, v in detect_flight_events_batch(*pad_tracks([(frames, clean)])).items()}
+    assert spiky["launch"] == 8 and spiky["landing"] == len(y) - 6
+    assert expected["launch"] == 21
+
+    result, last = _online(frames, x, y, lag)
+    assert result == last == expected
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_repeated_peak_is_emitted_once(lag):
+    # topo achatado: o mesmo mínimo de novo e, depois da confirmação, um valor um pouco menor
+    # (abaixo dos limiares); o lote fica com o menor, o fluxo com o primeiro
+    frames, y = _flight()
+    apex = int(np.argmin(y))
+    top = y[apex]
+    flat = np.concatenate([[top], np.full(lag + 1, top + 0.1), [top], np.full(lag + 1, top + 0.1), [top - 0.2]])
+    y = np.concatenate([y[:apex], flat, y[apex + 1:]])
+    frames = np.arange(len(y))
+    x = np.zeros(len(y))
+
+    batch = {kind: int(v[0]) for kind, v in detect_flight_events_batch(*pad_tracks([(frames, y)])).items()}
+    assert batch["peak"] == apex + len(flat) - 1
+
+    det = OnlineFlightDetector(lag=lag)
+    events = [e for f, yy in zip(frames, y) for e in det.update(f, 0.0, yy)] + det.finish()
+    assert [kind for kind, *_ in events] == ["launch", "peak", "landing"]
+    # confirmado antes do fim do voo, não no finish()
+    assert events[1][1] == apex and events[1][2] < frames[-1]
+
+    result, last = _online(frames, x, y, lag)
+    assert result == last == dict(batch, peak=apex)
+
+
+@pytest.mark.parametrize("lag", LAGS)
+def test_online_matches_batch_on_cvat_export(tmp_path, lag):
+    # export sintético gravado e relido pelo leitor do cvat (vários tracks, sem os vazios)
+    rng = np.random.default_rng(100 + lag)
+    tracks = []
+    for track in _longer_than_window(_random_tracks(rng, 40, noise=0.0), lag):
+        ok = ~(np.isnan(track["x2d"]) | np.isnan(track["y2d"]))
+        if ok.sum():
+            tracks.append({name: col[ok] for name, col in track.items()})
+    xml = tmp_path / "annotations.xml"
+    _write_cvat(xml, tracks)
+    _check(list(load_cvat_tracks(xml, cache=False).values()), lag)
@@ -0,0 +1,91 @@
+"""
+ajuste da parábola aos pontos 2d: trajetória conhecida projetada pela câmera, com ruído, volta
+pelo ajuste com p0/p1 próximos dos verdadeiros e erro de reprojeção menor que o do chute linear
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traj3d.camera import make_camera, project, project_series, reprojection_error, reprojection_stats
+from traj3d.fitting import FIT_KEYS, _positions, fit_linear, fit_trajectory, fit_trajectory_batch
+from traj3d.model import FlightModel, Trajectory
+
+FPS = 30.0
+F0, F1, TOTAL = 12, 52, 64
+P0, P1 = (0.0, 7.0, 2.0), (6.0, 6.0, 0.0)
+NOISE = 1.5
+CAMERA = make_camera((7.0, 4.0, 1.0), (3.0, 6.5, 1.0), 848, 464)
+
+
+def _observed(noise, seed=0):
+    # pontos 2d da trajetória verdadeira no voo, com ruído gaussiano em pixels
+    df = Trajectory.build(TOTAL, FlightModel.from_anchors(F0, F1, FPS, P0, P1)).to_frame()
+    uv = project_series(CAMERA, df) + np.random.default_rng(seed).normal(0.0, noise, (len(df), 2))
+    flight = slice(F0, F1 + 1)
+    return pd.DataFrame({"frame": df["frame"].to_numpy()[flight], "x2d": uv[flight, 0], "y2d": uv[flight, 1]})
+
+
+def _stats(df_xy, p0, p1):
+    # erro de reprojeção no voo da trajetória com extremos p0, p1
+    df = Trajectory.build(TOTAL, FlightModel.from_anchors(F0, F1, FPS, p0, p1)).to_frame()
+    return reprojection_stats(reprojection_error(CAMERA, df, df_xy), F0, F1)
+
+
+def _linear_ends(df_xy):
+    # extremos da solução em forma fechada (o chute inicial do gauss-newton)
+    t = df_xy["frame"].to_numpy(dtype=float) / FPS
+    theta = fit_linear(CAMERA, t, df_xy["x2d"].to_numpy(), df_xy["y2d"].to_numpy())
+    ends = _positions(theta, np.array([[F0, F1]], dtype=float) / FPS, -0.5 * 9.81)[0]
+    return tuple(ends[0]), tuple(ends[1])
+
+
+def test_exact_points_recover_the_anchors():
+    fit = fit_trajectory(_observed(0.0), F0, F1, FPS, CAMERA)
+    assert fit["converged"]
+    np.testing.assert_allclose(fit["p0"], P0, atol=1e-6)
+    np.testing.assert_allclose(fit["p1"], P1, atol=1e-6)
+    assert fit["rms"] < 1e-6
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_noisy_points_recover_the_anchors(seed):
+    df_xy = _observed(NOISE, seed)
+    fit = fit_trajectory(df_xy, F0, F1, FPS, CAMERA)
+    assert fit["converged"]
+    np.testing.assert_allclose(fit["p0"], P0, atol=0.15)
+    np.testing.assert_allclose(fit["p1"], P1, atol=0.15)
+
+    # o gauss-newton minimiza o erro em pixels: melhora o chute linear (erro algébrico)
+    fitted = _stats(df_xy, fit["p0"], fit["p1"])
+    linear = _stats(df_xy, *_linear_ends(df_xy))
+    assert fitted["rms"] < linear["rms"]
+    assert fitted["rms"] == pytest.approx(fit["rms"], rel=1e-6)
+    # ruído de NOISE px em cada eixo: erro 2d em torno de NOISE * sqrt(2)
+    assert fitted["rms"] < 1.25 * NOISE * np.sqrt(2)
+
+
+def test_batch_recovers_many_throws():
+    # lançamentos diferentes num único ajuste, com buracos nan e um lançamento sem pontos suficientes
+    rng = np.random.default_rng(1)
+    k, n = 200, 40
+    t = np.arange(n) / FPS
+    truth = np.column_stack([rng.uniform(3, 6, k), rng.uniform(-0.5, 0.5, k), rng.uniform(-1.5, 0.5, k),
+                             rng.uniform(6.5, 7.5, k), rng.uniform(3, 6, k), rng.uniform(1, 2, k)])
+    xyz = _positions(truth, np.broadcast_to(t, (k, n)), -0.5 * 9.81)
+    uv = project(CAMERA, xyz.reshape(-1, 3)).reshape(k, n, 2) + rng.normal(0.0, 1.0, (k, n, 2))
+    uv[rng.random((k, n)) < 0.1] = np.nan
+    uv[-1, 2:] = np.nan
+
+    fit = fit_trajectory_batch(CAMERA, t, uv[..., 0], uv[..., 1])
+    theta = np.column_stack([fit[key] for key in FIT_KEYS])
+    assert np.isnan(theta[-1]).all() and not fit["converged"][-1]
+    assert fit["converged"][:-1].all()
+
+    # posição no início e no fim do trecho, como p0/p1 de fit_trajectory
+    ends = _positions(theta[:-1], np.broadcast_to(t[[0, -1]], (k - 1, 2)), -0.5 * 9.81)
+    true_ends = _positions(truth[:-1], np.broadcast_to(t[[0, -1]], (k - 1, 2)), -0.5 * 9.81)
+    err = np.linalg.norm(ends - true_ends, axis=-1)
+    assert np.median(err) < 0.05
+    assert np.percentile(err, 95) < 0.2
+    assert np.all(fit["rms"][:-1] < 2.0)
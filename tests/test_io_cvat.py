@@ -0,0 +1,40 @@
+"""
+cache em disco do leitor do cvat: entradas antigas ou corrompidas são regravadas
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from traj3d.io_cvat import _read_cvat_cache, file_digest, load_cvat_tracks, load_cvat_xy
+
+ANNOTATIONS = Path(__file__).resolve().parents[1] / "annotations.xml"
+
+
+def _stale_version(entry):
+    with open(entry / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["version"] = -1
+    with open(entry / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _corrupt(entry):
+    (entry / "frame.npy").write_bytes(b"lixo")
+
+
+@pytest.mark.parametrize("damage", [_stale_version, _corrupt])
+@pytest.mark.parametrize("loader, prefix", [(load_cvat_xy, "cvat-"), (load_cvat_tracks, "cvat-tracks-")])
+def test_bad_cache_entry_is_rewritten(tmp_path, loader, prefix, damage):
+    xml = tmp_path / "annotations.xml"
+    shutil.copy(ANNOTATIONS, xml)
+    entry = tmp_path / "cache" / f"{prefix}{file_digest(xml)}"
+    loader(xml, cache_dir=tmp_path / "cache")
+    damage(entry)
+    assert _read_cvat_cache(entry, ("frame",)) is None
+
+    loader(xml, cache_dir=tmp_path / "cache")
+    assert _read_cvat_cache(entry, ("frame",)) is not None
+    assert not list((tmp_path / "cache").glob(".tmp-*"))
@@ -0,0 +1,116 @@
+"""
+redução das séries antes do matplotlib: decimate (minmax e lttb) mantém o primeiro e o último
+ponto, os degraus de lançamento/pouso e o apogeu, e nunca passa de max_points
+"""
+
+import numpy as np
+import pytest
+
+from traj3d.model import FlightModel, Trajectory
+from traj3d.plotting import _lttb_indices, decimate, key_indices
+from traj3d.resample import evaluate
+
+METHODS = ("minmax", "lttb")
+
+
+def _series(n):
+    # voo reamostrado com parado antes e depois: degraus de velocidade e apogeu longe das pontas
+    model = FlightModel.from_anchors(30, 90, 30.0, (0.0, 7.0, 2.0), (6.0, 6.0, 0.0))
+    t = np.linspace(0.0, 4.0, n)
+    out = evaluate(t, model)
+    return t, {"z3d": out[:, 3], "vx": out[:, 4], "vy": out[:, 5], "vz": out[:, 6], "speed": out[:, 7]}
+
+
+def _check(sel, n, max_points, forced):
+    assert len(sel) <= max_points
+    assert np.all(np.diff(sel) > 0)
+    assert sel[0] == 0 and sel[-1] == n - 1
+    assert set(forced) <= set(sel.tolist())
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("max_points", (7, 8, 40, 333, 4000))
+@pytest.mark.parametrize("n", (10_001, 123_457))
+def test_keeps_steps_and_apex_within_budget(method, max_points, n):
+    t, df = _series(n)
+    keep = key_indices(df)
+    # lançamento e pouso (dois lados de cada degrau) e o apogeu
+    assert len(keep) == 5
+    for col in ("vz", "speed", "z3d"):
+        sel = decimate(t, df[col], max_points, keep=keep, method=method)
+        _check(sel, n, max_points, keep)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_budget_smaller_than_forced_points(method):
+    # keep mais as pontas já passam do orçamento: voltam só os obrigatórios
+    t, df = _series(10_001)
+    keep = key_indices(df)
+    sel = decimate(t, df["z3d"], 5, keep=keep, method=method)
+    np.testing.assert_array_equal(sel, np.unique(np.concatenate([[0, len(t) - 1], keep])))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_random_series_with_nan(method):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n = int(rng.integers(2, 20_000))
+        y = np.cumsum(rng.normal(size=n))
+        y[rng.random(n) < 0.05] = np.nan
+        max_points = int(rng.integers(8, 500))
+        keep = rng.integers(-10, n + 10, int(rng.integers(0, 5)))
+        sel = decimate(np.arange(n), y, max_points, keep=keep, method=method)
+        forced = [k for k in keep if 0 <= k < n]
+        if n <= max_points:
+            np.testing.assert_array_equal(sel, np.arange(n))
+        else:
+            _check(sel, n, max_points, forced)
+
+
+def test_minmax_keeps_the_extremes():
+    # mínimo e máximo globais sempre entram (são o extremo da sua faixa)
+    rng = np.random.default_rng(1)
+    y = rng.normal(size=50_000)
+    sel = decimate(np.arange(len(y)), y, 200)
+    assert np.argmin(y) in sel and np.argmax(y) in sel
+
+
+def test_lttb_indices():
+    # um ponto por faixa entre o primeiro e o último, cada um dentro da sua faixa
+    rng = np.random.default_rng(2)
+    n, buckets = 10_000, 97
+    x = np.arange(n, dtype=float)
+    idx = _lttb_indices(x, rng.normal(size=n), buckets)
+    assert len(idx) == buckets + 2
+    assert idx[0] == 0 and idx[-1] == n - 1
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    inner = idx[1:-1]
+    assert np.all((inner >= edges[:-1]) & (inner < edges[1:]))
+
+    # pico isolado numa linha reta: o triângulo maior é o do pico
+    y = np.zeros(n)
+    y[4321] = 10.0
+    assert 4321 in _lttb_indices(x, y, buckets)
+
+
+def test_short_series_and_unknown_method():
+    t, df = _series(100)
+    np.testing.assert_array_equal(decimate(t, df["z3d"], 100), np.arange(100))
+    np.testing.assert_array_equal(decimate(t, df["z3d"], None), np.arange(100))
+    with pytest.raises(ValueError):
+        decimate(t, df["z3d"], 10, method="media")
+
+
+def test_plot_series_are_reduced(tmp_path):
+    # a figura de componentes desenha no máximo max_points por linha, com os degraus
+    pytest.importorskip("matplotlib")
+    from traj3d.plotting import ComponentFigure
+
+    df = Trajectory.build(20_000, FlightModel.from_anchors(3000, 15000, 3000.0, (0.0, 7.0, 2.0), (6.0, 6.0, 0.0)))
+    df = df.to_frame()
+    steps = df["t"].to_numpy()[key_indices(df)]
+    with ComponentFigure("velocity", max_points=500) as fig:
+        fig.render(df, str(tmp_path / "v.png"))
+        for line in fig.lines:
+            assert len(line.get_xdata()) <= 500
+            assert set(steps) <= set(line.get_xdata())
@@ -0,0 +1,54 @@
+"""
+cache de probe: com o cache válido o vídeo não é aberto; escritas em paralelo não se atropelam
+"""
+
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+
+from traj3d.probe import _sidecar_path, _stat_key, _write_sidecar, clear_probe_cache, probe_video
+
+VIDEO = Path(__file__).resolve().parents[1] / "bola.mp4"
+
+
+def test_cache_hit_does_not_open_the_video(tmp_path):
+    video = tmp_path / "bola.mp4"
+    shutil.copy(VIDEO, video)
+    opened = []
+
+    def capture():
+        opened.append(cv2.VideoCapture(str(video)))
+        return opened[-1]
+
+    first = probe_video(video, cap=capture)
+    assert len(opened) == 1
+    opened[0].release()
+
+    # cache em memória e, depois de limpá-lo, o json em disco
+    assert probe_video(video, cap=capture) == first
+    clear_probe_cache()
+    assert probe_video(video, cap=capture) == first
+    assert len(opened) == 1
+
+
+def _write(args):
+    key, meta = args
+    for _ in range(50):
+        _write_sidecar(key, meta)
+
+
+def test_parallel_sidecar_writes(tmp_path):
+    video = tmp_path / "bola.mp4"
+    shutil.copy(VIDEO, video)
+    key = _stat_key(video)
+    meta = {"width": 848, "height": 464, "frame_count": 59, "fps": 30.0, "exact": False}
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_write, [(key, meta)] * 4))
+
+    path = _sidecar_path(key)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["meta"] == meta
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
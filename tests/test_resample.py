@@ -0,0 +1,90 @@
+"""
+evaluate e resample_stream contra interpolate_position, build_kinematics e as derivadas de
+make_velocity_functions, nos frames inteiros e fora de [t0, t1] (bola parada em p0/p1)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traj3d.kinematics import build_kinematics, make_velocity_functions
+from traj3d.model import FlightModel, SERIES_COLUMNS
+from traj3d.resample import evaluate, resample_stream, sample_count
+from traj3d.trajectory import interpolate_position, make_position_functions
+
+FPS = 30.0
+F0, F1 = 12, 52
+PARAMS = make_position_functions(F0, F1, FPS, (0.0, 7.0, 2.0), (6.0, 6.0, 0.0))
+
+
+def _reference(t):
+    # série escalar de referência: posição ponto a ponto e cinemática das funções de velocidade
+    pos = np.array([interpolate_position(ti, PARAMS) for ti in t])
+    df = build_kinematics(pd.DataFrame({"t": t, "x3d": pos[:, 0], "y3d": pos[:, 1], "z3d": pos[:, 2]}), PARAMS)
+    vx, vy, vz, ax, ay, az = make_velocity_functions(PARAMS)
+    derived = np.column_stack([vx(t), vy(t), vz(t), ax(t), ay(t), az(t)])
+    return df[list(SERIES_COLUMNS)].to_numpy(), derived
+
+
+def _check(t):
+    out = evaluate(t, PARAMS)
+    expected, derived = _reference(t)
+    # posição idêntica à de interpolate_position; cinemática igual às derivadas exatas
+    np.testing.assert_array_equal(out[:, :4], expected[:, :4])
+    np.testing.assert_array_equal(out[:, 4:], expected[:, 4:])
+    np.testing.assert_allclose(out[:, [4, 5, 6, 8, 9, 10]], derived, rtol=1e-12, atol=1e-12)
+    return out
+
+
+def test_integer_frames_match_the_scalar_series():
+    # frames antes do lançamento, o voo inteiro e depois do pouso, incluindo t0 e t1 exatos
+    frames = np.arange(-5, F1 + 20)
+    out = _check(frames / FPS)
+    np.testing.assert_array_equal(out[frames == F0, 1:4][0], (PARAMS["x0"], PARAMS["y0"], PARAMS["z0"]))
+    np.testing.assert_array_equal(out[frames == F1, 1:4][0], (PARAMS["x1"], PARAMS["y1"], PARAMS["z1"]))
+    # velocidade vale em [t0, t1): zero no pouso, não zero no lançamento
+    assert not out[frames == F1, 4:].any()
+    assert out[frames == F0, 7][0] > 0
+
+
+def test_times_outside_the_flight_are_clamped():
+    # tempos longe do voo, em qualquer ordem: posição em p0/p1 e cinemática zerada
+    rng = np.random.default_rng(0)
+    before = rng.uniform(-100.0, PARAMS["t0"], 50)
+    after = rng.uniform(PARAMS["t1"], 1e4, 50)
+    inside = rng.uniform(PARAMS["t0"], PARAMS["t1"], 50)
+    t = rng.permutation(np.concatenate([before, after, inside, [PARAMS["t0"], PARAMS["t1"]]]))
+    out = _check(t)
+
+    le, ge = t <= PARAMS["t0"], t >= PARAMS["t1"]
+    np.testing.assert_array_equal(out[le, 1:4], np.broadcast_to((PARAMS["x0"], PARAMS["y0"], PARAMS["z0"]), (le.sum(), 3)))
+    np.testing.assert_array_equal(out[ge, 1:4], np.broadcast_to((PARAMS["x1"], PARAMS["y1"], PARAMS["z1"]), (ge.sum(), 3)))
+    assert not out[(t < PARAMS["t0"]) | ge, 4:].any()
+
+
+def test_flight_model_params_and_small_blocks():
+    # FlightModel no lugar do dict e blocos menores que a série dão o mesmo resultado
+    t = np.arange(-5, F1 + 20) / FPS
+    model = FlightModel.from_params(PARAMS)
+    np.testing.assert_array_equal(evaluate(t, model, block=7), evaluate(t, PARAMS))
+
+
+@pytest.mark.parametrize("reuse", (False, True))
+def test_stream_chunks_concatenate_to_evaluate(reuse):
+    # grade que começa antes do lançamento e passa do pouso, em pedaços que não dividem o total
+    rate, start, stop = 240.0, -0.25, PARAMS["t1"] + 0.5
+    total = sample_count(rate, start, stop)
+    chunks = [c.copy() for c in resample_stream(PARAMS, rate, start, stop, chunk=97, reuse=reuse)]
+    assert all(len(c) == 97 for c in chunks[:-1]) and 0 < len(chunks[-1]) <= 97
+
+    grid = np.arange(total) / rate + start
+    np.testing.assert_array_equal(np.concatenate(chunks), evaluate(grid, PARAMS))
+    assert grid[-1] <= stop < grid[-1] + 1 / rate
+
+
+def test_stream_on_the_frame_rate_matches_the_frames():
+    # reamostrar na própria taxa do vídeo dá de volta os frames inteiros
+    out = np.concatenate(list(resample_stream(PARAMS, FPS, 0.0, chunk=10)))
+    assert len(out) == F1 + 1
+    expected, _ = _reference(np.arange(F1 + 1) / FPS)
+    np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,85 @@
+"""
+vídeo anotado em trechos contra a passada sequencial, decodificando as duas saídas
+"""
+
+import shutil
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pytest
+
+from traj3d.model import FlightModel, Trajectory
+from traj3d.video_annot import _frame_renderer, _render_chunk, annotate_video, build_overlay_table
+
+FRAMES = 48
+SIZE = (192, 144)
+FPS = 30.0
+
+
+def _read_all(path):
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.stack(frames)
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    # vídeo curto com conteúdo diferente em cada frame (um frame deslocado não passa) e a série do voo
+    path = tmp_path_factory.mktemp("clip") / "clip.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, SIZE)
+    for i in range(FRAMES):
+        frame = np.full((SIZE[1], SIZE[0], 3), 40 + 4 * i, dtype=np.uint8)
+        cv2.rectangle(frame, (4 * i, 60), (4 * i + 30, 100), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    df = Trajectory.build(FRAMES, FlightModel.from_anchors(10, 40, FPS, (0.0, 7.0, 2.0), (6.0, 6.0, 0.0))).to_frame()
+    return path, df
+
+
+def test_chunked_matches_serial(clip, tmp_path):
+    # com ffmpeg cada trecho é um codificador próprio (frames próximos); sem ffmpeg é a passada sequencial
+    path, df = clip
+    annotate_video(str(path), df, str(tmp_path / "serial.mp4"), FPS)
+    annotate_video(str(path), df, str(tmp_path / "chunked.mp4"), FPS, chunks=3)
+    serial = _read_all(tmp_path / "serial.mp4")
+    chunked = _read_all(tmp_path / "chunked.mp4")
+    assert chunked.shape == serial.shape == (FRAMES, SIZE[1], SIZE[0], 3)
+    if shutil.which("ffmpeg"):
+        diff = np.abs(chunked.astype(int) - serial).mean(axis=(1, 2, 3))
+        assert diff.max() < 3.0
+    else:
+        np.testing.assert_array_equal(chunked, serial)
+
+
+def test_chunk_starts_on_its_frame(clip, tmp_path):
+    # trecho do meio num segmento sem perdas: cada frame é o frame da fonte com o mesmo índice, anotado
+    path, df = clip
+    table = build_overlay_table(df, total=FRAMES)
+    render, _ = _frame_renderer(table, FPS, SIZE)
+    source = _read_all(path)
+    start, stop = 29, 41
+
+    shm = shared_memory.SharedMemory(create=True, size=table.nbytes)
+    try:
+        np.ndarray(table.shape, dtype=table.dtype, buffer=shm.buf)[:] = table
+        seg = tmp_path / "trecho.mkv"
+        key = tmp_path / "chave.png"
+        n_read, saved = _render_chunk((str(path), shm.name, table.shape, FPS, start, stop, str(seg), SIZE,
+                                       "FFV1", {33: [key]}, 0, None, [], None))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert n_read == stop - start
+    assert saved == [key]
+    frames = _read_all(seg)
+    expected = np.stack([render(i, source[i].copy()) for i in range(start, stop)])
+    np.testing.assert_array_equal(frames, expected)
+    np.testing.assert_array_equal(cv2.imread(str(key)), expected[33 - start])